@@ -1,15 +1,20 @@
 from fastapi import HTTPException
 from fastapi.responses import JSONResponse
-import fitz
 from typing import Dict
-from docx import Document
-from pptx import Presentation
-from PIL import Image
-import pytesseract
 from io import BytesIO
-import speech_recognition as sr
-from pydub import AudioSegment
-import ffmpeg
+from app.services.lazy_imports import lazy_import
+from app.services.metrics import extraction_timer
+from app.services.tracing import span
+
+# Extractors are only imported when a file of their type arrives
+fitz = lazy_import("fitz")
+docx = lazy_import("docx")
+pptx = lazy_import("pptx")
+Image = lazy_import("PIL.Image")
+pytesseract = lazy_import("pytesseract")
+sr = lazy_import("speech_recognition")
+pydub = lazy_import("pydub")
+ffmpeg = lazy_import("ffmpeg")
 
 def text_cleaning(extracted_text: str) -> Dict[str, str]:
     cleaned_text = extracted_text.replace("\n", " ").replace("\r", " ").strip()
@@ -27,11 +32,12 @@ async def extract_text_from_pdf_logic(pdf_file) -> Dict[str, str]:
     file_content = await pdf_file.read()
 
     try:
-        doc = fitz.open(stream=file_content, filetype="pdf")
-        extracted_text = ""
-        for page in doc:
-            extracted_text += page.get_text()
-        doc.close()
+        with span("extract.parse", file_type="pdf", bytes=len(file_content)):
+            doc = fitz.open(stream=file_content, filetype="pdf")
+            extracted_text = ""
+            for page in doc:
+                extracted_text += page.get_text()
+            doc.close()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
     return text_cleaning(extracted_text)
@@ -45,10 +51,11 @@ async def extract_text_from_docx_logic(docx_file) -> Dict[str, str]:
 
     try:
 
-        document = Document(BytesIO(file_content))
-        extracted_text = ""
-        for para in document.paragraphs:
-            extracted_text += para.text + "\n"
+        with span("extract.parse", file_type="docx", bytes=len(file_content)):
+            document = docx.Document(BytesIO(file_content))
+            extracted_text = ""
+            for para in document.paragraphs:
+                extracted_text += para.text + "\n"
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing DOCX: {str(e)}")
     
@@ -84,12 +91,13 @@ async def extract_text_from_pptx_logic(pptx_file) -> Dict[str, str]:
     
     file_content = await pptx_file.read()
     try:
-        presentation = Presentation(BytesIO(file_content))
-        extracted_text = ""
-        for slide in presentation.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    extracted_text += getattr(shape, "text") + "\n"
+        with span("extract.parse", file_type="pptx", bytes=len(file_content)):
+            presentation = pptx.Presentation(BytesIO(file_content))
+            extracted_text = ""
+            for slide in presentation.slides:
+                for shape in slide.shapes:
+                    if hasattr(shape, "text"):
+                        extracted_text += getattr(shape, "text") + "\n"
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing PPTX: {str(e)}")
     
@@ -113,8 +121,9 @@ async def extract_text_from_image_logic(image_file) -> Dict[str, str]:
     
     file_content = await image_file.read()
     try:
-        image = Image.open(BytesIO(file_content))
-        extracted_text = pytesseract.image_to_string(image)
+        with span("extract.ocr", bytes=len(file_content)):
+            image = Image.open(BytesIO(file_content))
+            extracted_text = pytesseract.image_to_string(image)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
     
@@ -147,8 +156,9 @@ async def extract_text_from_audio_logic(audio_file) -> Dict[str, str]:
     try:
         # Step 1: Load audio with better error handling
         try:
-            audio_bytes = BytesIO(file_content)
-            audio = AudioSegment.from_file(audio_bytes)
+            with span("extract.audio.decode", bytes=len(file_content)):
+                audio_bytes = BytesIO(file_content)
+                audio = pydub.AudioSegment.from_file(audio_bytes)
         except Exception as load_error:
             raise HTTPException(
                 status_code=500, 
@@ -165,12 +175,13 @@ async def extract_text_from_audio_logic(audio_file) -> Dict[str, str]:
         # Step 3: Convert audio to proper format for speech recognition
         try:
             # Convert to mono, 16kHz WAV for better speech recognition
-            audio = audio.set_frame_rate(16000).set_channels(1)
+            with span("extract.audio.convert", duration_ms=len(audio)):
+                audio = audio.set_frame_rate(16000).set_channels(1)
             
-            # Export to WAV format in memory
-            temp_wav = BytesIO()
-            audio.export(temp_wav, format="wav")
-            temp_wav.seek(0)
+                # Export to WAV format in memory
+                temp_wav = BytesIO()
+                audio.export(temp_wav, format="wav")
+                temp_wav.seek(0)
         except Exception as convert_error:
             raise HTTPException(
                 status_code=500, 
@@ -191,7 +202,7 @@ async def extract_text_from_audio_logic(audio_file) -> Dict[str, str]:
             recognizer.phrase_threshold = 0.3
             recognizer.non_speaking_duration = 0.5
             
-            with sr.AudioFile(temp_wav) as source:
+            with span("extract.speech_recognition"), sr.AudioFile(temp_wav) as source:
                 # Adjust for ambient noise
                 recognizer.adjust_for_ambient_noise(source, duration=1)
                 audio_data = recognizer.record(source)
@@ -275,12 +286,13 @@ async def extract_text_from_video_logic(video_file) -> Dict[str, str]:
     try:
         # Step 1: Extract audio from video using ffmpeg
         try:
-            out, err = (
-                ffmpeg
-                .input('pipe:0', format='mp4')
-                .output('pipe:1', format='wav', acodec='pcm_s16le', ac=1, ar='16000')
-                .run(input=file_content, capture_stdout=True, capture_stderr=True)
-            )
+            with span("extract.video.ffmpeg", bytes=len(file_content)):
+                out, err = (
+                    ffmpeg
+                    .input('pipe:0', format='mp4')
+                    .output('pipe:1', format='wav', acodec='pcm_s16le', ac=1, ar='16000')
+                    .run(input=file_content, capture_stdout=True, capture_stderr=True)
+                )
             
             if err:
                 print(f"FFmpeg stderr: {err.decode()}")
@@ -323,7 +335,7 @@ async def extract_text_from_video_logic(video_file) -> Dict[str, str]:
             recognizer.dynamic_energy_threshold = True
             recognizer.pause_threshold = 0.8
             
-            with sr.AudioFile(temp_audio) as source:
+            with span("extract.speech_recognition"), sr.AudioFile(temp_audio) as source:
                 # Adjust for ambient noise
                 recognizer.adjust_for_ambient_noise(source, duration=1)
                 audio_data = recognizer.record(source)
@@ -379,6 +391,13 @@ async def extract_text_from_video_logic(video_file) -> Dict[str, str]:
     
     return text_cleaning(extracted_text)
 
+# File types timed separately in the extraction metrics; anything else is "other"
+METRIC_FILE_TYPES = {
+    "pdf", "txt", "docx", "html", "pptx", "md", "png", "jpg", "jpeg",
+    "wav", "mp3", "m4a", "flac", "ogg", "aac", "mp4", "avi", "mov", "mkv", "webm", "flv",
+}
+
+
 async def extract_text_logic(file) -> Dict[str, str]:
     # Validate file size
     if file.size > 10 * 1024 * 1024:  # 10 MB
@@ -386,7 +405,14 @@ async def extract_text_logic(file) -> Dict[str, str]:
     
     # Get file extension
     filename_lower = file.filename.lower()
+    file_type = filename_lower.rsplit(".", 1)[-1]
     
+    file_type = file_type if file_type in METRIC_FILE_TYPES else "other"
+    with extraction_timer(file_type), span("extract", file_type=file_type, bytes=file.size):
+        return await _extract_text_by_type(file, filename_lower)
+
+
+async def _extract_text_by_type(file, filename_lower: str) -> Dict[str, str]:
     try:
         if filename_lower.endswith(".pdf"):
             textObj = await extract_text_from_pdf_logic(file)
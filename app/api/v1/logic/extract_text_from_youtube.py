@@ -1,15 +1,19 @@
 from fastapi import HTTPException
 from typing import Dict
 import re
-import requests
 import time
 import random
 import json
 import xml.etree.ElementTree as ET
-from youtube_transcript_api._api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
+from app.services.lazy_imports import lazy_import
+from app.services.tracing import traced
+
+requests = lazy_import("requests")
+youtube_api = lazy_import("youtube_transcript_api._api")
+youtube_errors = lazy_import("youtube_transcript_api._errors")
 
 # Alternative approach using direct API calls
+@traced("youtube.transcript_fallback")
 def get_transcript_alternative(video_id: str) -> str:
     """
     Alternative method to get transcript using direct requests to avoid browser blocking
@@ -196,6 +200,7 @@ def check_video_duration(video_id: str) -> bool:
     except:
         return True  # If we can't check duration, proceed anyway
 
+@traced("youtube.transcript")
 async def extract_text(video_id: str) -> str:
     """
     Extract text from YouTube video with IP masking and retry logic.
@@ -241,10 +246,10 @@ async def extract_text(video_id: str) -> str:
                         
                         if lang_code == 'auto':
                             # Try to get any available transcript
-                            transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
+                            transcript_list = youtube_api.YouTubeTranscriptApi.get_transcript(video_id)
                         else:
                             # Try specific language
-                            transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=[lang_code])
+                            transcript_list = youtube_api.YouTubeTranscriptApi.get_transcript(video_id, languages=[lang_code])
                         
                         # Process transcript
                         transcript_text = " ".join([entry['text'] for entry in transcript_list])
@@ -253,7 +258,7 @@ async def extract_text(video_id: str) -> str:
                             print(f"Successfully extracted transcript using language: {lang_code}")
                             return transcript_text
                             
-                    except (TranscriptsDisabled, NoTranscriptFound, VideoUnavailable) as e:
+                    except (youtube_errors.TranscriptsDisabled, youtube_errors.NoTranscriptFound, youtube_errors.VideoUnavailable) as e:
                         print(f"Language {lang_code} failed: {str(e)}")
                         continue
                     except Exception as e:
@@ -269,12 +274,12 @@ async def extract_text(video_id: str) -> str:
                 # If we get here, all language attempts failed for this strategy
                 print("All language codes failed for this attempt")
                 
-            except TranscriptsDisabled:
+            except youtube_errors.TranscriptsDisabled:
                 return "Error: Transcripts are disabled for this video."
-            except NoTranscriptFound:
+            except youtube_errors.NoTranscriptFound:
                 print("No transcript found, trying next strategy...")
                 break  # Try next strategy
-            except VideoUnavailable:
+            except youtube_errors.VideoUnavailable:
                 return "Error: The video is unavailable."
             except Exception as e:
                 error_msg = str(e).lower()
@@ -1,25 +1,45 @@
-import json
+import asyncio
+import contextvars
 import os
 import datetime
-from google import genai
-from typing import Optional, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Iterator
 from dotenv import load_dotenv
 from app.models.BaseModel.flashcard import flashcard_request, flashcard_response, flashcard
 from app.services.personalization.prompt_enhancer import enhance_prompt_with_personalization
 from app.services.firebase.config import get_firebase_db
 from app.services.firebase.flashcard import FlashcardService
+from app.services.llm.structured_output import generate_structured
+from app.services.llm.token_counter import token_counter
+from app.services.llm.gemini_client import generate_content, GeminiUnavailableError
+from app.services.streaming.gemini_stream import stream_json_events
+from app.services.streaming.incremental_json import format_sse
+from app.services.text.output_language import enforce_output_language
+from app.services.text.similarity import NearDuplicateFilter
+from app.services.text.coverage import key_terms, select_by_coverage
+from app.services.llm.model_router import TITLE
 
 load_dotenv()
 
-# Configure Gemini API
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+# Texts longer than this are turned into flashcards chunk by chunk
+FLASHCARD_LONG_INPUT_TOKENS = int(os.getenv("FLASHCARD_LONG_INPUT_TOKENS", "12000"))
+FLASHCARD_CHUNK_TOKENS = int(os.getenv("FLASHCARD_CHUNK_TOKENS", "6000"))
+MAX_FLASHCARD_CHUNKS = 8
+# Candidates generated per kept card in long-input mode, so ranking has something to choose from
+FLASHCARD_OVERGENERATION = 1.5
+MAX_FLASHCARD_WORKERS = 4
+
+flashcard_executor = ThreadPoolExecutor(max_workers=MAX_FLASHCARD_WORKERS, thread_name_prefix="flashcards")
+
 
 class FlashcardGenerator:
     def __init__(self):
         self.max_flashcards = 20
         self.min_flashcards = 5
+        # Source text sent with the prompt; 20 cards never need more context than this
+        self.max_input_tokens = 30000
 
-    def _create_flashcard_prompt(self, text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English") -> str:
+    def _create_flashcard_prompt(self, text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English", count: Optional[str] = None) -> str:
         """
         Create a personalized prompt for flashcard generation.
         
@@ -27,15 +47,19 @@ class FlashcardGenerator:
             text (str): The input text to create flashcards from
             instruction (Optional[str]): Optional instruction for flashcard generation
             userId (Optional[str]): Optional user ID for personalization
+            count (Optional[str]): How many flashcards to ask for, e.g. "4 to 6"; by
+                default between min_flashcards and max_flashcards
             
         Returns:
             str: The enhanced prompt for flashcard generation
         """
         # Build the base prompt
         base_instruction = instruction if instruction else "Create flashcards that help with memorization and understanding of key concepts."
+        text = token_counter.truncate_to_tokens(text, self.max_input_tokens)
+        count = count or f"between {self.min_flashcards} and {self.max_flashcards}"
         
         base_prompt = f"""
-Generate educational flashcards from the following text. Create between {self.min_flashcards} and {self.max_flashcards} flashcards that cover the most important concepts, facts, and key points.
+Generate educational flashcards from the following text. Create {count} flashcards that cover the most important concepts, facts, and key points.
 
 INSTRUCTION: {base_instruction}
 
@@ -77,10 +101,136 @@ Please respond in JSON format with:
         
         return base_prompt
 
+    def _apply_limits(self, result: flashcard_response) -> flashcard_response:
+        """
+        Enforce the flashcard count on a validated response.
+        
+        Args:
+            result (flashcard_response): The response returned by Gemini
+            
+        Returns:
+            flashcard_response: The flashcards with title
+        """
+        # Ensure we have at least one flashcard
+        if not result.flashcards:
+            result.flashcards = [
+                flashcard(
+                    question="What are the main topics covered in the provided text?",
+                    answer="The text contains information that can be studied through these flashcards for better understanding and retention."
+                )
+            ]
+        
+        # Limit to maximum number of flashcards
+        if len(result.flashcards) > self.max_flashcards:
+            result.flashcards = result.flashcards[:self.max_flashcards]
+        
+        return result
+
+    def _generate_chunk(self, chunk: str, count: str, instruction: Optional[str], userId: Optional[str], language: Optional[str]) -> Optional[flashcard_response]:
+        try:
+            return generate_structured(self._create_flashcard_prompt(chunk, instruction, userId, language, count), flashcard_response, "flashcards_chunk")
+        except GeminiUnavailableError:
+            raise
+        except Exception as e:
+            print(f"❌ Flashcard chunk generation error: {e}")
+            return None
+
+    def _deck_title(self, titles: List[str], language: Optional[str]) -> str:
+        """One title for a deck built from chunks, from the chunk titles."""
+        if len(titles) == 1:
+            return titles[0]
+        chunk_titles = "\n".join(f"- {title}" for title in titles)
+        prompt = f"""The sections of a document were turned into flashcard sets with these titles:
+{chunk_titles}
+
+Write one descriptive title (max 10 words) for the complete set, in {language}. Return only the title."""
+        try:
+            response = generate_content(prompt, config={"response_mime_type": "text/plain"}, task=TITLE, call_site="flashcards_title")
+            return (response.text or "").strip() or titles[0]
+        except Exception as e:
+            print(f"❌ Flashcard title error: {e}")
+            return titles[0]
+
+    async def generate_flashcards_by_chunk(self, text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English") -> flashcard_response:
+        """
+        Generate flashcards for a long text, chunk by chunk.
+
+        Every chunk is asked for its share of the deck (a little more than needed)
+        concurrently. Near-duplicate cards are dropped and the final set is chosen to
+        cover as many of the text's key terms as possible, spread over the chunks.
+
+        Args:
+            text (str): The input text to create flashcards from
+            instruction (Optional[str]): Optional instruction for flashcard generation
+            userId (Optional[str]): Optional user ID for personalization
+            language (Optional[str]): Language of the flashcards
+
+        Returns:
+            flashcard_response: The selected flashcards, in source order
+        """
+        loop = asyncio.get_running_loop()
+        chunks = await loop.run_in_executor(None, contextvars.copy_context().run, token_counter.split_by_tokens, text, FLASHCARD_CHUNK_TOKENS)
+        if len(chunks) > MAX_FLASHCARD_CHUNKS:
+            per_group = len(chunks) / MAX_FLASHCARD_CHUNKS
+            chunks = [
+                "\n\n".join(chunks[round(i * per_group):round((i + 1) * per_group)])
+                for i in range(MAX_FLASHCARD_CHUNKS)
+            ]
+        per_chunk = max(2, round(self.max_flashcards * FLASHCARD_OVERGENERATION / len(chunks)))
+        count = f"{max(1, per_chunk - 1)} to {per_chunk + 1}"
+        print(f"Generating flashcards from {len(chunks)} chunks, {count} each")
+
+        results = await asyncio.gather(*[
+            # Carry the caller's context (e.g. its Gemini priority class) into the worker thread
+            loop.run_in_executor(flashcard_executor, contextvars.copy_context().run, self._generate_chunk, chunk, count, instruction, userId, language)
+            for chunk in chunks
+        ])
+
+        seen = NearDuplicateFilter()
+        candidates: List[flashcard] = []
+        groups: List[int] = []
+        for chunk_index, result in enumerate(results):
+            for card in result.flashcards if result else []:
+                if seen.add(len(candidates), f"{card.question} {card.answer}"):
+                    candidates.append(card)
+                    groups.append(chunk_index)
+        if not candidates:
+            raise ValueError("No flashcards could be generated from any part of the text")
+        duplicates = sum(len(result.flashcards) for result in results if result) - len(candidates)
+        if duplicates:
+            print(f"Dropped {duplicates} near-duplicate flashcards")
+
+        chosen = select_by_coverage(
+            [f"{card.question} {card.answer}" for card in candidates],
+            await loop.run_in_executor(flashcard_executor, contextvars.copy_context().run, key_terms, chunks),
+            self.max_flashcards,
+            groups,
+        )
+        title = await loop.run_in_executor(
+            flashcard_executor,
+            contextvars.copy_context().run,
+            self._deck_title,
+            [result.title for result in results if result],
+            language,
+        )
+        return flashcard_response(title=title, flashcards=[candidates[i] for i in sorted(chosen)])
+
+    def _generate_single(self, text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English") -> flashcard_response:
+        """Flashcards for a text that fits one prompt (blocking: personalization and Gemini calls)"""
+        prompt = self._create_flashcard_prompt(text, instruction, userId, language)
+
+        # Generate content using Gemini, constrained to the response schema
+        result = generate_structured(prompt, flashcard_response, "flashcards")
+
+        return enforce_output_language(self._apply_limits(result), language, "flashcards", userId)
+
     async def generate_flashcards(self, text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English") -> flashcard_response:
         """
         Generate flashcards based on the provided text using Gemini AI.
         
+        Texts above FLASHCARD_LONG_INPUT_TOKENS are handled chunk by chunk, so the deck
+        covers the whole text rather than its beginning.
+        
         Args:
             text (str): The input text to create flashcards from
             instruction (Optional[str]): Optional instruction for flashcard generation
@@ -89,69 +239,22 @@ Please respond in JSON format with:
         Returns:
             flashcard_response: The generated flashcards with title
         """
+        loop = asyncio.get_running_loop()
         try:
-            # Create the personalized prompt
-            prompt = self._create_flashcard_prompt(text, instruction, userId, language)
-
-            # Generate content using Gemini
-            response = client.models.generate_content(
-                model="gemini-2.0-flash", 
-                contents=prompt, 
-                config={"response_mime_type": "application/json"}
-            )
-
-            if response.text is None:
-                raise ValueError("No text received from Gemini AI")
+            # Token counts, Firestore reads and Gemini calls (with their quota waits and
+            # retry backoff) block, so they run in a worker thread, in the caller's context
+            if await loop.run_in_executor(None, contextvars.copy_context().run, token_counter.count_tokens, text) > FLASHCARD_LONG_INPUT_TOKENS:
+                result = await self.generate_flashcards_by_chunk(text, instruction, userId, language)
+                return await loop.run_in_executor(
+                    None,
+                    contextvars.copy_context().run,
+                    lambda: enforce_output_language(self._apply_limits(result), language, "flashcards", userId),
+                )
 
-            # Parse the response
-            data = json.loads(response.text)
-            
-            # Extract title and flashcards
-            title = data.get("title", "Study Flashcards")
-            flashcards_data = data.get("flashcards", [])
-            
-            # Validate and create flashcard objects
-            flashcards_list = []
-            for card_data in flashcards_data:
-                if isinstance(card_data, dict) and "question" in card_data and "answer" in card_data:
-                    flashcard_obj = flashcard(
-                        question=card_data["question"],
-                        answer=card_data["answer"]
-                    )
-                    flashcards_list.append(flashcard_obj)
-            
-            # Ensure we have at least one flashcard
-            if not flashcards_list:
-                flashcards_list = [
-                    flashcard(
-                        question="What are the main topics covered in the provided text?",
-                        answer="The text contains information that can be studied through these flashcards for better understanding and retention."
-                    )
-                ]
-            
-            # Limit to maximum number of flashcards
-            if len(flashcards_list) > self.max_flashcards:
-                flashcards_list = flashcards_list[:self.max_flashcards]
-            
-            result = flashcard_response(
-                flashcards=flashcards_list,
-                title=title
-            )
-            
-            
-            return result
+            return await loop.run_in_executor(None, contextvars.copy_context().run, self._generate_single, text, instruction, userId, language)
 
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON parsing error: {e}")
-            return flashcard_response(
-                flashcards=[
-                    flashcard(
-                        question="What is the main content of the study material?",
-                        answer="This flashcard was created as a fallback. Please review the original text for detailed information."
-                    )
-                ],
-                title="Study Flashcards"
-            )
+        except GeminiUnavailableError:
+            raise
         except Exception as e:
             print(f"❌ Flashcard generation error: {e}")
             return flashcard_response(
@@ -164,6 +267,34 @@ Please respond in JSON format with:
                 title="Error - Study Flashcards"
             )
 
+    def stream_flashcards(self, text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English") -> Iterator[str]:
+        """
+        Generate flashcards as server-sent events, sending each card as soon as it is complete.
+        
+        Args:
+            text (str): The input text to create flashcards from
+            instruction (Optional[str]): Optional instruction for flashcard generation
+            userId (Optional[str]): Optional user ID for personalization
+            
+        Returns:
+            Iterator[str]: ``title`` and ``flashcard`` events, then ``done`` with the
+            complete flashcard_response, or ``error``
+        """
+        try:
+            prompt = self._create_flashcard_prompt(text, instruction, userId, language)
+            for event in stream_json_events(prompt, item_paths=["flashcards"], schema=flashcard_response, call_site="flashcards"):
+                if event["type"] == "field" and event["key"] == "title":
+                    yield format_sse("title", {"title": event["value"]})
+                elif event["type"] == "item" and event["index"] < self.max_flashcards:
+                    flashcard_obj = flashcard.model_validate(event["value"])
+                    yield format_sse("flashcard", {"index": event["index"], **flashcard_obj.model_dump()})
+                elif event["type"] == "result":
+                    result = enforce_output_language(self._apply_limits(event["value"]), language, "flashcards", userId)
+                    yield format_sse("done", result.model_dump())
+        except Exception as e:
+            print(f"❌ Flashcard streaming error: {e}")
+            yield format_sse("error", {"error": f"An error occurred during flashcard generation: {str(e)}"})
+
 # Global instance
 flashcard_generator = FlashcardGenerator()
 
@@ -179,4 +310,18 @@ async def create_flashcard_logic(text: str, instruction: Optional[str] = None, u
     Returns:
         flashcard_response: Generated flashcards with title
     """
-    return await flashcard_generator.generate_flashcards(text, instruction, userId, language)
\ No newline at end of file
+    return await flashcard_generator.generate_flashcards(text, instruction, userId, language)
+
+def stream_flashcard_logic(text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English") -> Iterator[str]:
+    """
+    Streaming variant of create_flashcard_logic.
+    
+    Args:
+        text (str): The input text to analyze and create flashcards from
+        instruction (Optional[str]): Optional instruction for flashcard generation
+        userId (Optional[str]): Optional user ID for personalization
+        
+    Returns:
+        Iterator[str]: Server-sent events with the flashcards as they are generated
+    """
+    return flashcard_generator.stream_flashcards(text, instruction, userId, language)
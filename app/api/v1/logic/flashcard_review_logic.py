@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+import datetime
+from typing import Optional
+from fastapi import HTTPException
+from app.models.BaseModel.flashcard import (
+    flashcard_enroll_request,
+    flashcard_enroll_response,
+    due_flashcards_response,
+    flashcard_review_request,
+    flashcard_review_response,
+)
+from app.services.firebase.config import get_firebase_db
+from app.services.firebase.flashcard_review import FlashcardReviewService
+
+MAX_DUE_CARDS = 200
+MAX_REVIEWS_PER_REQUEST = 1000
+
+
+def _review_service() -> FlashcardReviewService:
+    return FlashcardReviewService(get_firebase_db())
+
+
+def end_of_day(tz_offset_minutes: int = 0) -> datetime.datetime:
+    """End of the user's current day, in UTC."""
+    offset = datetime.timedelta(minutes=tz_offset_minutes)
+    local_now = datetime.datetime.now(datetime.timezone.utc) + offset
+    local_end = datetime.datetime.combine(local_now.date() + datetime.timedelta(days=1), datetime.time(), tzinfo=datetime.timezone.utc)
+    return local_end - offset
+
+
+async def enroll_flashcards_logic(request: flashcard_enroll_request) -> flashcard_enroll_response:
+    """
+    Start spaced-repetition scheduling for a saved flashcard set.
+    
+    Args:
+        request: The user, the set ID and its flashcards
+        
+    Returns:
+        flashcard_enroll_response: Number of newly enrolled and already enrolled cards
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        enrolled, existing = await loop.run_in_executor(None, contextvars.copy_context().run, _review_service().enroll, request.userId, request.setId, request.flashcards)
+        return flashcard_enroll_response(enrolled=enrolled, already_enrolled=existing)
+    except Exception as e:
+        print(f"Error enrolling flashcards for user {request.userId}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error enrolling flashcards: {str(e)}")
+
+
+async def get_due_flashcards_logic(userId: str, limit: int = 50, setId: Optional[str] = None, tz_offset_minutes: int = 0) -> due_flashcards_response:
+    """
+    Cards due for review by the end of the user's day.
+    
+    Args:
+        userId (str): The user
+        limit (int): Most cards to return
+        setId (Optional[str]): Only cards of this flashcard set
+        tz_offset_minutes (int): The user's offset from UTC, e.g. 330 for IST
+        
+    Returns:
+        due_flashcards_response: Due cards, most overdue first
+    """
+    limit = max(1, min(limit, MAX_DUE_CARDS))
+    try:
+        loop = asyncio.get_running_loop()
+        cards = await loop.run_in_executor(None, contextvars.copy_context().run, _review_service().get_due, userId, end_of_day(tz_offset_minutes), limit, setId)
+        return due_flashcards_response(cards=cards)
+    except Exception as e:
+        print(f"Error fetching due flashcards for user {userId}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error fetching due flashcards: {str(e)}")
+
+
+async def submit_flashcard_reviews_logic(request: flashcard_review_request) -> flashcard_review_response:
+    """
+    Record a batch of flashcard reviews and reschedule the cards.
+    
+    Args:
+        request: The user and the reviews (card ID, grade 0-5, optional review time)
+        
+    Returns:
+        flashcard_review_response: Next due time per card, and card IDs that are not enrolled
+    """
+    if len(request.reviews) > MAX_REVIEWS_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_REVIEWS_PER_REQUEST} reviews per request")
+    try:
+        loop = asyncio.get_running_loop()
+        next_due, not_found = await loop.run_in_executor(None, contextvars.copy_context().run, _review_service().submit_reviews, request.userId, request.reviews)
+        return flashcard_review_response(updated=len(next_due), not_found=not_found, next_due=next_due)
+    except Exception as e:
+        print(f"Error submitting flashcard reviews for user {request.userId}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error submitting flashcard reviews: {str(e)}")
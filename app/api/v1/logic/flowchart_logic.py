@@ -1,12 +1,30 @@
-from google import genai
-import json
+import asyncio
+import contextvars
 import os
-from typing import Dict, Any, List, Optional
-from app.models.BaseModel.flowchart import flowchart_response, Node, Nodes
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from typing import Dict, Any, Iterator, List, Optional
+from app.models.BaseModel.flowchart import flowchart_response, flowchart_outline, flowchart_expand_response, Node, Nodes
 from app.services.personalization.prompt_enhancer import enhance_prompt_with_personalization
+from app.services.llm.structured_output import generate_structured
+from app.services.llm.gemini_client import GeminiUnavailableError
+from app.services.streaming.gemini_stream import stream_json_events
+from app.services.streaming.incremental_json import format_sse
+from app.services.flowchart.graph import layout_flowchart
+from app.services.llm.token_counter import token_counter
+from app.services.llm.model_router import SHORT_TRANSFORM
+from app.services.text.similarity import normalize_text
+from app.services.text.output_language import enforce_output_language
 from dotenv import load_dotenv
 load_dotenv()
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+
+# Texts longer than this are turned into a flowchart section by section
+FLOWCHART_MAX_INPUT_TOKENS = int(os.getenv("FLOWCHART_MAX_INPUT_TOKENS", "12000"))
+FLOWCHART_SECTION_TOKENS = int(os.getenv("FLOWCHART_SECTION_TOKENS", "6000"))
+FLOWCHART_MAX_SECTIONS = int(os.getenv("FLOWCHART_MAX_SECTIONS", "12"))
+MAX_FLOWCHART_WORKERS = 4
+
+flowchart_executor = ThreadPoolExecutor(max_workers=MAX_FLOWCHART_WORKERS, thread_name_prefix="flowchart")
 
 class FlowchartGenerator:
     def __init__(self):
@@ -96,58 +114,12 @@ class FlowchartGenerator:
         # Enhance with personalization
         return enhance_prompt_with_personalization(base_prompt, userId)
     
-    def _parse_gemini_response(self, response_text: str) -> Dict[str, Any]:
-        """Parse and validate the Gemini API response."""
-        try:
-            # Clean the response text
-            cleaned_text = response_text.strip()
-            
-            # Remove any markdown code blocks if present
-            if cleaned_text.startswith('```json'):
-                cleaned_text = cleaned_text[7:-3]
-            elif cleaned_text.startswith('```'):
-                cleaned_text = cleaned_text[3:-3]
-            
-            # Parse JSON
-            parsed_data = json.loads(cleaned_text)
-            
-            # Validate required structure
-            if not isinstance(parsed_data, dict):
-                raise ValueError("Response must be a dictionary")
-            
-            if "title" not in parsed_data or "flowchart" not in parsed_data:
-                raise ValueError("Response must contain 'title' and 'flowchart' fields")
-            
-            if "nodes" not in parsed_data["flowchart"]:
-                raise ValueError("Flowchart must contain 'nodes' field")
-            
-            if not isinstance(parsed_data["flowchart"]["nodes"], list):
-                raise ValueError("Nodes must be a list")
-            
-            # Validate each node
-            for i, node in enumerate(parsed_data["flowchart"]["nodes"]):
-                if not isinstance(node, dict):
-                    raise ValueError(f"Node {i} must be a dictionary")
-                
-                if "label" not in node:
-                    raise ValueError(f"Node {i} must have a 'label' field")
-                
-                if "children" in node and node["children"] is not None:
-                    if not isinstance(node["children"], list):
-                        raise ValueError(f"Node {i} children must be a list or null")
-                    
-                    # Validate child indices
-                    for child_idx in node["children"]:
-                        if not isinstance(child_idx, int) or child_idx < 0 or child_idx >= len(parsed_data["flowchart"]["nodes"]):
-                            raise ValueError(f"Node {i} has invalid child index: {child_idx}")
-            
-            return parsed_data
-            
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid JSON response: {str(e)}")
-        except Exception as e:
-            raise ValueError(f"Error parsing response: {str(e)}")
-    
+    def _add_language_enforcement(self, prompt: str, language: Optional[str] = "English") -> str:
+        """Prefix the prompt with a system instruction that pins the output language."""
+        return f"""SYSTEM INSTRUCTION: You are a multilingual educational assistant. You MUST respond strictly in {language} language only, regardless of the input text language. Always translate concepts to {language} if needed.
+
+{prompt}"""
+
     def _create_fallback_flowchart(self, text: str, language: Optional[str] = "English") -> Dict[str, Any]:
         """Create a simple fallback flowchart when AI generation fails."""
         # Extract first few sentences or concepts for a basic flowchart
@@ -188,21 +160,16 @@ class FlowchartGenerator:
         title = title_translations.get(language or "English", title_translations["English"])
         main_topic_label = main_topic_translations.get(language or "English", main_topic_translations["English"])
         
+        # Empty sentences are skipped, so chain only the labels that are kept
+        labels = [main_topic_label] + [sentence.strip()[:80] for sentence in sentences[1:] if sentence.strip()]  # Limit length
         nodes = [
             {
-                "label": main_topic_label,
-                "children": [1] if len(sentences) > 1 else None
+                "label": label,
+                "children": [i + 1] if i < len(labels) - 1 else None
             }
+            for i, label in enumerate(labels)
         ]
         
-        for i, sentence in enumerate(sentences[1:], 1):
-            clean_sentence = sentence.strip()[:80]  # Limit length
-            if clean_sentence:
-                nodes.append({
-                    "label": clean_sentence,
-                    "children": [i + 1] if i < len(sentences) - 1 else None
-                })
-        
         return {
             "title": title,
             "flowchart": {
@@ -210,96 +177,315 @@ class FlowchartGenerator:
             }
         }
 
-    async def generate_flowchart(self, text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English") -> flowchart_response:
+    def _create_section_prompt(self, section: str, index: int, sections: int, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English") -> str:
+        """Prompt for the subtree of one section of a long text."""
+        base_prompt = f"""
+        You are an expert at creating educational flowcharts. The text below is section {index + 1} of {sections} of a longer document.
+        Create a hierarchical flowchart of the main concepts, processes, or relationships in this section only.
+
+        Text of the section:
+        {section}"""
+
+        if instruction and instruction.strip():
+            base_prompt += f"""
+
+        Special Instructions:
+        {instruction.strip()}"""
+
+        base_prompt += f"""
+
+        Return a JSON object with a "nodes" array:
+        1. Node 0 is the topic of this section (a short, descriptive label)
+        2. Each node has a "label" (max 80 characters) and "children", the indices of its child nodes, or null for leaf nodes
+        3. Go into the detail this section deserves: 5 to 20 nodes, up to 3 levels below the topic
+        4. Ensure all referenced indices exist in the nodes array
+
+        ⚠️ CRITICAL LANGUAGE REQUIREMENT: ALL labels MUST be written in {language} ONLY.
         """
-        Generate a flowchart based on the provided text using Gemini AI.
-        
+        return self._add_language_enforcement(enhance_prompt_with_personalization(base_prompt, userId), language)
+
+    def _create_outline_prompt(self, subtrees: List[Nodes], language: Optional[str] = "English") -> str:
+        """Prompt grouping the section topics of a long text into top-level branches."""
+        topics = []
+        for i, subtree in enumerate(subtrees):
+            details = ", ".join(subtree.nodes[child].label for child in subtree.nodes[0].children or [])
+            topics.append(f"{i}. {subtree.nodes[0].label}" + (f" ({details})" if details else ""))
+        topic_lines = "\n".join(topics)
+        return self._add_language_enforcement(f"""
+        The sections of a document cover the topics below, in order (number. topic (subtopics)):
+        {topic_lines}
+
+        Create the top level of a flowchart of the whole document:
+        - "title": a clear, descriptive title for the flowchart (max 100 characters)
+        - "root": the label of the root node, the document's main subject (max 80 characters)
+        - "groups": 2 to 6 main branches, in a logical order, each with a "label" (max 80 characters)
+          and "sections", the numbers of the sections it covers. Every section belongs to exactly one group.
+
+        ALL text MUST be in {language} ONLY.
+        """, language)
+
+    def _generate_section(self, section: str, index: int, sections: int, instruction: Optional[str], userId: Optional[str], language: Optional[str]) -> Optional[Nodes]:
+        try:
+            subtree = generate_structured(self._create_section_prompt(section, index, sections, instruction, userId, language), Nodes, "flowchart_section")
+            return subtree if subtree.nodes else None
+        except GeminiUnavailableError:
+            raise
+        except Exception as e:
+            print(f"Error generating flowchart section {index + 1}/{sections}: {str(e)}")
+            return None
+
+    def _merge_subtrees(self, outline: flowchart_outline, subtrees: List[Nodes]) -> Nodes:
+        """Attach the section subtrees under the outline's branches, remapping their indices."""
+        nodes: List[Node] = [Node(label=outline.root, children=[])]
+        placed = set()
+
+        def attach(subtree: Nodes) -> int:
+            offset = len(nodes)
+            for node in subtree.nodes:
+                nodes.append(Node(label=node.label, children=[child + offset for child in node.children or []] or None))
+            return offset
+
+        for group in outline.groups:
+            section_roots = []
+            for i in group.sections:
+                if 0 <= i < len(subtrees) and i not in placed:
+                    placed.add(i)
+                    section_roots.append(attach(subtrees[i]))
+            if not section_roots:
+                continue
+            if len(section_roots) == 1:
+                # A branch with one section: the section topic is the branch
+                nodes[0].children.append(section_roots[0])
+            else:
+                group_index = len(nodes)
+                nodes.append(Node(label=group.label, children=section_roots))
+                nodes[0].children.append(group_index)
+
+        # Sections the outline left out still belong to the document
+        for i, subtree in enumerate(subtrees):
+            if i not in placed:
+                nodes[0].children.append(attach(subtree))
+        return Nodes(nodes=nodes)
+
+    async def generate_hierarchical_flowchart(self, text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English") -> flowchart_response:
+        """
+        Generate a flowchart for a long text section by section.
+
+        The text is split into sections by tokens, a subtree is generated for every
+        section concurrently, and one more (small) call groups the section topics into
+        top-level branches under a root, to which the subtrees are attached.
+
         Args:
             text (str): The input text to create a flowchart from
             instruction (Optional[str]): Optional instruction for flowchart generation
             userId (Optional[str]): Optional user ID for personalization
-            
+            language (Optional[str]): Language of the flowchart
+
         Returns:
-            flowchart_response: The generated flowchart with title and nodes
+            flowchart_response: The merged flowchart, laid out
         """
+        loop = asyncio.get_running_loop()
+        sections = await loop.run_in_executor(None, contextvars.copy_context().run, token_counter.split_by_tokens, text, FLOWCHART_SECTION_TOKENS)
+        if len(sections) > FLOWCHART_MAX_SECTIONS:
+            # Keep the prompt count bounded: merge neighbouring sections
+            per_group = len(sections) / FLOWCHART_MAX_SECTIONS
+            sections = [
+                "\n\n".join(sections[round(i * per_group):round((i + 1) * per_group)])
+                for i in range(FLOWCHART_MAX_SECTIONS)
+            ]
+        print(f"Generating hierarchical flowchart from {len(sections)} sections")
+
+        results = await asyncio.gather(*[
+            # Carry the caller's context (e.g. its Gemini priority class) into the worker thread
+            loop.run_in_executor(flowchart_executor, contextvars.copy_context().run, self._generate_section, section, i, len(sections), instruction, userId, language)
+            for i, section in enumerate(sections)
+        ])
+        subtrees = [subtree for subtree in results if subtree is not None]
+        if not subtrees:
+            raise ValueError("No flowchart section could be generated")
+
         try:
-            # Create the personalized prompt
-            prompt = self._create_flowchart_prompt(text, instruction, userId, language)
+            outline = await loop.run_in_executor(
+                flowchart_executor,
+                contextvars.copy_context().run,
+                lambda: generate_structured(self._create_outline_prompt(subtrees, language), flowchart_outline, "flowchart_outline", task=SHORT_TRANSFORM),
+            )
+        except GeminiUnavailableError:
+            raise
+        except Exception as e:
+            print(f"Error generating flowchart outline, attaching sections to the root: {str(e)}")
+            outline = flowchart_outline(title=subtrees[0].nodes[0].label, root=subtrees[0].nodes[0].label, groups=[])
 
-            # Add additional system instruction to the prompt for language enforcement
-            enhanced_prompt = f"""SYSTEM INSTRUCTION: You are a multilingual educational assistant. You MUST respond strictly in {language} language only, regardless of the input text language. Always translate concepts to {language} if needed.
+        result = flowchart_response(title=outline.title, flowchart=self._merge_subtrees(outline, subtrees))
+        return await loop.run_in_executor(None, contextvars.copy_context().run, self._finish, result, language, userId)
 
-{prompt}"""
+    def _finish(self, result: flowchart_response, language: Optional[str], userId: Optional[str]) -> flowchart_response:
+        """Rewrite what drifted out of the requested language, then clean up and lay out the graph (blocking)"""
+        result = enforce_output_language(result, language, "flowchart", userId)
+        result.flowchart = layout_flowchart(result.flowchart)
+        return result
 
-            # Debug: Print language being used
-            print(f"DEBUG: Flowchart generation requested in language: {language}")
-            print(f"DEBUG: Enhanced prompt includes language enforcement for: {language}")
+    def _generate_single(self, text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English") -> flowchart_response:
+        """Flowchart for a text that fits one prompt (blocking: personalization and Gemini calls)"""
+        # Create the personalized prompt
+        prompt = self._create_flowchart_prompt(text, instruction, userId, language)
 
-            # Generate content using Gemini
-            response = client.models.generate_content(model="gemini-2.0-flash", contents=enhanced_prompt, config={"response_mime_type": "application/json"})
-            
-            if not response.text:
-                raise ValueError("Empty response from Gemini API")
-            
-            # Debug: Check response language
-            print(f"DEBUG: Raw response preview: {response.text[:200]}...")
+        # Add additional system instruction to the prompt for language enforcement
+        enhanced_prompt = self._add_language_enforcement(prompt, language)
 
-            # Parse the response
-            parsed_data = self._parse_gemini_response(response.text)
-            
-            # Additional language validation
-            title = parsed_data.get("title", "")
-            # Check for Portuguese words in title
-            portuguese_indicators = ["inteligência", "máquinas", "aprendizado", "tecnologia", "processamento", "linguagem"]
-            if language == "English" and any(word in title.lower() for word in portuguese_indicators):
-                print(f"WARNING: Generated title '{title}' appears to contain Portuguese words despite English request")
-                # Force English title
-                parsed_data["title"] = "Artificial Intelligence Concepts"
-                
-            # Check for Portuguese words in node labels
-            for node in parsed_data.get("flowchart", {}).get("nodes", []):
-                node_label = node.get("label", "")
-                if language == "English" and any(word in node_label.lower() for word in portuguese_indicators):
-                    print(f"WARNING: Node label '{node_label}' appears to contain Portuguese words")
-                    # You could implement translation here if needed            # Convert to Pydantic models
-            nodes = []
-            for node_data in parsed_data["flowchart"]["nodes"]:
-                nodes.append(Node(
-                    label=node_data["label"],
-                    children=node_data.get("children")
-                ))
-            
-            flowchart_nodes = Nodes(nodes=nodes)
-            
-            return flowchart_response(
-                title=parsed_data["title"],
-                flowchart=flowchart_nodes
-            )
+        # Debug: Print language being used
+        print(f"DEBUG: Flowchart generation requested in language: {language}")
+        print(f"DEBUG: Enhanced prompt includes language enforcement for: {language}")
+
+        # Generate content using Gemini, constrained to the response schema
+        result = generate_structured(enhanced_prompt, flowchart_response, "flowchart")
+
+        # Break cycles, prune unreachable nodes and lay the graph out once, here
+        return self._finish(result, language, userId)
+
+    def _relevant_text(self, text: str, label: str, path: Optional[List[str]] = None) -> str:
+        """The section of ``text`` sharing the most words with the node label (and its path)."""
+        sections = token_counter.split_by_tokens(text, FLOWCHART_SECTION_TOKENS)
+        if len(sections) == 1:
+            return sections[0]
+        words = set(normalize_text(" ".join([label] + (path or [])[-2:])).split())
+        def score(section: str) -> int:
+            return sum(word in words for word in normalize_text(section).split())
+        return max(sections, key=score)
+
+    def expand_node(self, label: str, path: Optional[List[str]] = None, existing_children: Optional[List[str]] = None, text: Optional[str] = None, max_children: int = 5, userId: Optional[str] = None, language: Optional[str] = "English") -> flowchart_expand_response:
+        """
+        Generate the children of one flowchart node on demand.
+
+        Args:
+            label (str): Label of the node to expand
+            path (Optional[List[str]]): Labels from the root down to the node's parent
+            existing_children (Optional[List[str]]): Children already shown, not to be repeated
+            text (Optional[str]): Source text to draw the children from
+            max_children (int): Most children to generate
+            userId (Optional[str]): Optional user ID for personalization
+            language (Optional[str]): Language of the labels
+
+        Returns:
+            flowchart_expand_response: Subtree rooted at the expanded node, laid out
+        """
+        context = f"Position in the flowchart: {' > '.join(path + [label])}" if path else f"Node: {label}"
+        base_prompt = f"""
+        You are expanding one node of an educational flowchart.
+        {context}
+
+        Create up to {max_children} child nodes that break "{label}" down into its main parts, steps or ideas.
+        Return a JSON object with a "nodes" array where node 0 is "{label}" itself with the indices of its children,
+        each child has a "label" (max 80 characters) and "children": null.
+        """
+        if existing_children:
+            existing = "\n".join(f"        - {child}" for child in existing_children)
+            base_prompt += f"""
+        The node already has these children, do not repeat them:
+{existing}
+        """
+        if text and text.strip():
+            base_prompt += f"""
+        Base the children on this text:
+        {token_counter.truncate_to_tokens(self._relevant_text(text, label, path), FLOWCHART_SECTION_TOKENS)}
+        """
+        base_prompt += f"""
+        ⚠️ CRITICAL LANGUAGE REQUIREMENT: ALL labels MUST be written in {language} ONLY.
+        """
+        prompt = self._add_language_enforcement(enhance_prompt_with_personalization(base_prompt, userId), language)
+        subtree = generate_structured(prompt, Nodes, "flowchart_expand", task=SHORT_TRANSFORM)
+        if not subtree.nodes:
+            subtree = Nodes(nodes=[Node(label=label)])
+        subtree.nodes[0].label = label
+        subtree = enforce_output_language(subtree, language, "flowchart_expand", userId)
+
+        # The prompt is only a request: drop children the node already has (or that repeat
+        # each other) and keep at most max_children
+        seen = {normalize_text(child) for child in existing_children or []}
+        children = []
+        for child in subtree.nodes[0].children or []:
+            key = normalize_text(subtree.nodes[child].label)
+            if child != 0 and key not in seen and len(children) < max_children:
+                seen.add(key)
+                children.append(child)
+        subtree.nodes[0].children = children or None
+        # Nodes left unreachable from the root are pruned by the layout
+        return flowchart_expand_response(label=label, flowchart=layout_flowchart(subtree))
+
+    async def generate_flowchart(self, text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English", hierarchical: Optional[bool] = None) -> flowchart_response:
+        """
+        Generate a flowchart based on the provided text using Gemini AI.
+        
+        Args:
+            text (str): The input text to create a flowchart from
+            instruction (Optional[str]): Optional instruction for flowchart generation
+            userId (Optional[str]): Optional user ID for personalization
+            hierarchical (Optional[bool]): Generate section by section; by default only
+                for texts above FLOWCHART_MAX_INPUT_TOKENS
             
+        Returns:
+            flowchart_response: The generated flowchart with title and nodes
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            # Token counts, Firestore reads and Gemini calls (with their quota waits and
+            # retry backoff) block, so they run in a worker thread, in the caller's context
+            if hierarchical is None:
+                hierarchical = await loop.run_in_executor(None, contextvars.copy_context().run, token_counter.count_tokens, text) > FLOWCHART_MAX_INPUT_TOKENS
+            if hierarchical:
+                return await self.generate_hierarchical_flowchart(text, instruction, userId, language)
+
+            return await loop.run_in_executor(None, contextvars.copy_context().run, self._generate_single, text, instruction, userId, language)
+
+        except GeminiUnavailableError:
+            raise
         except Exception as e:
             print(f"Error generating flowchart: {str(e)}")
             # Use fallback flowchart
             fallback_data = self._create_fallback_flowchart(text, language)
             
             # Convert fallback to Pydantic models
-            nodes = []
-            for node_data in fallback_data["flowchart"]["nodes"]:
-                nodes.append(Node(
-                    label=node_data["label"],
-                    children=node_data.get("children")
-                ))
-            
-            flowchart_nodes = Nodes(nodes=nodes)
+            fallback = flowchart_response.model_validate(fallback_data)
+            fallback.flowchart = layout_flowchart(fallback.flowchart)
+            return fallback
+
+    def stream_flowchart(self, text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English") -> Iterator[str]:
+        """
+        Generate a flowchart as server-sent events, sending each node as soon as it is complete.
+        
+        Args:
+            text (str): The input text to create a flowchart from
+            instruction (Optional[str]): Optional instruction for flowchart generation
+            userId (Optional[str]): Optional user ID for personalization
             
-            return flowchart_response(
-                title=fallback_data["title"],
-                flowchart=flowchart_nodes
-            )
+        Returns:
+            Iterator[str]: ``title`` and ``node`` events, then ``done`` with the complete
+            flowchart_response, or ``error``
+        """
+        try:
+            # Streaming sends one prompt; long texts are cut to what a single prompt handles well
+            text = token_counter.truncate_to_tokens(text, FLOWCHART_MAX_INPUT_TOKENS)
+            prompt = self._add_language_enforcement(self._create_flowchart_prompt(text, instruction, userId, language), language)
+            for event in stream_json_events(prompt, item_paths=["flowchart.nodes"], schema=flowchart_response, call_site="flowchart"):
+                if event["type"] == "field" and event["key"] == "title":
+                    yield format_sse("title", {"title": event["value"]})
+                elif event["type"] == "item":
+                    # Child indices may point at nodes that have not arrived yet; clients link them on "done",
+                    # which carries the cleaned-up, laid-out graph
+                    node = Node.model_validate(event["value"])
+                    yield format_sse("node", {"index": event["index"], **node.model_dump()})
+                elif event["type"] == "result":
+                    result = enforce_output_language(event["value"], language, "flowchart", userId)
+                    result.flowchart = layout_flowchart(result.flowchart)
+                    yield format_sse("done", result.model_dump())
+        except Exception as e:
+            print(f"Error streaming flowchart: {str(e)}")
+            yield format_sse("error", {"error": f"Error generating flowchart: {str(e)}"})
 
 # Global instance
 flowchart_generator = FlowchartGenerator()
 
-async def create_flowchart_logic(text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English") -> flowchart_response:
+async def create_flowchart_logic(text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English", hierarchical: Optional[bool] = None) -> flowchart_response:
     """
     Main function to create flowchart logic based on input text.
     
@@ -307,8 +493,54 @@ async def create_flowchart_logic(text: str, instruction: Optional[str] = None, u
         text (str): The input text to analyze and create flowchart from
         instruction (Optional[str]): Optional instruction for flowchart generation
         userId (Optional[str]): Optional user ID for personalization
+        hierarchical (Optional[bool]): Build the flowchart section by section
         
     Returns:
         flowchart_response: Generated flowchart with title and hierarchical nodes
     """
-    return await flowchart_generator.generate_flowchart(text, instruction, userId, language)
\ No newline at end of file
+    return await flowchart_generator.generate_flowchart(text, instruction, userId, language, hierarchical)
+
+async def expand_flowchart_node_logic(request) -> flowchart_expand_response:
+    """
+    Generate the children of a flowchart node on demand.
+    
+    Args:
+        request: flowchart_expand_request
+        
+    Returns:
+        flowchart_expand_response: Subtree rooted at the expanded node
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            flowchart_executor,
+            contextvars.copy_context().run,
+            lambda: flowchart_generator.expand_node(
+                request.label,
+                request.path,
+                request.existing_children,
+                request.text,
+                request.max_children,
+                request.userId,
+                request.language,
+            ),
+        )
+    except GeminiUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error expanding flowchart node: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error expanding flowchart node: {str(e)}")
+
+def stream_flowchart_logic(text: str, instruction: Optional[str] = None, userId: Optional[str] = None, language: Optional[str] = "English") -> Iterator[str]:
+    """
+    Streaming variant of create_flowchart_logic.
+    
+    Args:
+        text (str): The input text to analyze and create flowchart from
+        instruction (Optional[str]): Optional instruction for flowchart generation
+        userId (Optional[str]): Optional user ID for personalization
+        
+    Returns:
+        Iterator[str]: Server-sent events with the flowchart nodes as they are generated
+    """
+    return flowchart_generator.stream_flowchart(text, instruction, userId, language)
@@ -1,3 +1,5 @@
+import asyncio
+import contextvars
 from app.models.BaseModel.generateQuestionsBaseModel import generateQuestionRequest, generateQuestionResponse
 from app.services.YouTube.getYouTubeId import GetYoutubeURL
 from app.services.YouTube.getYouTubeTranscript import GetYouTubeTranscript
@@ -16,7 +18,14 @@ async def generate_question_logic(request: generateQuestionRequest) -> generateQ
     quiz_type = request.quiz_type
     language = request.language
     userId = request.userId
-    questions, title = GetQuestionsModel().execute_model(text=transcript, number=numbers, difficulty=difficulty, quiz_type=quiz_type, userId=userId, language=language)
+    # Personalization reads and Gemini calls (with their quota waits and retry backoff)
+    # block, so the quiz is generated in a worker thread, in the caller's context
+    loop = asyncio.get_running_loop()
+    questions, title = await loop.run_in_executor(
+        None,
+        contextvars.copy_context().run,
+        lambda: GetQuestionsModel().execute_model(text=transcript, number=numbers, difficulty=difficulty, quiz_type=quiz_type, userId=userId, language=language),
+    )
     if not questions:
         return generateQuestionResponse(title="no Title", questions=[Qu(id=1, type="mix", difficulty="Easy", question="No questions generated", correct="The transcript may not contain enough information to generate questions.", explanation="Please provide a more detailed transcript or adjust the parameters.")])
     # Convert questions to a list of dictionaries
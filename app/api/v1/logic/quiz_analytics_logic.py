@@ -0,0 +1,63 @@
+import asyncio
+import contextvars
+import datetime
+from fastapi import HTTPException
+from app.models.BaseModel.analytics import quiz_attempt, quiz_attempt_response, quiz_analytics_response
+from app.services.firebase.config import get_firebase_db
+from app.services.firebase.quiz_analytics import QuizAnalyticsService, local_date
+
+MAX_TREND_DAYS = 365
+
+
+def _analytics_service() -> QuizAnalyticsService:
+    return QuizAnalyticsService(get_firebase_db())
+
+
+def _read_analytics(userId: str, days: int, tz_offset_minutes: int) -> quiz_analytics_response:
+    service = _analytics_service()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    since = local_date(now - datetime.timedelta(days=days - 1), tz_offset_minutes)
+    return quiz_analytics_response(
+        summary=service.get_or_rebuild_summary(userId),
+        trend=service.get_trend(userId, since),
+    )
+
+
+async def record_quiz_attempt_logic(request: quiz_attempt) -> quiz_attempt_response:
+    """
+    Add a submitted quiz attempt to the user's analytics rollups.
+    
+    Args:
+        request: The attempt's ID ({quizId}_{attempt_number}), quiz type, difficulty, question and correct answer counts and time taken
+        
+    Returns:
+        quiz_attempt_response: Whether the attempt was counted (False for a repeated attemptId)
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        recorded = await loop.run_in_executor(None, contextvars.copy_context().run, _analytics_service().record_attempt, request)
+        return quiz_attempt_response(recorded=recorded)
+    except Exception as e:
+        print(f"Error recording quiz attempt for user {request.userId}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error recording quiz attempt: {str(e)}")
+
+
+async def get_quiz_analytics_logic(userId: str, days: int = 30, tz_offset_minutes: int = 0) -> quiz_analytics_response:
+    """
+    Lifetime accuracy (overall, by difficulty and by quiz type) and the daily score trend.
+    
+    Args:
+        userId (str): The user
+        days (int): Length of the trend, ending today
+        tz_offset_minutes (int): The user's offset from UTC, e.g. 330 for IST
+        
+    Returns:
+        quiz_analytics_response: The summary and one entry per day with attempts
+    """
+    days = max(1, min(days, MAX_TREND_DAYS))
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, contextvars.copy_context().run, _read_analytics, userId, days, tz_offset_minutes)
+    except Exception as e:
+        print(f"Error fetching quiz analytics for user {userId}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error fetching quiz analytics: {str(e)}")
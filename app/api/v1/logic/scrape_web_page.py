@@ -1,8 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
 import asyncio
+import contextvars
 import random
-from readability import Document
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urlparse
+from app.models.BaseModel.common import bulkScrapedWebPageResult
+from app.services.lazy_imports import lazy_import
+from app.services.tracing import span, traced
+
+requests = lazy_import("requests")
+bs4 = lazy_import("bs4")
 
 user_agents = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3',
@@ -17,50 +26,87 @@ user_agents = [
     'Mozilla/5.0 (iPad; CPU OS 10_3 like Mac OS X) AppleWebKit/603.1.30 (KHTML, like Gecko) Version/10.0 Mobile/14E277 Safari/602.1'
 ]
 
+# Bulk scraping limits: total pages fetched at once, and pages fetched at once from a single host
+MAX_CONCURRENT_SCRAPES = 8
+MAX_CONCURRENT_PER_HOST = 2
+MAX_URLS_PER_BATCH = 50
+# Single-page requests fetched at once
+MAX_CONCURRENT_PAGE_SCRAPES = 8
+
+# requests is blocking, so page fetches run on dedicated pools: one sized to the bulk
+# limit, and one for single pages so they never queue behind a bulk reading list
+scraper_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SCRAPES, thread_name_prefix="scraper")
+page_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_PAGE_SCRAPES, thread_name_prefix="page-scraper")
+
+@traced("scrape.page")
+def fetch_page_text(url: str) -> str:
+    """
+    Download a webpage and return its cleaned text content. Raises on network errors.
+    """
+    headers = {
+        'User-Agent': random.choice(user_agents)
+    }
+    with span("scrape.fetch", url=url):
+        html = requests.get(url, headers=headers, timeout=10)
+    soup = bs4.BeautifulSoup(html.text, 'html.parser')
+    # print("Full HTML content:", soup.prettify()[:1000])  # Print first 1000 characters of HTML
+    body = soup.find('body')
+    # print("Body content:", body)
+    soup = bs4.BeautifulSoup(str(body), 'html.parser')
+    for script in soup(["script", "style"]):
+        script.extract()  # Remove these two elements from the BS4 object
+    for script in soup(["nav", "footer", "aside", "header"]):
+        script.extract()
+    cleaned_text = soup.get_text(separator='\n')
+    cleaned_text = ' '.join([line.strip() for line in cleaned_text.splitlines() if line.strip()])
+    return cleaned_text
+
+async def fetch_in_executor(executor: ThreadPoolExecutor, url: str, timeout: float) -> str:
+    """
+    Run fetch_page_text in ``executor``, timing out ``timeout`` seconds after a worker
+    picks it up: time spent queued behind other fetches does not count.
+
+    Raises:
+        asyncio.TimeoutError: If the fetch took longer than ``timeout``
+    """
+    loop = asyncio.get_running_loop()
+    started = asyncio.Event()
+
+    def fetch() -> str:
+        loop.call_soon_threadsafe(started.set)
+        return fetch_page_text(url)
+
+    future = loop.run_in_executor(executor, contextvars.copy_context().run, fetch)
+    try:
+        await started.wait()
+    except asyncio.CancelledError:
+        # Not started yet: drop it from the queue
+        future.cancel()
+        raise
+    return await asyncio.wait_for(future, timeout=timeout)
+
 async def scrape_web_page(url: str) -> str:
     """
     Scrape text content from a webpage.
     """
-    try:
-        headers = {
-            'User-Agent': random.choice(user_agents)
-        }
-        html = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(html.text, 'html.parser')
-        # print("Full HTML content:", soup.prettify()[:1000])  # Print first 1000 characters of HTML
-        body = soup.find('body')
-        # print("Body content:", body)
-        soup = BeautifulSoup(str(body), 'html.parser')
-        for script in soup(["script", "style"]):
-            script.extract()  # Remove these two elements from the BS4 object
-        for script in soup(["nav", "footer", "aside", "header"]):
-            script.extract()
-        cleaned_text = soup.get_text(separator='\n')
-        cleaned_text = ' '.join([line.strip() for line in cleaned_text.splitlines() if line.strip()])
-        
-        # html = requests.get(url, headers=headers, timeout=10)
-        # cleaned_text = BeautifulSoup(html.text, 'html.parser').get_text(separator="\n")
-        # cleaned_text = BeautifulSoup(cleaned_text, 'html.parser').get_text(separator="\n")
-        # cleaned_text = cleaned_text.replace('\n', ' ')
-        # cleaned_text = ' '.join([line.strip() for line in cleaned_text.splitlines() if line.strip()])
-        return cleaned_text
-    except Exception as e:
-        print("Error scraping webpage:", e)
-        return f"Error {e}"
+    return await run_with_timeout(url)
 
 async def run_with_timeout(url: str, timeout: int = 10) -> str:
     """
-    Run scrape_web_page with a timeout.
+    Scrape a webpage with a timeout.
     If it exceeds the timeout, return partial text or fallback message.
     """
     try:
-        return await asyncio.wait_for(scrape_web_page(url), timeout=timeout)
+        return await fetch_in_executor(page_executor, url, timeout)
     except asyncio.TimeoutError:
         return f"[Timeout reached after {timeout}s] Returning partial or no content."
+    except Exception as e:
+        print("Error scraping webpage:", e)
+        return f"Error {e}"
 
-async def scrape_web_page_logic(url: str) -> str:
+def validate_url(url: str) -> Optional[str]:
     """
-    Logic to scrape a web page and return its text content.
+    Return an error message if the URL cannot be scraped, otherwise None.
     """
     if not url.startswith(('http://', 'https://')):
         # raise ValueError("Invalid URL. Please include http:// or https://")
@@ -69,8 +115,66 @@ async def scrape_web_page_logic(url: str) -> str:
     if url.endswith(('.pdf', '.doc', '.docx')):
         # raise ValueError("URL points to a document. Please use the document upload feature.")
         return "Error: URL points to a document. Please use the document upload feature."
+    return None
+
+async def scrape_web_page_logic(url: str) -> str:
+    """
+    Logic to scrape a web page and return its text content.
+    """
+    error = validate_url(url)
+    if error:
+        return error
     print("Starting to scrape URL:", url)
     text = await run_with_timeout(url, timeout=10)
     # print("Scraped text:", text)
     print("Scraped text length:", len(text))
-    return text
\ No newline at end of file
+    return text
+
+async def scrape_web_pages_logic(
+    urls: List[str],
+    max_concurrency: int = MAX_CONCURRENT_SCRAPES,
+    max_per_host: int = MAX_CONCURRENT_PER_HOST,
+    timeout: int = 10,
+) -> AsyncIterator[bulkScrapedWebPageResult]:
+    """
+    Scrape many web pages concurrently and yield each result as soon as it completes.
+
+    Fetches are bounded by a global limit and a per-host limit so a reading list that
+    points mostly at one site does not hammer it. Results arrive in completion order;
+    use `index` to map them back to the request.
+    """
+    global_limit = asyncio.Semaphore(max_concurrency)
+    host_limits: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(max_per_host))
+
+    async def scrape_one(index: int, url: str) -> bulkScrapedWebPageResult:
+        started = time.perf_counter()
+        text: Optional[str] = None
+        error = validate_url(url)
+        if not error:
+            host = urlparse(url).netloc.lower()
+            try:
+                async with host_limits[host], global_limit:
+                    # Other bulk requests share the pool; the timeout starts when this page's fetch does
+                    text = await fetch_in_executor(scraper_executor, url, timeout)
+            except asyncio.TimeoutError:
+                error = f"Timeout reached after {timeout}s"
+            except Exception as e:
+                error = f"Error {e}"
+        return bulkScrapedWebPageResult(
+            index=index,
+            url=url,
+            text=text,
+            error=error,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+
+    tasks = [asyncio.create_task(scrape_one(i, url)) for i, url in enumerate(urls)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            result = await finished
+            print(f"Scraped {result.url} in {result.elapsed_ms}ms" + (f" ({result.error})" if result.error else ""))
+            yield result
+    finally:
+        # Client disconnected mid-stream: stop waiting on the remaining pages
+        for task in tasks:
+            task.cancel()
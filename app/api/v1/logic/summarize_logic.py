@@ -1,16 +1,22 @@
 import json
 import os
-from google import genai
-from typing import Dict, List, Union, Any, TypedDict, Optional
+from typing import Dict, Iterator, List, Union, Any, TypedDict, Optional, Tuple, Type
 import re
 import math
 import asyncio
+import contextvars
 from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from app.services.personalization.prompt_enhancer import enhance_prompt_with_personalization
+from app.models.BaseModel.summrize import paragraph_summary, bullet_summary
+from app.services.llm.structured_output import generate_structured
+from app.services.llm.token_counter import token_counter
+from app.services.streaming.gemini_stream import stream_json_events
+from app.services.llm.model_router import SHORT_TRANSFORM, LONG_GENERATE
+from app.services.text.output_language import enforce_output_language
+from app.services.streaming.incremental_json import format_sse
+from app.services.tracing import traced
 load_dotenv()
-# Configure Gemini API
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
 class SummarizeResponse(TypedDict):
     success: bool
@@ -28,56 +34,21 @@ class TextSummarizer:
     def __init__(self):
         # Gemini's approximate token limit (leaving buffer for prompt and response)
         self.max_tokens_per_request = 25000
-        # Approximate characters per token (rough estimate)
-        self.chars_per_token = 4
-        self.max_chars_per_chunk = self.max_tokens_per_request * self.chars_per_token
 
     def estimate_tokens(self, text: str) -> int:
-        """Estimate token count based on character count"""
-        return len(text) // self.chars_per_token
+        """Token count as the model sees it (falls back to a per-script estimate)"""
+        return token_counter.count_tokens(text)
 
+    @traced("summarize.chunking")
     def split_text_into_chunks(self, text: str) -> List[str]:
         """Split text into chunks that fit within token limits"""
-        if len(text) <= self.max_chars_per_chunk:
-            return [text]
-        
-        chunks = []
-        sentences = re.split(r'[.!?]+', text)
-        current_chunk = ""
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-                
-            # If adding this sentence would exceed the limit, start a new chunk
-            if len(current_chunk + sentence) > self.max_chars_per_chunk:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = sentence + ". "
-                else:
-                    # If a single sentence is too long, split it by words
-                    words = sentence.split()
-                    word_chunk = ""
-                    for word in words:
-                        if len(word_chunk + word) > self.max_chars_per_chunk:
-                            if word_chunk:
-                                chunks.append(word_chunk.strip())
-                                word_chunk = word + " "
-                            else:
-                                # Single word is too long, force split
-                                chunks.append(word)
-                        else:
-                            word_chunk += word + " "
-                    if word_chunk:
-                        current_chunk = word_chunk
-            else:
-                current_chunk += sentence + ". "
-        
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
-        
-        return chunks
+        return token_counter.split_by_tokens(text, self.max_tokens_per_request)
+
+    def summary_schema(self, format_type: str) -> Type[Union[paragraph_summary, bullet_summary]]:
+        """Response schema for the requested format"""
+        if format_type.lower() in ["bullet_points", "bullets"]:
+            return bullet_summary
+        return paragraph_summary
 
     def create_summary_prompt(self, text: str, format_type: str, length: str = "medium", is_chunk: bool = False, userId: Optional[str] = None, language: Optional[str] = "English") -> str:
         """Create appropriate prompt based on format, length and whether it's a chunk"""
@@ -156,26 +127,17 @@ class TextSummarizer:
         
         return base_prompt
 
+    @traced("summarize.chunk")
     def generate_summary_for_chunk(self, text: str, format_type: str, length: str = "medium", is_chunk: bool = False, userId: Optional[str] = None, language: Optional[str] = "English") -> Dict[str, Any]:
         """Generate summary for a single chunk of text"""
         try:
             prompt = self.create_summary_prompt(text, format_type, length, is_chunk, userId, language)
-            response = client.models.generate_content(model="gemini-2.0-flash", contents=prompt, config={"response_mime_type": "application/json"})
-            if response.text is None:
-                raise ValueError("No text received from LLM.")
-            data = json.loads(response.text)
-            return {
-                "title": data.get("title", ""),
-                "summary": data.get("summary", "")
-            }
+            return generate_structured(prompt, self.summary_schema(format_type), "summary").model_dump()
         except Exception as e:
             raise Exception(f"Error generating summary: {str(e)}")
 
-    def combine_chunk_summaries(self, summaries: List[Dict[str, Any]], format_type: str, length: str = "medium", userId: Optional[str] = None, language: Optional[str] = "English") -> Dict[str, Any]:
-        """Combine multiple chunk summaries into a final summary"""
-        if len(summaries) == 1:
-            return summaries[0]
-        
+    def create_combine_prompt(self, summaries: List[Dict[str, Any]], format_type: str, length: str = "medium", userId: Optional[str] = None, language: Optional[str] = "English") -> Tuple[str, str]:
+        """Create the prompt that merges chunk summaries. Returns (prompt, fallback title)"""
         # Extract titles and summaries
         titles = [s.get("title", "") for s in summaries]
         summary_texts = [s.get("summary", "") for s in summaries]
@@ -266,20 +228,31 @@ class TextSummarizer:
         
         # Enhance the prompt with personalization if userId is provided
         if userId:
-            prompt = enhance_prompt_with_personalization(base_prompt, userId)
-        else:
-            prompt = base_prompt
+            return enhance_prompt_with_personalization(base_prompt, userId), combined_title
+        
+        return base_prompt, combined_title
+
+    @traced("summarize.combine")
+    def combine_chunk_summaries(self, summaries: List[Dict[str, Any]], format_type: str, length: str = "medium", userId: Optional[str] = None, language: Optional[str] = "English") -> Dict[str, Any]:
+        """Combine multiple chunk summaries into a final summary"""
+        if len(summaries) == 1:
+            return summaries[0]
+        
+        prompt, combined_title = self.create_combine_prompt(summaries, format_type, length, userId, language)
+        summary_texts = [s.get("summary", "") for s in summaries]
         
         try:
-            response = client.models.generate_content(model="gemini-2.0-flash", contents=prompt, config={"response_mime_type": "application/json"})
-            if response.text is None:
-                raise ValueError("No text received from LLM.")
-            return json.loads(response.text)
+            return generate_structured(prompt, self.summary_schema(format_type), "summary_combine", task=SHORT_TRANSFORM).model_dump()
         except Exception as e:
-            # If combining fails, return fallback structure
+            # If combining fails, merge the chunk summaries locally rather than dropping all but the first
+            print(f"Combining chunk summaries failed, returning them merged as-is: {e}")
+            if format_type.lower() in ["bullet_points", "bullets"]:
+                merged = [bullet for summary in summary_texts for bullet in (summary if isinstance(summary, list) else [summary]) if bullet]
+            else:
+                merged = "\n\n".join(summary if isinstance(summary, str) else " ".join(summary) for summary in summary_texts)
             return {
                 "title": combined_title,
-                "summary": summary_texts[0] if summary_texts else ""
+                "summary": merged
             }
 
     def summarize_text(self, text: str, format_type: str = "paragraph", length: str = "medium", userId: Optional[str] = None, language: Optional[str] = "English") -> Dict[str, Any]:
@@ -297,12 +270,13 @@ class TextSummarizer:
         text = text.strip()
         
         # Check if text needs to be chunked
-        if len(text) <= self.max_chars_per_chunk:
+        chunks = self.split_text_into_chunks(text)
+        if len(chunks) == 1:
             # Text is small enough, summarize directly
-            return self.generate_summary_for_chunk(text, format_type, length, False, userId, language)
+            summary = self.generate_summary_for_chunk(text, format_type, length, False, userId, language)
+            return enforce_output_language(summary, language, "summary", userId)
         else:
             # Text is too large, need to chunk it
-            chunks = self.split_text_into_chunks(text)
             print(f"Text split into {len(chunks)} chunks for processing")
             
             # Generate summaries for each chunk
@@ -314,7 +288,35 @@ class TextSummarizer:
             
             # Combine all chunk summaries into final summary
             final_summary = self.combine_chunk_summaries(chunk_summaries, format_type, length, userId, language)
-            return final_summary
+            return enforce_output_language(final_summary, language, "summary", userId)
+
+    def stream_summary(self, text: str, format_type: str = "paragraph", length: str = "medium", userId: Optional[str] = None, language: Optional[str] = "English") -> Iterator[Dict[str, Any]]:
+        """
+        Summarize text, yielding the final summary while it is being generated.
+
+        Long texts are still summarized chunk by chunk first; only the last call (the
+        summary itself, or the combination of the chunk summaries) is streamed.
+        Yields ``progress`` events for the chunks, then the incremental JSON events
+        (title field, bullet items, paragraph deltas) and a final ``result``.
+        """
+        text = text.strip()
+        chunks = self.split_text_into_chunks(text)
+        if len(chunks) == 1:
+            prompt = self.create_summary_prompt(text, format_type, length, False, userId, language)
+            call_site, task = "summary", LONG_GENERATE
+        else:
+            chunk_summaries = []
+            for i, chunk in enumerate(chunks, 1):
+                yield {"type": "progress", "chunk": i, "chunks": len(chunks)}
+                chunk_summaries.append(self.generate_summary_for_chunk(chunk, format_type, length, True, userId, language))
+            prompt, _ = self.create_combine_prompt(chunk_summaries, format_type, length, userId, language)
+            call_site, task = "summary_combine", SHORT_TRANSFORM
+
+        # Bullet summaries arrive as array items, paragraph summaries as text deltas
+        for event in stream_json_events(prompt, item_paths=["summary"], delta_paths=["summary"], schema=self.summary_schema(format_type), call_site=call_site, task=task):
+            if event["type"] == "result":
+                event = {"type": "result", "value": enforce_output_language(event["value"].model_dump(), language, "summary", userId)}
+            yield event
 
 # Initialize the summarizer
 text_summarizer = TextSummarizer()
@@ -370,6 +372,7 @@ async def summarize_text_logic(request) -> SummarizeResponse:
         with ThreadPoolExecutor() as executor:
             result = await loop.run_in_executor(
                 executor, 
+                contextvars.copy_context().run,
                 text_summarizer.summarize_text, 
                 text, 
                 format_type,
@@ -416,3 +419,52 @@ async def summarize_text_logic(request) -> SummarizeResponse:
             "compression_ratio": None
         }
 
+def stream_summarize_text_logic(request) -> Iterator[str]:
+    """
+    Streaming variant of summarize_text_logic, as server-sent events.
+
+    Events: ``progress`` while long texts are summarized chunk by chunk, ``title``,
+    ``bullet`` for each bullet point or ``delta`` for each piece of paragraph text,
+    then ``done`` with the same payload as the /summarize response, or ``error``.
+    """
+    text = request.text
+    format_type = request.format or "paragraph"
+    length = request.length or "medium"
+    if format_type.lower() not in ["paragraph", "bullet_points", "bullets"]:
+        format_type = "paragraph"
+    if length.lower() not in ["small", "medium", "large"]:
+        length = "medium"
+
+    if not text or not text.strip():
+        yield format_sse("error", {"error": "Text cannot be empty"})
+        return
+
+    try:
+        for event in text_summarizer.stream_summary(text, format_type, length, request.userId, request.language):
+            if event["type"] == "progress":
+                yield format_sse("progress", {"chunk": event["chunk"], "chunks": event["chunks"]})
+            elif event["type"] == "field" and event["key"] == "title":
+                yield format_sse("title", {"title": event["value"]})
+            elif event["type"] == "item":
+                yield format_sse("bullet", {"index": event["index"], "text": event["value"]})
+            elif event["type"] == "delta":
+                yield format_sse("delta", {"text": event["text"]})
+            elif event["type"] == "result":
+                summary = event["value"].get("summary", "")
+                original_length = len(text)
+                summary_length = len(str(summary)) if summary else 0
+                yield format_sse("done", {
+                    "success": True,
+                    "error": None,
+                    "summary": summary,
+                    "title": event["value"].get("title", "Summary"),
+                    "format": format_type,
+                    "chunks_processed": len(text_summarizer.split_text_into_chunks(text.strip())),
+                    "original_length": original_length,
+                    "summary_length": summary_length,
+                    "estimated_tokens": text_summarizer.estimate_tokens(text),
+                    "compression_ratio": round(summary_length / original_length, 2) if original_length > 0 else 0
+                })
+    except Exception as e:
+        print(f"Error during streamed summarization: {e}")
+        yield format_sse("error", {"error": f"Error during summarization: {str(e)}"})
@@ -0,0 +1,88 @@
+from fastapi import HTTPException
+from typing import Any, List, Tuple
+from app.models.BaseModel.translation import structured_translation_request, structured_translation_response
+from app.services.text.change_language import translate_many, translation_error
+from app.services.llm.rate_limiter import priority, BULK
+
+# (object, attribute name, list index or None) pointing at one translatable string
+FieldRef = Tuple[Any, str, Any]
+
+def collect_translatable_fields(request: structured_translation_request) -> List[FieldRef]:
+    """
+    Walk the flashcards, quiz and flowchart in the request and collect every user-facing string.
+    """
+    fields: List[FieldRef] = []
+
+    if request.flashcards:
+        fields.append((request.flashcards, "title", None))
+        for card in request.flashcards.flashcards:
+            fields.append((card, "question", None))
+            fields.append((card, "answer", None))
+
+    if request.quiz:
+        if request.quiz.title:
+            fields.append((request.quiz, "title", None))
+        for question in request.quiz.questions:
+            fields.append((question, "question", None))
+            fields.append((question, "explanation", None))
+            for i in range(len(question.options or [])):
+                fields.append((question, "options", i))
+            # Short-answer questions carry the expected answer as text; mcq and true/false do not
+            if question.type.lower().startswith("short") and isinstance(question.correct, str):
+                fields.append((question, "correct", None))
+
+    if request.flowchart:
+        fields.append((request.flowchart, "title", None))
+        for node in request.flowchart.flowchart.nodes:
+            fields.append((node, "label", None))
+
+    return fields
+
+def _read(field: FieldRef) -> str:
+    obj, attr, index = field
+    value = getattr(obj, attr)
+    return value[index] if index is not None else value
+
+def _write(field: FieldRef, value: str) -> None:
+    obj, attr, index = field
+    if index is None:
+        setattr(obj, attr, value)
+    else:
+        getattr(obj, attr)[index] = value
+
+async def translate_structured_logic(request: structured_translation_request) -> structured_translation_response:
+    """
+    Translate a whole flashcard set, quiz and/or flowchart in one batched engine call.
+
+    Args:
+        request (structured_translation_request): The artifacts to translate and the target language
+
+    Returns:
+        structured_translation_response: The same artifacts with every text field translated
+    """
+    if not request.target_language.strip():
+        raise HTTPException(status_code=400, detail="Target language cannot be empty")
+    if not (request.flashcards or request.quiz or request.flowchart):
+        raise HTTPException(status_code=400, detail="Provide flashcards, quiz or flowchart to translate")
+
+    fields = collect_translatable_fields(request)
+    texts = [_read(field) for field in fields]
+
+    try:
+        # Whole study sets are batch work; single-text requests keep precedence for the Gemini quota
+        with priority(BULK):
+            batch = await translate_many(texts, request.target_language, request.userId)
+    except Exception as e:
+        raise translation_error(e, request.target_language)
+    print(f"Structured translation: {len(texts)} fields, {batch['segments']} unique segments, {batch['cached_segments']} cached")
+
+    for field, translated in zip(fields, batch["translations"]):
+        _write(field, translated)
+
+    return structured_translation_response(
+        flashcards=request.flashcards,
+        quiz=request.quiz,
+        flowchart=request.flowchart,
+        strings_translated=len(texts),
+        cache_hit_ratio=batch["cache_hit_ratio"],
+    )
@@ -1,18 +1,25 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Optional
 from app.models.BaseModel.generateQuestionsBaseModel import generateQuestionRequest, generateQuestionResponse
 from app.models.BaseModel.summrize import summarize_textRequest, summarize_textResponse
-from app.models.BaseModel.flowchart import flowchart_request, flowchart_response
-from app.models.BaseModel.flashcard import flashcard_request, flashcard_response
-from app.api.v1.logic.summarize_logic import summarize_text_logic
-from app.api.v1.logic.flowchart_logic import create_flowchart_logic
-from app.api.v1.logic.flashcard_logic import create_flashcard_logic
+from app.models.BaseModel.flowchart import flowchart_request, flowchart_response, flowchart_expand_request, flowchart_expand_response
+from app.models.BaseModel.flashcard import flashcard_request, flashcard_response, flashcard_enroll_request, flashcard_enroll_response, due_flashcards_response, flashcard_review_request, flashcard_review_response
+from app.api.v1.logic.summarize_logic import summarize_text_logic, stream_summarize_text_logic
+from app.api.v1.logic.flowchart_logic import create_flowchart_logic, stream_flowchart_logic, expand_flowchart_node_logic
+from app.api.v1.logic.flashcard_logic import create_flashcard_logic, stream_flashcard_logic
+from app.api.v1.logic.flashcard_review_logic import enroll_flashcards_logic, get_due_flashcards_logic, submit_flashcard_reviews_logic
+from app.models.BaseModel.analytics import quiz_attempt, quiz_attempt_response, quiz_analytics_response
+from app.api.v1.logic.quiz_analytics_logic import record_quiz_attempt_logic, get_quiz_analytics_logic
 from app.models.BaseModel.mongo.Schema import UserResponse, User
 from app.api.v1.logic.generate_questions import generate_question_logic
 from app.api.v1.logic.extract_text_from_pdf import extract_text_logic
-from app.api.v1.logic.scrape_web_page import scrape_web_page_logic
-from app.models.BaseModel.common import scrapedWebPageResponse, scrapedWebPageRequest, YouTubeTranscriptRequest, YouTubeTranscriptResponse, TranslationRequest, TranslationResponse
+from app.api.v1.logic.scrape_web_page import scrape_web_page_logic, scrape_web_pages_logic, MAX_URLS_PER_BATCH
+from app.models.BaseModel.common import scrapedWebPageResponse, scrapedWebPageRequest, bulkScrapedWebPageRequest, YouTubeTranscriptRequest, YouTubeTranscriptResponse, TranslationRequest, TranslationResponse
 from app.api.v1.logic.extract_text_from_youtube import extract_text_from_youtube_logic
 from app.services.text.change_language import change_language, get_translation_with_context
+from app.models.BaseModel.translation import structured_translation_request, structured_translation_response
+from app.api.v1.logic.translate_structured_logic import translate_structured_logic
 
 router = APIRouter()
 
@@ -59,11 +66,32 @@ async def get_webpage_text(request: scrapedWebPageRequest):
     text = await scrape_web_page_logic(url)
     return scrapedWebPageResponse(text=text)
 
+@router.post('/get-webpages-text')
+async def get_webpages_text(request: bulkScrapedWebPageRequest):
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="No URLs provided")
+    if len(request.urls) > MAX_URLS_PER_BATCH:
+        raise HTTPException(status_code=400, detail=f"Too many URLs. Maximum is {MAX_URLS_PER_BATCH} per request")
+
+    async def stream_results():
+        async for result in scrape_web_pages_logic(request.urls):
+            yield result.model_dump_json() + "\n"
+
+    # One JSON object per line, in completion order
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @router.post('/summarize', response_model=summarize_textResponse)
 async def summarize_text(request: summarize_textRequest):
     result = await summarize_text_logic(request)
     return result
 
+# Server-sent events; buffering proxies must pass the stream through as it arrives
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@router.post('/summarize/stream')
+async def summarize_text_stream(request: summarize_textRequest):
+    return StreamingResponse(stream_summarize_text_logic(request), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.post('/translate', response_model=TranslationResponse)
 async def translate_text(request: TranslationRequest):
     if request.instruction:
@@ -72,12 +100,57 @@ async def translate_text(request: TranslationRequest):
         result = await change_language(request.text, request.target_language, request.userId)
     return TranslationResponse(
         translated_text=result["translated_text"],
+        cache_hit_ratio=result.get("cache_hit_ratio"),
     )
 
+@router.post('/translate/structured', response_model=structured_translation_response)
+async def translate_structured(request: structured_translation_request):
+    return await translate_structured_logic(request)
+
 @router.post('/flowchart', response_model=flowchart_response)
 async def create_flowchart(request: flowchart_request):
-    return await create_flowchart_logic(request.text, request.instruction, request.userId, request.language)
+    return await create_flowchart_logic(request.text, request.instruction, request.userId, request.language, request.hierarchical)
+
+@router.post('/flowchart/expand', response_model=flowchart_expand_response)
+async def expand_flowchart_node(request: flowchart_expand_request):
+    return await expand_flowchart_node_logic(request)
 
 @router.post('/flashcard', response_model=flashcard_response)
 async def create_flashcard(request: flashcard_request):
-    return await create_flashcard_logic(request.text, request.instruction, request.userId, request.language)
\ No newline at end of file
+    return await create_flashcard_logic(request.text, request.instruction, request.userId, request.language)
+
+@router.post('/flashcard/reviews/enroll', response_model=flashcard_enroll_response)
+async def enroll_flashcards(request: flashcard_enroll_request):
+    return await enroll_flashcards_logic(request)
+
+@router.get('/flashcard/reviews/due', response_model=due_flashcards_response)
+async def get_due_flashcards(userId: str, limit: int = 50, setId: Optional[str] = None, tz_offset_minutes: int = 0):
+    return await get_due_flashcards_logic(userId, limit, setId, tz_offset_minutes)
+
+@router.post('/flashcard/reviews', response_model=flashcard_review_response)
+async def submit_flashcard_reviews(request: flashcard_review_request):
+    return await submit_flashcard_reviews_logic(request)
+
+@router.post('/analytics/quiz/attempts', response_model=quiz_attempt_response)
+async def record_quiz_attempt(request: quiz_attempt):
+    return await record_quiz_attempt_logic(request)
+
+@router.get('/analytics/quiz', response_model=quiz_analytics_response)
+async def get_quiz_analytics(userId: str, days: int = 30, tz_offset_minutes: int = 0):
+    return await get_quiz_analytics_logic(userId, days, tz_offset_minutes)
+
+@router.post('/flowchart/stream')
+async def create_flowchart_stream(request: flowchart_request):
+    return StreamingResponse(
+        stream_flowchart_logic(request.text, request.instruction, request.userId, request.language),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+@router.post('/flashcard/stream')
+async def create_flashcard_stream(request: flashcard_request):
+    return StreamingResponse(
+        stream_flashcard_logic(request.text, request.instruction, request.userId, request.language),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
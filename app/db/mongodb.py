@@ -1,17 +1,78 @@
-from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
+from app.services.lazy_imports import lazy_import
 import os
 load_dotenv()
 
+# Motor and pymongo are only loaded when MongoDB is configured and connected
+motor_asyncio = lazy_import("motor.motor_asyncio")
+pymongo_errors = lazy_import("pymongo.errors")
+ASCENDING = 1
+DESCENDING = -1
+
 client = None
 
+# Connection pool and timeouts, tunable per deployment
+MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000"))
+WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+
+# (collection, keys, options) created at startup; create_index is a no-op when the index exists
+INDEXES = [
+    ("responses", [("userId", ASCENDING), ("createdAt", DESCENDING)], {"name": "userId_createdAt"}),
+    ("responses", [("url_id", ASCENDING)], {"name": "url_id"}),
+    ("responses", [("createdAt", DESCENDING)], {"name": "createdAt"}),
+]
+
+
+def is_configured() -> bool:
+    return bool(os.getenv("MONGO_DB_URL"))
+
+
 async def connect_to_mongo():
     global client
     if client is None:
-        client = AsyncIOMotorClient(os.getenv("MONGO_DB_URL"))
+        client = motor_asyncio.AsyncIOMotorClient(
+            os.getenv("MONGO_DB_URL"),
+            maxPoolSize=MAX_POOL_SIZE,
+            minPoolSize=MIN_POOL_SIZE,
+            maxIdleTimeMS=MAX_IDLE_TIME_MS,
+            serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=SOCKET_TIMEOUT_MS,
+            waitQueueTimeoutMS=WAIT_QUEUE_TIMEOUT_MS,
+            retryWrites=True,
+        )
+
+
+async def close_mongo_connection():
+    global client
+    if client is not None:
+        client.close()
+        client = None
+
+
+async def ensure_indexes() -> bool:
+    """
+    Create the indexes the read paths rely on.
+
+    Returns:
+        bool: False when the server could not be reached; the app keeps running without them
+    """
+    db = get_db()
+    try:
+        for collection, keys, options in INDEXES:
+            await db[collection].create_index(keys, **options)
+    except pymongo_errors.PyMongoError as e:
+        print(f"Could not create MongoDB indexes: {e}")
+        return False
+    return True
+
 
 def get_db():
     if client is None:
         raise Exception("MongoDB client is not connected. Call connect_to_mongo() first.")
     return client.elevateed
-    
\ No newline at end of file
@@ -0,0 +1,44 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+class quiz_attempt(BaseModel):
+    userId: str
+    attemptId: str  # "{quizId}_{attempt_number}", the ID rollup rebuilds use; an attempt is only counted once per ID
+    quiz_type: str
+    difficulty: str
+    total_questions: int = Field(ge=1)
+    correct_answers: int = Field(ge=0)
+    time_taken: int = Field(default=0, ge=0)  # Seconds for the whole attempt
+    submittedAt: Optional[datetime] = None
+    tz_offset_minutes: int = 0  # The user's offset from UTC, decides which day the attempt counts for
+
+class quiz_attempt_response(BaseModel):
+    recorded: bool  # False when an attempt with the same attemptId was already counted
+
+class accuracy_breakdown(BaseModel):
+    attempts: int = 0
+    questions: int = 0
+    correct: int = 0
+    accuracy: float = 0.0  # Percent
+
+class quiz_analytics_summary(BaseModel):
+    attempts: int = 0
+    questions: int = 0
+    correct: int = 0
+    time_taken: int = 0  # Seconds
+    accuracy: float = 0.0  # Percent
+    by_difficulty: Dict[str, accuracy_breakdown] = {}
+    by_type: Dict[str, accuracy_breakdown] = {}
+    updatedAt: Optional[datetime] = None
+
+class daily_quiz_stats(BaseModel):
+    date: str  # YYYY-MM-DD in the user's time zone
+    attempts: int = 0
+    questions: int = 0
+    correct: int = 0
+    accuracy: float = 0.0
+
+class quiz_analytics_response(BaseModel):
+    summary: quiz_analytics_summary
+    trend: List[daily_quiz_stats]  # Days with at least one attempt, oldest first
@@ -10,11 +10,25 @@ class Question(BaseModel):
     options: Optional[List[str]] = None
     correct: Union[int, bool, str, None]
 
+class quiz_payload(BaseModel):
+    title: str  # Generated with the questions so the quiz needs a single call
+    questions: List[Question]
+
 class scrapedWebPageResponse(BaseModel):
     text: str
 
 class scrapedWebPageRequest(BaseModel):
     url: str
+
+class bulkScrapedWebPageRequest(BaseModel):
+    urls: List[str]
+
+class bulkScrapedWebPageResult(BaseModel):
+    index: int  # Position of the URL in the request
+    url: str
+    text: Optional[str] = None
+    error: Optional[str] = None
+    elapsed_ms: float
     
 class YouTubeTranscriptResponse(BaseModel):
     text: str
@@ -29,4 +43,5 @@ class TranslationRequest(BaseModel):
     instruction: Optional[str] = None  # Optional instruction for translation
 
 class TranslationResponse(BaseModel):
-    translated_text: str
\ No newline at end of file
+    translated_text: str
+    cache_hit_ratio: Optional[float] = None  # Share of segments served from the translation memory
\ No newline at end of file
@@ -1,16 +1,53 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Dict, List, Optional
 
 class flashcard(BaseModel):
     question: str
     answer: str
 
 class flashcard_response(BaseModel):
+    title: str  # First, so a streamed response can show it before the cards
     flashcards: List[flashcard]
-    title: str
     
 class flashcard_request(BaseModel):
     text: str
     instruction: Optional[str] = None  # Optional instruction for flashcard generation
     language: Optional[str] = "English"
-    userId: Optional[str] = None  # Optional user ID for personalization
\ No newline at end of file
+    userId: Optional[str] = None  # Optional user ID for personalization
+
+# Spaced-repetition reviews (stored per card in users/{userId}/flashcard_reviews)
+class flashcard_enroll_request(BaseModel):
+    userId: str
+    setId: str  # ID of the saved flashcard set
+    flashcards: List[flashcard]
+
+class flashcard_enroll_response(BaseModel):
+    enrolled: int
+    already_enrolled: int
+
+class due_flashcard(BaseModel):
+    cardId: str
+    setId: str
+    question: str
+    answer: str
+    interval: int  # Days until the next review after the last one
+    reps: int
+    due: datetime
+
+class due_flashcards_response(BaseModel):
+    cards: List[due_flashcard]
+
+class flashcard_review(BaseModel):
+    cardId: str
+    grade: int = Field(ge=0, le=5)  # 0 = forgot completely, 5 = perfect recall
+    reviewedAt: Optional[datetime] = None
+
+class flashcard_review_request(BaseModel):
+    userId: str
+    reviews: List[flashcard_review]
+
+class flashcard_review_response(BaseModel):
+    updated: int
+    not_found: List[str]
+    next_due: Dict[str, datetime]  # cardId -> next review time
@@ -1,12 +1,28 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
+from pydantic.json_schema import SkipJsonSchema
 from typing import List, Optional
 
 class Node(BaseModel):
     label: str
     children: Optional[List[int]] = None  # Recursive definition for child nodes
+    # Layout computed on the server (app/services/flowchart/graph.py), left out of the generation schema
+    depth: SkipJsonSchema[Optional[int]] = None
+    x: SkipJsonSchema[Optional[float]] = None
+    y: SkipJsonSchema[Optional[float]] = None
 
 class Nodes(BaseModel):
     nodes: List[Node]
+    levels: SkipJsonSchema[Optional[List[List[int]]]] = None  # Node indices per depth, in drawing order
+    width: SkipJsonSchema[Optional[float]] = None
+    height: SkipJsonSchema[Optional[float]] = None
+
+    @model_validator(mode="after")
+    def check_child_indices(self) -> "Nodes":
+        for i, node in enumerate(self.nodes):
+            for child_idx in node.children or []:
+                if child_idx < 0 or child_idx >= len(self.nodes):
+                    raise ValueError(f"Node {i} has invalid child index: {child_idx}")
+        return self
 
 class flowchart_response(BaseModel):
     title: str
@@ -16,4 +32,27 @@ class flowchart_request(BaseModel):
     text: str
     instruction: Optional[str] = None  # Optional instruction for flowchart generation
     language: Optional[str] = "English"
-    userId: Optional[str] = None  # Optional user ID for personalization
\ No newline at end of file
+    userId: Optional[str] = None  # Optional user ID for personalization
+    hierarchical: Optional[bool] = None  # Build per-section subtrees; by default only for long texts
+
+class flowchart_outline_group(BaseModel):
+    label: str
+    sections: List[int]  # Indices of the sections under this branch
+
+class flowchart_outline(BaseModel):
+    title: str
+    root: str
+    groups: List[flowchart_outline_group]
+
+class flowchart_expand_request(BaseModel):
+    label: str  # The node to expand
+    path: Optional[List[str]] = None  # Labels from the root down to the node's parent
+    existing_children: Optional[List[str]] = None  # Children the node already has, not to be repeated
+    text: Optional[str] = None  # Source text; the part most relevant to the node is used
+    max_children: int = Field(default=5, ge=1, le=10)
+    language: Optional[str] = "English"
+    userId: Optional[str] = None
+
+class flowchart_expand_response(BaseModel):
+    label: str
+    flowchart: Nodes  # Subtree rooted at the expanded node (index 0)
\ No newline at end of file
@@ -44,6 +44,10 @@ class Response(BaseModel):
     difficulty: str
     numbers: int | None = None
     score: list[Score] | None = None
+    # Maintained by add_score (backfilled once from the score list on legacy responses), so reads need not load the score list
+    attempts: int | None = None
+    total_score: int | None = None
+    best_score: int | None = None
 
     class Config:
         validate_by_name  = True
@@ -65,6 +69,21 @@ class User(BaseModel):
         extra = "forbid"
         arbitrary_types_allowed = True
 
+class ScoreHistory(BaseModel):
+    id: PyObjectId = Field(alias="_id")
+    quiz_type: str | None = None
+    difficulty: str | None = None
+    numbers: int | None = None
+    attempts: int | None = None
+    best_score: int | None = None
+    score: list[Score] | None = None
+
+    class Config:
+        validate_by_name  = True
+        json_encoders = {ObjectId: str}
+        arbitrary_types_allowed = True
+
+
 class UserResponse(BaseModel):
     user_id: PyObjectId
     
\ No newline at end of file
@@ -1,27 +1,12 @@
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
+from app.models.BaseModel.analytics import quiz_analytics_summary, daily_quiz_stats
 
 class Feedback(BaseModel):
     experience: str
     improvements: List[str]
     rating: int
     
-class Personalized_Quiz(BaseModel):
-    scores: List[int]
-    total_questions: int
-    correct_answers: int
-    incorrect_answers: int
-    time_taken: List[int]  # in seconds
-    feedback: Feedback
-    difficulty: str
-    title: str
-    quiz_type: str
-    total_submissions: int
-    average_score: float
-    
-class Personalized_Quiz_Content(BaseModel):
-    quizzes: List[Personalized_Quiz]
-
 class Personalized_Flowchart(BaseModel):
     title: str
     feedback: Feedback
@@ -57,7 +42,8 @@ class Personalized_User_Content(BaseModel):
     
 class Personalized_Content(BaseModel):
     personalized_info: Personalized_User_Content
-    personalized_quiz: Personalized_Quiz_Content
     personalized_flowchart: Personalized_Flowchart_Content
     personalized_flashcard: Personalized_Flashcard_Content
+    quiz_analytics: Optional[quiz_analytics_summary] = None  # Lifetime quiz rollup
+    quiz_trend: List[daily_quiz_stats] = []  # Most recent days with quiz attempts, oldest first
     # personalized_summary: Personalized_Summary_Content
\ No newline at end of file
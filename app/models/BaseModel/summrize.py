@@ -19,4 +19,14 @@ class summarize_textRequest(BaseModel):
     format: str = "paragraph"  # "paragraph" or "bullet_points"
     length: str = "medium"  # "small", "medium", or "large"
     language: Optional[str] = "English"
-    userId: Optional[str] = None  # For personalization
\ No newline at end of file
+    userId: Optional[str] = None  # For personalization
+
+# Shapes of the model output, passed to Gemini as response schemas
+class paragraph_summary(BaseModel):
+    title: str
+    summary: str
+
+
+class bullet_summary(BaseModel):
+    title: str
+    summary: List[str]
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from app.models.BaseModel.flashcard import flashcard_response
+from app.models.BaseModel.flowchart import flowchart_response
+from app.models.BaseModel.generateQuestionsBaseModel import generateQuestionResponse
+
+class structured_translation_request(BaseModel):
+    target_language: str
+    userId: Optional[str] = None  # Optional user ID for personalized translation
+    flashcards: Optional[flashcard_response] = None
+    quiz: Optional[generateQuestionResponse] = None
+    flowchart: Optional[flowchart_response] = None
+
+class structured_translation_response(BaseModel):
+    flashcards: Optional[flashcard_response] = None
+    quiz: Optional[generateQuestionResponse] = None
+    flowchart: Optional[flowchart_response] = None
+    strings_translated: int  # Translatable fields found in the request
+    cache_hit_ratio: Optional[float] = None
+
+class segment_translations(BaseModel):
+    translations: List[str]  # Response schema for batched Gemini translation, in segment order
@@ -1,19 +1,51 @@
-from google import genai
-from app.models.BaseModel.common import Question
+from app.models.BaseModel.common import Question, quiz_payload
 import os
 from dotenv import load_dotenv
-import json
-from typing import Optional
+from typing import Dict, List, Optional
 from app.services.personalization.prompt_enhancer import enhance_prompt_with_personalization
+from app.services.llm.structured_output import generate_structured
+from app.services.llm.gemini_client import generate_content, GeminiUnavailableError
+from app.services.llm.token_counter import token_counter
+from app.services.llm.model_router import TITLE
+from app.services.Questions.quiz_engine import QuizEngine
+from app.services.text.output_language import enforce_output_language
 
 load_dotenv()
 
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
 class GetQuestions:
-    def get_questions(self, text: str, numbers: int, difficulty: str = "Medium", quiz_type: str = "mix", userId: Optional[str] = None, language: Optional[str] = "English") -> tuple[list[Question], str]:
-        current_id = 1
-
+    # Source text sent with each question prompt
+    max_input_tokens = 30000
+    # A title of at most 10 words only needs the opening of the text
+    max_title_input_tokens = 2000
+    # Above this many questions (or above max_input_tokens of text), the quiz is generated
+    # in shards spread over the text
+    max_single_call_questions = int(os.getenv("QUIZ_SINGLE_CALL_MAX_QUESTIONS", "30"))
+
+    def get_questions(self, text: str, numbers: int, difficulty: str = "Medium", quiz_type: str = "mix", userId: Optional[str] = None, language: Optional[str] = "English", split_by_type: Optional[bool] = None) -> tuple[list[Question], str]:
+        """
+        Generate a quiz and its title.
+
+        The title is generated together with the questions. Quizzes up to
+        ``max_single_call_questions`` over texts up to ``max_input_tokens`` take a single
+        call; larger ones are generated by the sharded quiz engine, which spreads the
+        questions over the whole text and removes near-duplicates. ``split_by_type``
+        instead splits a mixed quiz into one call per question type over the
+        (truncated) text.
+
+        Args:
+            text (str): Source text
+            numbers (int): Number of questions
+            difficulty (str): Question difficulty
+            quiz_type (str): "mcq", "truefalse", "short" or "mix"
+            userId (Optional[str]): User ID for personalization
+            language (Optional[str]): Language of the quiz
+            split_by_type (Optional[bool]): True for one call per question type, False to
+                never shard, None to shard large quizzes and texts
+
+        Returns:
+            tuple[list[Question], str]: The questions and the quiz title
+        """
         if quiz_type == "mix":
             types = ['mcq', 'truefalse', 'short']
             base = numbers // 3
@@ -22,40 +54,123 @@ class GetQuestions:
             type_counts = {t: base for t in types}
             for i in range(remainder):
                 type_counts[types[i]] += 1
+            type_counts = {t: count for t, count in type_counts.items() if count}
+        else:
+            type_counts = {quiz_type: numbers}
 
+        if split_by_type is None and (numbers > self.max_single_call_questions or token_counter.count_tokens(text) > self.max_input_tokens):
+            combined, title = QuizEngine(self.generate_quiz).generate(text, numbers, type_counts, difficulty, userId, language)
+        elif split_by_type and len(type_counts) > 1:
+            text = token_counter.truncate_to_tokens(text, self.max_input_tokens)
             combined = []
-            for t in types:
-                batch, current_id = self.get_questions_for_type(text, type_counts[t], difficulty, t, current_id, userId)
+            title = ""
+            current_id = 1
+            for t, count in type_counts.items():
+                batch, current_id, batch_title = self.generate_quiz(text, {t: count}, difficulty, current_id, userId, language, with_title=not title)
                 combined.extend(batch)
-            title = self.get_title_for_quiz(text, userId, language)
-            return (combined, title)
+                title = title or batch_title
         else:
-            batch, _ = self.get_questions_for_type(text, numbers, difficulty, quiz_type, current_id, userId)
-            return (batch, self.get_title_for_quiz(text, userId, language))
+            text = token_counter.truncate_to_tokens(text, self.max_input_tokens)
+            combined, _, title = self.generate_quiz(text, type_counts, difficulty, 1, userId, language, with_title=True)
+
+        if not title and combined:
+            # Only when the title could not be produced with the questions
+            title = self.get_title_for_quiz(text, userId, language)
+        quiz = enforce_output_language(quiz_payload(title=title or "Untitled Quiz", questions=combined), language, "quiz", userId)
+        return (quiz.questions, quiz.title)
 
 
     def get_questions_for_type(self, text: str, count: int, difficulty: str, quiz_type: str, start_id: int, userId: Optional[str] = None, language: Optional[str] = "English") -> tuple[list[Question], int]:
-        instruction = self._get_quiz_type_instruction(quiz_type)
+        questions, next_id, _ = self.generate_quiz(text, {quiz_type: count}, difficulty, start_id, userId, language, with_title=False)
+        return questions, next_id
 
-        base_prompt = f"""
-Generate {count} {quiz_type.upper()} questions from the given context.
-Each question should match the structure below:
+    def generate_quiz(self, text: str, type_counts: Dict[str, int], difficulty: str, start_id: int, userId: Optional[str] = None, language: Optional[str] = "English", with_title: bool = True, avoid: Optional[List[str]] = None) -> tuple[list[Question], int, str]:
+        """
+        Generate questions of one or more types in a single call.
+
+        Args:
+            text (str): Source text
+            type_counts (Dict[str, int]): Number of questions per type
+            difficulty (str): Question difficulty
+            start_id (int): ID of the first question
+            userId (Optional[str]): User ID for personalization
+            language (Optional[str]): Language of the quiz
+            with_title (bool): Also generate the quiz title
+            avoid (Optional[List[str]]): Questions already in the quiz, not to be repeated
+
+        Returns:
+            tuple[list[Question], int, str]: The questions, the next free ID, and the title ("" if not requested)
+        """
+        prompt = self._create_quiz_prompt(text, type_counts, difficulty, language, with_title, avoid)
 
+        # Enhance the prompt with personalization if userId is provided
+        if userId:
+            prompt = enhance_prompt_with_personalization(prompt, userId)
+
+        try:
+            # The response schema guarantees every question has the Question shape
+            if with_title:
+                quiz = generate_structured(prompt, quiz_payload, "quiz_questions")
+                questions, title = quiz.questions, quiz.title.strip()
+            else:
+                questions, title = generate_structured(prompt, list[Question], "quiz_questions"), ""
+            for i, question in enumerate(questions, start=start_id):
+                question.id = i
+
+            return questions, start_id + len(questions), title
+
+        except GeminiUnavailableError:
+            # Out of quota or Gemini is down: an empty quiz would hide that from the user
+            raise
+        except Exception as e:
+            print("❌ Generation error:", e)
+            return ([], start_id, "")
+
+    def _create_quiz_prompt(self, text: str, type_counts: Dict[str, int], difficulty: str, language: Optional[str], with_title: bool, avoid: Optional[List[str]] = None) -> str:
+        total = sum(type_counts.values())
+        if len(type_counts) == 1:
+            quiz_type = next(iter(type_counts))
+            request_line = f"Generate {total} {quiz_type.upper()} questions from the given context."
+        else:
+            breakdown = ", ".join(f"{count} {t.upper()}" for t, count in type_counts.items())
+            request_line = f"Generate {total} questions from the given context: {breakdown}."
+
+        structures = []
+        for quiz_type in type_counts:
+            options_line = '"options": ["Option A", "Option B", "Option C", "Option D"],' if quiz_type == "mcq" else ""
+            correct_format = "an integer index (0-3)" if quiz_type == "mcq" else "true/false" if quiz_type == "truefalse" else "string"
+            structures.append(f"""{self._get_quiz_type_instruction(quiz_type)}
 {{
   "id": integer (starting from 1) should be unique for each question,
   "question": string,
   "type": "{quiz_type}",
   "difficulty": "{difficulty}",
-  {"\"options\": [\"Option A\", \"Option B\", \"Option C\", \"Option D\"]," if quiz_type == "mcq" else ""}
-  "correct": {"an integer index (0-3)" if quiz_type == "mcq" else "true/false" if quiz_type == "truefalse" else "string"},
+  {options_line}
+  "correct": {correct_format},
   "explanation": "Why the correct answer is right"
-}}
+}}""")
+        structure = "\n\n".join(structures)
+
+        if with_title:
+            output_rule = """- Return a JSON object with a "title" and the "questions" array (no markdown, no commentary).
+- The title should be catchy, relevant, and reflect the main theme of the content, in at most 10 words."""
+        else:
+            output_rule = "- Return only a valid JSON array (no markdown, no commentary)."
+        if avoid:
+            existing = "\n".join(f"  - {question}" for question in avoid)
+            output_rule += f"\n- The quiz already contains the questions below. Ask about different facts, do not rephrase them:\n{existing}"
+
+        return f"""
+{request_line}
+Each question should match the structure below for its type:
+
+{structure}
 
 ❗ Rules:
 - The field name must be `"options"` (not `"option"`), and only present for `"mcq"` type.
 - Ensure all 4 options are meaningful and distinct for `"mcq"`.
 - **IMPORTANT FOR MCQ**: Randomize the position of the correct answer across all questions. Do NOT always put the correct answer in position 1 (index 1/Option B). Mix it up - sometimes use index 0 (Option A), sometimes 1 (Option B), sometimes 2 (Option C), sometimes 3 (Option D). Aim for roughly equal distribution across all positions.
-- Return only a valid JSON array (no markdown, no commentary).
+{output_rule}
 - Strictly follow the key structure and types.
 
 🧠 Psychology & Engagement Instructions:
@@ -72,48 +187,8 @@ Context:
 {text}
 """
 
-        # Enhance the prompt with personalization if userId is provided
-        if userId:
-            prompt = enhance_prompt_with_personalization(base_prompt, userId)
-        else:
-            prompt = base_prompt
-
-
-        try:
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=prompt,
-                config={
-                    "response_mime_type": "application/json"
-                }
-            )
-
-            if response.text is None:
-                print("❌ No text received from Gemini.")
-                return ([], start_id)
-
-            
-            # print(response.text)
-
-            raw = json.loads(response.text)
-
-            data = []
-            for i, qa in enumerate(raw, start=start_id):
-                try:
-                    qa["id"] = i
-                    print(f"✅ Processing question #{i} {qa['id']}")
-                    data.append(Question(**qa))
-                except Exception as e:
-                    print(f"❌ Skipping malformed question #{i}: — Error: {e}")
-
-            return data, start_id + len(data)
-            
-
-        except Exception as e:
-            print("❌ Generation error:", e)
-            return ([], start_id)
-
     def get_title_for_quiz(self, text: str, userId: Optional[str] = None, language: Optional[str] = "English") -> str:
+        text = token_counter.truncate_to_tokens(text, self.max_title_input_tokens)
         base_prompt = f"""Generate a concise and engaging title for a quiz based on the following context:
 {text}
 
@@ -130,12 +205,13 @@ Return only the title as a string without any additional text or formatting.
             prompt = base_prompt
 
         try:
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=prompt,
+            response = generate_content(
+                prompt,
                 config={
                     "response_mime_type": "text/plain"
-                }
+                },
+                task=TITLE,
+                call_site="quiz_title",
             )
 
             if response.text is None:
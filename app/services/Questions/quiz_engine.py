@@ -0,0 +1,197 @@
+"""
+Sharded quiz generation for large quizzes.
+
+Asking for 50 questions over a whole PDF in one prompt makes the model cluster them
+on the first pages and repeat itself. Instead the source is cut into shards by
+tokens, each shard is asked for a share of the questions proportional to its size
+(concurrently), near-identical questions are dropped, and any shortfall is topped up
+from the shards that produced the fewest questions.
+"""
+
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from app.models.BaseModel.common import Question
+from app.services.llm.gemini_client import GeminiUnavailableError
+from app.services.llm.token_counter import token_counter
+from app.services.text.similarity import NearDuplicateFilter
+
+load_dotenv()
+
+QUIZ_SHARD_TOKENS = int(os.getenv("QUIZ_SHARD_TOKENS", "6000"))
+QUIZ_SHARD_WORKERS = int(os.getenv("QUIZ_SHARD_WORKERS", "4"))
+# Merged shards are cut to this size, the most a single question prompt carries
+MAX_SHARD_INPUT_TOKENS = 30000
+# Never ask a shard for fewer questions than this: there is at most one shard per this
+# many questions, and each shard gets at least this many before the rest is split by size
+MIN_QUESTIONS_PER_SHARD = 3
+MAX_TOP_UP_ROUNDS = 2
+# Existing questions listed in a top-up prompt so the model does not repeat them
+MAX_AVOID_QUESTIONS = 40
+
+# (text, type_counts, difficulty, start_id, userId, language, with_title, avoid) -> (questions, next_id, title)
+QuizGenerator = Callable[..., Tuple[List[Question], int, str]]
+
+quiz_executor = ThreadPoolExecutor(max_workers=QUIZ_SHARD_WORKERS, thread_name_prefix="quiz")
+
+
+def _group_shards(shards: List[str], groups: int) -> List[str]:
+    """Join consecutive shards into ``groups`` shards of similar size."""
+    if len(shards) <= groups:
+        return shards
+    per_group = len(shards) / groups
+    return [
+        "\n\n".join(shards[round(i * per_group):round((i + 1) * per_group)])
+        for i in range(groups)
+    ]
+
+
+def _allocate(total: int, weights: List[int], minimum: int = 0) -> List[int]:
+    """
+    Split ``total`` proportionally to ``weights`` (largest remainder), giving every
+    weight at least ``minimum`` when ``total`` allows it.
+    """
+    floor = minimum if minimum * len(weights) <= total else 0
+    rest = total - floor * len(weights)
+    weight_sum = sum(weights) or 1
+    exact = [rest * w / weight_sum for w in weights]
+    counts = [int(x) for x in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: exact[i] - counts[i], reverse=True)
+    for i in by_remainder[:rest - sum(counts)]:
+        counts[i] += 1
+    return [count + floor for count in counts]
+
+
+def _interleave(type_counts: Dict[str, int]) -> List[str]:
+    """Question types in round-robin order, so consecutive slices get a similar mix."""
+    remaining = dict(type_counts)
+    order = []
+    while any(remaining.values()):
+        for quiz_type in remaining:
+            if remaining[quiz_type]:
+                order.append(quiz_type)
+                remaining[quiz_type] -= 1
+    return order
+
+
+def _count_types(types: List[str]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for quiz_type in types:
+        counts[quiz_type] = counts.get(quiz_type, 0) + 1
+    return counts
+
+
+class QuizEngine:
+    def __init__(self, generator: QuizGenerator, shard_tokens: int = QUIZ_SHARD_TOKENS, executor: ThreadPoolExecutor = quiz_executor):
+        self.generator = generator
+        self.shard_tokens = shard_tokens
+        self.executor = executor
+
+    def shard(self, text: str, numbers: int) -> List[str]:
+        """Cut the text into shards, with at most one shard per MIN_QUESTIONS_PER_SHARD questions."""
+        shards = token_counter.split_by_tokens(text, self.shard_tokens)
+        return [
+            token_counter.truncate_to_tokens(shard, MAX_SHARD_INPUT_TOKENS) if token_counter.estimate_tokens(shard) > MAX_SHARD_INPUT_TOKENS else shard
+            for shard in _group_shards(shards, max(1, numbers // MIN_QUESTIONS_PER_SHARD))
+        ]
+
+    def _run(self, jobs: List[Tuple[str, Dict[str, int], bool, List[str]]], difficulty: str, userId: Optional[str], language: Optional[str]) -> List[Tuple[List[Question], str]]:
+        """Run generator calls concurrently. Calls that fail return no questions."""
+        futures = [
+            # Carry the caller's context (e.g. its Gemini priority class) into the worker thread
+            self.executor.submit(contextvars.copy_context().run, self.generator, text, type_counts, difficulty, 1, userId, language, with_title, avoid)
+            for text, type_counts, with_title, avoid in jobs
+        ]
+        results = []
+        unavailable: Optional[GeminiUnavailableError] = None
+        for future in futures:
+            try:
+                questions, _, title = future.result()
+                results.append((questions, title))
+            except GeminiUnavailableError as e:
+                unavailable = e
+                results.append(([], ""))
+        if unavailable is not None and not any(questions for questions, _ in results):
+            raise unavailable
+        return results
+
+    def generate(self, text: str, numbers: int, type_counts: Dict[str, int], difficulty: str, userId: Optional[str] = None, language: Optional[str] = "English") -> Tuple[List[Question], str]:
+        """
+        Generate a quiz spread across the whole text.
+
+        Args:
+            text (str): Source text
+            numbers (int): Number of questions
+            type_counts (Dict[str, int]): Number of questions per type, summing to ``numbers``
+            difficulty (str): Question difficulty
+            userId (Optional[str]): User ID for personalization
+            language (Optional[str]): Language of the quiz
+
+        Returns:
+            Tuple[List[Question], str]: The questions in source order, and the quiz title
+        """
+        shards = self.shard(text, numbers)
+        counts = _allocate(numbers, [token_counter.estimate_tokens(shard) for shard in shards], MIN_QUESTIONS_PER_SHARD)
+        types = _interleave(type_counts)
+        shard_types: List[Dict[str, int]] = []
+        offset = 0
+        for count in counts:
+            shard_types.append(_count_types(types[offset:offset + count]))
+            offset += count
+        print(f"Generating {numbers} questions from {len(shards)} shards: {counts}")
+
+        # The first shard also titles the quiz
+        job_shards = [i for i in range(len(shards)) if counts[i]]
+        jobs = [(shards[i], shard_types[i], i == job_shards[0], []) for i in job_shards]
+        results = self._run(jobs, difficulty, userId, language)
+        title = results[0][1] if results else ""
+
+        seen = NearDuplicateFilter()
+        kept: List[List[Question]] = [[] for _ in shards]
+        needed = dict(type_counts)
+        duplicates = 0
+
+        def keep(shard_index: int, questions: List[Question]) -> None:
+            nonlocal duplicates
+            for question in questions:
+                question.type = question.type.lower()
+                if needed.get(question.type, 0) <= 0:
+                    continue
+                if not seen.add(id(question), question.question):
+                    duplicates += 1
+                    continue
+                kept[shard_index].append(question)
+                needed[question.type] -= 1
+
+        for shard_index, (questions, _) in zip(job_shards, results):
+            keep(shard_index, questions)
+
+        for _ in range(MAX_TOP_UP_ROUNDS):
+            missing = {quiz_type: count for quiz_type, count in needed.items() if count > 0}
+            if not missing:
+                break
+            # Top up from the shards with the fewest questions relative to their size
+            order = sorted(range(len(shards)), key=lambda i: len(kept[i]) / max(1, counts[i]))
+            missing_types = _interleave(missing)
+            targets = order[:max(1, min(len(shards), len(missing_types) // MIN_QUESTIONS_PER_SHARD))]
+            top_up_counts = _allocate(len(missing_types), [1] * len(targets))
+            avoid = [question.question for questions in kept for question in questions][-MAX_AVOID_QUESTIONS:]
+            jobs, job_shards, offset = [], [], 0
+            for shard_index, count in zip(targets, top_up_counts):
+                jobs.append((shards[shard_index], _count_types(missing_types[offset:offset + count]), not title, avoid))
+                job_shards.append(shard_index)
+                offset += count
+            print(f"Topping up {len(missing_types)} questions from {len(targets)} shards")
+            results = self._run(jobs, difficulty, userId, language)
+            for shard_index, (questions, shard_title) in zip(job_shards, results):
+                title = title or shard_title
+                keep(shard_index, questions)
+
+        if duplicates:
+            print(f"Dropped {duplicates} near-duplicate questions")
+        combined = [question for questions in kept for question in questions]
+        for i, question in enumerate(combined, start=1):
+            question.id = i
+        return combined, title
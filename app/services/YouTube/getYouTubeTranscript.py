@@ -1,12 +1,9 @@
-from youtube_transcript_api._api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import (
-    TranscriptsDisabled,
-    NoTranscriptFound,
-    VideoUnavailable,
-    CouldNotRetrieveTranscript,
-)
 import time
-import requests
+from app.services.lazy_imports import lazy_import
+
+requests = lazy_import("requests")
+youtube_api = lazy_import("youtube_transcript_api._api")
+youtube_errors = lazy_import("youtube_transcript_api._errors")
 
 class GetYouTubeTranscript:
     def __init__(self, id: str) -> None:
@@ -31,7 +28,7 @@ class GetYouTubeTranscript:
             for attempt in range(retries):
                 try:
                     print(f"[Attempt {attempt + 1}] Trying to fetch transcript for: {video_id}")
-                    transcripts = YouTubeTranscriptApi.get_transcript(video_id)
+                    transcripts = youtube_api.YouTubeTranscriptApi.get_transcript(video_id)
                     return transcripts
 
                 except Exception as e:
@@ -54,13 +51,13 @@ class GetYouTubeTranscript:
         try:
             transcript = self.safe_get_transcript(self.video_id)
             return "".join([item['text'] for item in transcript])
-        except TranscriptsDisabled:
+        except youtube_errors.TranscriptsDisabled:
             return "Error: Transcripts are disabled for this video."
-        except NoTranscriptFound:
+        except youtube_errors.NoTranscriptFound:
             return "Error: No transcript found for this video."
-        except VideoUnavailable:
+        except youtube_errors.VideoUnavailable:
             return "Error: The video is unavailable or private."
-        except CouldNotRetrieveTranscript as e:
+        except youtube_errors.CouldNotRetrieveTranscript as e:
             return f"Error: Could not retrieve transcript due to parsing issues. Reason: {str(e)}"
         except Exception as e:
             return f"Error: {e} (video_id: {self.video_id})"
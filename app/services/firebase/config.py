@@ -1,13 +1,20 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
 import os
+import threading
 from typing import Optional, Any
 from dotenv import load_dotenv
+from app.services.lazy_imports import lazy_import
 load_dotenv()
 
+# The Admin SDK and Firestore client are loaded with the first database access
+firebase_admin = lazy_import("firebase_admin")
+credentials = lazy_import("firebase_admin.credentials")
+firestore = lazy_import("firebase_admin.firestore")
+
 class FirebaseConfig:
     _instance = None
     _db = None
+    # Initialization happens on the first request, possibly from several threads at once
+    _init_lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
@@ -24,7 +31,17 @@ class FirebaseConfig:
         if self._db is not None:
             return self._db
         
+        with self._init_lock:
+            if self._db is None:
+                self._db = self._initialize()
+        return self._db
+    
+    def _initialize(self) -> Any:
         try:
+            if firebase_admin._apps:
+                # An earlier attempt registered the app but failed to create the client; retry the client only
+                return firestore.client()
+            
             # Method 1: Using service account key file (recommended for production)
             service_account_path = os.getenv('FIREBASE_SERVICE_ACCOUNT_PATH')
             
@@ -64,8 +81,7 @@ class FirebaseConfig:
                 firebase_admin.initialize_app()
             
             # Initialize Firestore client
-            self._db = firestore.client()
-            return self._db
+            return firestore.client()
             
         except Exception as e:
             print(f"Error initializing Firebase: {e}")
@@ -1,5 +1,7 @@
 from app.models.BaseModel.personalized.personal import Personalized_Flashcard, Personalized_Flashcard_Content
 from typing import List
+from app.services.metrics import record_firestore_reads
+from app.services.tracing import traced
 
 def extract_personalized_flashcard(flashcard_data) -> Personalized_Flashcard:
     """Extract personalized flashcard data from Firebase document"""
@@ -13,10 +15,12 @@ class FlashcardService:
     def __init__(self, db):
         self.db = db
 
+    @traced("firestore.flashcards.get_recent")
     def get_last5_flashcards(self, userId: str) -> Personalized_Flashcard_Content:
         """Get the last 5 flashcard sets for a user for personalization"""
         try:
             flashcard_docs = self.db.collection('users').document(userId).collection('flashcards').get()
+            record_firestore_reads('flashcards', max(1, len(flashcard_docs)))
             if not flashcard_docs:
                 return Personalized_Flashcard_Content(flashcards=[])
 
@@ -34,6 +38,7 @@ class FlashcardService:
             print(f"Error fetching flashcards for user {userId}: {e}")
             return Personalized_Flashcard_Content(flashcards=[])
 
+    @traced("firestore.flashcards.add")
     def save_flashcard_set(self, userId: str, flashcard_data: dict) -> bool:
         """Save a flashcard set to Firebase"""
         try:
@@ -0,0 +1,147 @@
+from app.models.BaseModel.flashcard import flashcard, due_flashcard, flashcard_review
+from app.services.spaced_repetition.scheduler import card_state, new_card_state, review
+from app.services.lazy_imports import lazy_import
+from app.services.metrics import record_firestore_reads
+from app.services.tracing import traced
+from typing import Dict, List, Optional, Tuple
+import datetime
+
+base_query = lazy_import("google.cloud.firestore_v1.base_query")
+
+# Firestore accepts at most 500 writes per batch
+MAX_BATCH_WRITES = 500
+
+
+def card_id(setId: str, index: int) -> str:
+    return f"{setId}_{index}"
+
+
+def _utc(moment: datetime.datetime) -> datetime.datetime:
+    """Treat naive times from clients as UTC."""
+    return moment if moment.tzinfo else moment.replace(tzinfo=datetime.timezone.utc)
+
+
+def _state_from_doc(data: dict) -> card_state:
+    return card_state(
+        ease=data.get('ease', 2.5),
+        interval=data.get('interval', 0),
+        reps=data.get('reps', 0),
+        lapses=data.get('lapses', 0),
+        due=data['due'],
+        last_review=data.get('lastReview'),
+    )
+
+
+def _state_to_doc(state: card_state) -> dict:
+    return {
+        'ease': state.ease,
+        'interval': state.interval,
+        'reps': state.reps,
+        'lapses': state.lapses,
+        'due': state.due,
+        'lastReview': state.last_review,
+    }
+
+
+class FlashcardReviewService:
+    """
+    Per-card review state in users/{userId}/flashcard_reviews/{setId}_{index}.
+
+    Each document holds the card's text next to its scheduling state, so a review
+    session is one query on ``due`` (covered by Firestore's automatic single-field
+    index) instead of a download of every deck.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def _collection(self, userId: str):
+        return self.db.collection('users').document(userId).collection('flashcard_reviews')
+
+    @traced("firestore.flashcard_reviews.commit")
+    def _commit(self, writes: List[Tuple[object, dict]]) -> None:
+        for start in range(0, len(writes), MAX_BATCH_WRITES):
+            batch = self.db.batch()
+            for ref, data in writes[start:start + MAX_BATCH_WRITES]:
+                batch.set(ref, data, merge=True)
+            batch.commit()
+
+    @traced("firestore.flashcard_reviews.enroll")
+    def enroll(self, userId: str, setId: str, flashcards: List[flashcard]) -> Tuple[int, int]:
+        """
+        Start scheduling the cards of a flashcard set. Cards already enrolled keep their state.
+
+        Returns:
+            Tuple[int, int]: Cards enrolled now, cards that were already enrolled
+        """
+        collection = self._collection(userId)
+        refs = [collection.document(card_id(setId, i)) for i in range(len(flashcards))]
+        existing = {snapshot.id for snapshot in self.db.get_all(refs) if snapshot.exists}
+        record_firestore_reads('flashcard_reviews', len(refs))
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        writes = []
+        for ref, card in zip(refs, flashcards):
+            if ref.id in existing:
+                continue
+            writes.append((ref, {
+                'setId': setId,
+                'question': card.question,
+                'answer': card.answer,
+                **_state_to_doc(new_card_state(now)),
+            }))
+        self._commit(writes)
+        return len(writes), len(existing)
+
+    @traced("firestore.flashcard_reviews.get_due")
+    def get_due(self, userId: str, until: datetime.datetime, limit: int = 50, setId: Optional[str] = None) -> List[due_flashcard]:
+        """Cards due by ``until``, most overdue first."""
+        query = self._collection(userId)
+        if setId:
+            # Needs the composite index (setId ASC, due ASC) on flashcard_reviews
+            query = query.where(filter=base_query.FieldFilter('setId', '==', setId))
+        query = query.where(filter=base_query.FieldFilter('due', '<=', until)).order_by('due').limit(limit)
+
+        cards = []
+        for snapshot in query.stream():
+            data = snapshot.to_dict()
+            cards.append(due_flashcard(
+                cardId=snapshot.id,
+                setId=data.get('setId', ''),
+                question=data.get('question', ''),
+                answer=data.get('answer', ''),
+                interval=data.get('interval', 0),
+                reps=data.get('reps', 0),
+                due=data['due'],
+            ))
+        record_firestore_reads('flashcard_reviews', max(1, len(cards)))
+        return cards
+
+    @traced("firestore.flashcard_reviews.submit")
+    def submit_reviews(self, userId: str, reviews: List[flashcard_review]) -> Tuple[Dict[str, datetime.datetime], List[str]]:
+        """
+        Apply a batch of reviews: one read of all affected cards and batched writes.
+
+        Several reviews of the same card are applied in the order they happened.
+
+        Returns:
+            Tuple[Dict[str, datetime.datetime], List[str]]: Next due time per updated card, and unknown card IDs
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        collection = self._collection(userId)
+        card_ids = list(dict.fromkeys(item.cardId for item in reviews))
+        refs = {cid: collection.document(cid) for cid in card_ids}
+        states = {
+            snapshot.id: _state_from_doc(snapshot.to_dict())
+            for snapshot in self.db.get_all(list(refs.values()))
+            if snapshot.exists
+        }
+        record_firestore_reads('flashcard_reviews', len(refs))
+
+        for item in sorted(reviews, key=lambda item: _utc(item.reviewedAt or now)):
+            if item.cardId in states:
+                states[item.cardId] = review(states[item.cardId], item.grade, _utc(item.reviewedAt or now))
+
+        self._commit([(refs[cid], _state_to_doc(state)) for cid, state in states.items()])
+        not_found = [cid for cid in card_ids if cid not in states]
+        return {cid: state.due for cid, state in states.items()}, not_found
@@ -1,5 +1,7 @@
 from app.models.BaseModel.personalized.personal import Personalized_Flowchart, Personalized_Flowchart_Content
 from typing import List
+from app.services.metrics import record_firestore_reads
+from app.services.tracing import traced
 
 def extract_personalized_flowchart(flowchart_data) -> Personalized_Flowchart:
     return Personalized_Flowchart(
@@ -12,8 +14,10 @@ class FlowchartService:
     def __init__(self, db):
         self.db = db
 
+    @traced("firestore.flowcharts.get_recent")
     def get_last5_flowcharts(self, userId: str) -> Personalized_Flowchart_Content:
         flowchart_docs = self.db.collection('users').document(userId).collection('flowcharts').get()
+        record_firestore_reads('flowcharts', max(1, len(flowchart_docs)))
         if not flowchart_docs:
             return Personalized_Flowchart_Content(flowcharts=[])
 
@@ -1,28 +1,27 @@
-from app.services.firebase.quiz import QuizService
 from app.services.firebase.user import UserService
 from app.services.firebase.flowchart import FlowchartService
 from app.services.firebase.flashcard import FlashcardService
+from app.services.firebase.quiz_analytics import QuizAnalyticsService
 from app.services.firebase.config import get_firebase_db
 from app.models.BaseModel.personalized.personal import (
-    Personalized_Quiz_Content, 
     Personalized_User_Content, 
     Personalized_Flowchart_Content, 
     Personalized_Flashcard_Content,
     Personalized_Content
 )
+from app.models.BaseModel.analytics import quiz_analytics_summary, daily_quiz_stats
+from typing import List, Optional
+from app.services.tracing import traced
 
 
 class PersonalizedContentService:
     def __init__(self, db):
         self.db = db
-        self.quiz_service = QuizService(db)
         self.user_service = UserService(db)
         self.flowchart_service = FlowchartService(db)
         self.flashcard_service = FlashcardService(db)
+        self.quiz_analytics_service = QuizAnalyticsService(db)
 
-    def get_personalized_quizzes(self, userId: str) -> Personalized_Quiz_Content:
-        return self.quiz_service.get_last5_personalized_quizzes(userId)
-    
     def get_personalized_user_info(self, userId: str) -> Personalized_User_Content:
         return self.user_service.get_personalized_user_content(userId)
     
@@ -32,15 +31,32 @@ class PersonalizedContentService:
     def get_personalized_flashcards(self, userId: str) -> Personalized_Flashcard_Content:
         return self.flashcard_service.get_last5_flashcards(userId)
     
+    def get_quiz_analytics(self, userId: str) -> Optional[quiz_analytics_summary]:
+        try:
+            return self.quiz_analytics_service.get_or_rebuild_summary(userId)
+        except Exception as e:
+            print(f"Error getting quiz analytics: {e}")
+            return None
+
+    def get_quiz_trend(self, userId: str) -> List[daily_quiz_stats]:
+        try:
+            return self.quiz_analytics_service.get_recent_days(userId)
+        except Exception as e:
+            print(f"Error getting quiz trend: {e}")
+            return []
+    
     def get_personalized_content(self, userId: str) -> Personalized_Content:
+        # Quiz history comes from the analytics rollups: a fixed number of reads however many quizzes the user took
         return Personalized_Content(
             personalized_info=self.get_personalized_user_info(userId),
-            personalized_quiz=self.get_personalized_quizzes(userId),
             personalized_flowchart=self.get_personalized_flowcharts(userId),
             personalized_flashcard=self.get_personalized_flashcards(userId),
+            quiz_analytics=self.get_quiz_analytics(userId),
+            quiz_trend=self.get_quiz_trend(userId),
         )
     
     
+@traced("personalization.get_content")
 def get_personalized_content(userId: str) -> Personalized_Content:
     try:
         db = get_firebase_db()
@@ -57,7 +73,6 @@ def get_personalized_content(userId: str) -> Personalized_Content:
                 subjectsOfInterest=["General"],
                 educationLevel="Not Specified"
             ),
-            personalized_quiz=Personalized_Quiz_Content(quizzes=[]),
             personalized_flowchart=Personalized_Flowchart_Content(flowcharts=[]),
             personalized_flashcard=Personalized_Flashcard_Content(flashcards=[]),
         )
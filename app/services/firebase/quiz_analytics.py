@@ -0,0 +1,241 @@
+from app.models.BaseModel.analytics import quiz_attempt, accuracy_breakdown, quiz_analytics_summary, daily_quiz_stats
+from app.services.lazy_imports import lazy_import
+from app.services.metrics import record_firestore_reads
+from app.services.tracing import traced
+from typing import Dict, List, Optional
+import datetime
+
+firestore_v1 = lazy_import("google.cloud.firestore_v1")
+base_query = lazy_import("google.cloud.firestore_v1.base_query")
+api_exceptions = lazy_import("google.api_core.exceptions")
+
+# Firestore accepts at most 500 writes per batch
+MAX_BATCH_WRITES = 500
+
+
+def _accuracy(correct: int, questions: int) -> float:
+    return round(correct / questions * 100, 1) if questions else 0.0
+
+
+def local_date(moment: datetime.datetime, tz_offset_minutes: int = 0) -> str:
+    """The user's calendar day of a moment, as YYYY-MM-DD."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    local = moment.astimezone(datetime.timezone.utc) + datetime.timedelta(minutes=tz_offset_minutes)
+    return local.date().isoformat()
+
+
+def attempt_id(quizId: str, attempt_number) -> str:
+    """The attemptId clients send for a submission, so ``rebuild`` marks the same attempts."""
+    return f"{quizId}_{attempt_number}"
+
+
+def _category(value: str) -> str:
+    # Map keys in Firestore cannot be empty
+    return value or 'Unknown'
+
+
+def _increments(attempts: int, questions: int, correct: int, time_taken: int, difficulty: str, quiz_type: str, wrap) -> dict:
+    counts = {'attempts': attempts, 'questions': questions, 'correct': correct}
+    return {
+        **{key: wrap(value) for key, value in counts.items()},
+        'time_taken': wrap(time_taken),
+        'by_difficulty': {_category(difficulty): {key: wrap(value) for key, value in counts.items()}},
+        'by_type': {_category(quiz_type): {key: wrap(value) for key, value in counts.items()}},
+    }
+
+
+def _breakdowns(data: Dict[str, dict]) -> Dict[str, accuracy_breakdown]:
+    return {
+        name: accuracy_breakdown(
+            attempts=counts.get('attempts', 0),
+            questions=counts.get('questions', 0),
+            correct=counts.get('correct', 0),
+            accuracy=_accuracy(counts.get('correct', 0), counts.get('questions', 0)),
+        )
+        for name, counts in (data or {}).items()
+    }
+
+
+def _day_stats(data: dict) -> daily_quiz_stats:
+    return daily_quiz_stats(
+        date=data['date'],
+        attempts=data.get('attempts', 0),
+        questions=data.get('questions', 0),
+        correct=data.get('correct', 0),
+        accuracy=_accuracy(data.get('correct', 0), data.get('questions', 0)),
+    )
+
+
+def summary_from_doc(data: dict) -> quiz_analytics_summary:
+    return quiz_analytics_summary(
+        attempts=data.get('attempts', 0),
+        questions=data.get('questions', 0),
+        correct=data.get('correct', 0),
+        time_taken=data.get('time_taken', 0),
+        accuracy=_accuracy(data.get('correct', 0), data.get('questions', 0)),
+        by_difficulty=_breakdowns(data.get('by_difficulty')),
+        by_type=_breakdowns(data.get('by_type')),
+        updatedAt=data.get('updatedAt'),
+    )
+
+
+def _add(totals: dict, increments: dict) -> None:
+    """Add plain-number increments (nested like the rollup documents) into ``totals``."""
+    for key, value in increments.items():
+        if isinstance(value, dict):
+            _add(totals.setdefault(key, {}), value)
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+class QuizAnalyticsService:
+    """
+    Precomputed quiz analytics, so dashboards and personalization read a fixed number
+    of small documents however long a user's history is:
+
+    - users/{userId}/analytics/quiz: lifetime counters, overall and per difficulty and quiz type
+    - users/{userId}/quiz_analytics_daily/{YYYY-MM-DD}: the same counters for one day, for trends
+
+    Both are updated with ``Increment`` when an attempt is recorded. Users whose history
+    predates the rollups get them built once from their quizzes by ``rebuild``, before
+    their first attempt is added or their rollup is first read.
+
+    users/{userId}/quiz_analytics_attempts/{attemptId} marks every attempt already
+    counted, by ``record_attempt`` or ``rebuild``, so none is counted twice.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def _user(self, userId: str):
+        return self.db.collection('users').document(userId)
+
+    def _summary_ref(self, userId: str):
+        return self._user(userId).collection('analytics').document('quiz')
+
+    def _daily(self, userId: str):
+        return self._user(userId).collection('quiz_analytics_daily')
+
+    def _marker(self, userId: str, attemptId: str):
+        return self._user(userId).collection('quiz_analytics_attempts').document(attemptId)
+
+    def _ensure_built(self, userId: str) -> None:
+        """Build the rollups from the quiz history if they do not exist yet, so increments add to the full history."""
+        exists = self._summary_ref(userId).get().exists
+        record_firestore_reads('analytics')
+        if not exists:
+            self.rebuild(userId)
+
+    @traced("firestore.quiz_analytics.record_attempt")
+    def record_attempt(self, attempt: quiz_attempt) -> bool:
+        """
+        Add one quiz attempt to the lifetime and daily rollups in a single batch.
+
+        Returns:
+            bool: False if an attempt with the same attemptId was already recorded (or
+            counted when the rollups were built from the quiz history)
+        """
+        self._ensure_built(attempt.userId)
+        submitted_at = attempt.submittedAt or datetime.datetime.now(datetime.timezone.utc)
+        day = local_date(submitted_at, attempt.tz_offset_minutes)
+        increments = _increments(
+            1, attempt.total_questions, min(attempt.correct_answers, attempt.total_questions),
+            attempt.time_taken, attempt.difficulty, attempt.quiz_type, firestore_v1.Increment,
+        )
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        batch = self.db.batch()
+        # create() fails if the marker exists (a retry, or a submission the rebuild already
+        # counted), which aborts the whole batch: no attempt is counted twice
+        batch.create(self._marker(attempt.userId, attempt.attemptId), {'recordedAt': now})
+        batch.set(self._summary_ref(attempt.userId), {**increments, 'updatedAt': now}, merge=True)
+        batch.set(self._daily(attempt.userId).document(day), {**increments, 'date': day}, merge=True)
+        try:
+            batch.commit()
+        except api_exceptions.AlreadyExists:
+            return False
+        return True
+
+    @traced("firestore.quiz_analytics.get_summary")
+    def get_summary(self, userId: str) -> Optional[quiz_analytics_summary]:
+        snapshot = self._summary_ref(userId).get()
+        record_firestore_reads('analytics')
+        return summary_from_doc(snapshot.to_dict()) if snapshot.exists else None
+
+    @traced("firestore.quiz_analytics.get_trend")
+    def get_trend(self, userId: str, since: str) -> List[daily_quiz_stats]:
+        """Daily totals from ``since`` (YYYY-MM-DD) on, oldest first."""
+        query = self._daily(userId).where(filter=base_query.FieldFilter('date', '>=', since)).order_by('date')
+        trend = [_day_stats(snapshot.to_dict()) for snapshot in query.stream()]
+        record_firestore_reads('quiz_analytics_daily', max(1, len(trend)))
+        return trend
+
+    @traced("firestore.quiz_analytics.get_recent_days")
+    def get_recent_days(self, userId: str, limit: int = 3) -> List[daily_quiz_stats]:
+        """The last ``limit`` days with attempts, oldest first."""
+        query = self._daily(userId).order_by('date', direction=firestore_v1.Query.DESCENDING).limit(limit)
+        days = [_day_stats(snapshot.to_dict()) for snapshot in query.stream()]
+        record_firestore_reads('quiz_analytics_daily', max(1, len(days)))
+        return days[::-1]
+
+    @traced("firestore.quiz_analytics.rebuild")
+    def rebuild(self, userId: str) -> quiz_analytics_summary:
+        """
+        Recompute both rollups from the user's quizzes and their submissions.
+
+        Reads the whole history once; a submission's score is taken as its number of
+        correct answers. Every submission counted is marked with its attemptId, so
+        recording it again later is a no-op.
+
+        The summary is written with ``create()``, in the same batch as the markers and
+        daily documents (the most recent first, when they do not all fit): if another
+        rebuild or an attempt got there first, nothing is written and the existing
+        rollup is returned, so increments made since are never overwritten.
+        """
+        summary: dict = {}
+        days: Dict[str, dict] = {}
+        attempts: List[tuple] = []  # (day, attemptId)
+        for quiz_doc in self._user(userId).collection('quizes').stream():
+            record_firestore_reads('quizes')
+            quiz = quiz_doc.to_dict()
+            questions = quiz.get('number', 0)
+            if not questions:
+                continue
+            for submission_doc in quiz_doc.reference.collection('submissions').stream():
+                record_firestore_reads('submissions')
+                submission = submission_doc.to_dict()
+                increments = _increments(
+                    1, questions, min(submission.get('score', 0), questions), submission.get('time_taken', 0),
+                    quiz.get('difficulty', ''), quiz.get('quiz_type', ''), lambda value: value,
+                )
+                _add(summary, increments)
+                submitted_at = submission.get('submittedAt') or quiz.get('generatedAt') or datetime.datetime.now(datetime.timezone.utc)
+                day = local_date(submitted_at)
+                _add(days.setdefault(day, {}), increments)
+                attempts.append((day, attempt_id(quiz_doc.id, submission.get('attempt_number', submission_doc.id))))
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        # Markers first, then days, the most recent first: those are what a concurrent attempt touches
+        writes = [(self._marker(userId, attemptId), {'recordedAt': now}) for _, attemptId in sorted(attempts, reverse=True)]
+        writes.extend((self._daily(userId).document(day), {**days[day], 'date': day}) for day in sorted(days, reverse=True))
+        first = self.db.batch()
+        first.create(self._summary_ref(userId), {**summary, 'updatedAt': now})
+        for ref, data in writes[:MAX_BATCH_WRITES - 1]:
+            first.set(ref, data)
+        try:
+            first.commit()
+        except api_exceptions.AlreadyExists:
+            print(f"Quiz analytics for user {userId} were built concurrently, keeping those")
+            return self.get_summary(userId)
+        for start in range(MAX_BATCH_WRITES - 1, len(writes), MAX_BATCH_WRITES):
+            batch = self.db.batch()
+            for ref, data in writes[start:start + MAX_BATCH_WRITES]:
+                batch.set(ref, data)
+            batch.commit()
+        print(f"Rebuilt quiz analytics for user {userId}: {summary.get('attempts', 0)} attempts over {len(days)} days")
+        return summary_from_doc({**summary, 'updatedAt': now})
+
+    def get_or_rebuild_summary(self, userId: str) -> quiz_analytics_summary:
+        """The lifetime rollup, built from the quiz history the first time it is needed."""
+        return self.get_summary(userId) or self.rebuild(userId)
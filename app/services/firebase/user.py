@@ -1,5 +1,7 @@
 from app.models.BaseModel.personalized.firebase import User
 from app.models.BaseModel.personalized.personal import Personalized_User_Content
+from app.services.metrics import record_firestore_reads
+from app.services.tracing import traced
 
 def extract_personalized_user(user_data) -> Personalized_User_Content:
     return Personalized_User_Content(
@@ -14,8 +16,10 @@ class UserService:
     def __init__(self, db):
         self.db = db
 
+    @traced("firestore.users.get")
     def get_user_by_id(self, userId: str):
         user_doc = self.db.collection('users').document(userId).get()
+        record_firestore_reads('users')
         if user_doc.exists:
             return User(**user_doc.to_dict())
         
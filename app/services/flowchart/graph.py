@@ -0,0 +1,178 @@
+"""
+Server-side processing of generated flowcharts.
+
+Gemini returns a flowchart as a flat list of nodes whose ``children`` are indices
+into that list. Nothing stops it from producing cycles, nodes no path reaches, or
+duplicate edges, and laying a large graph out took noticeable time on low-end
+student devices. ``layout_flowchart`` therefore cleans the graph up and lays it out
+once, here:
+
+1. Duplicate edges and self-loops are removed.
+2. Cycles are broken by dropping the edges that close them (back edges of a
+   depth-first search from the root, node 0).
+3. Nodes not reachable from the root are pruned and the rest renumbered in
+   breadth-first order, so the root stays at index 0.
+4. Each node gets a depth (its longest path from the root, so every edge points
+   down), nodes are ordered within their level to reduce edge crossings, and
+   x/y coordinates are computed for a top-down layered layout.
+"""
+
+from typing import Dict, List, Set, Tuple
+from app.models.BaseModel.flowchart import Node, Nodes
+
+# Layout grid, in the frontend's layout units
+NODE_SPACING_X = 240
+LEVEL_SPACING_Y = 140
+# Rounds of barycenter ordering (down, then up) used to reduce edge crossings
+ORDERING_SWEEPS = 4
+
+
+def _clean_edges(nodes: List[Node]) -> List[List[int]]:
+    """Children per node with self-loops, duplicates and out-of-range indices removed."""
+    edges = []
+    for i, node in enumerate(nodes):
+        seen: Set[int] = set()
+        children = []
+        for child in node.children or []:
+            if child != i and 0 <= child < len(nodes) and child not in seen:
+                seen.add(child)
+                children.append(child)
+        edges.append(children)
+    return edges
+
+
+def break_cycles(edges: List[List[int]], root: int = 0) -> Tuple[List[List[int]], int]:
+    """
+    Drop the back edges found by an iterative depth-first search from ``root``.
+
+    Returns:
+        The acyclic edges and the number of edges removed
+    """
+    state = [0] * len(edges)  # 0 unvisited, 1 on the current path, 2 done
+    acyclic: List[List[int]] = [[] for _ in edges]
+    removed = 0
+    stack = [(root, 0)]
+    state[root] = 1
+    while stack:
+        node, position = stack[-1]
+        if position == len(edges[node]):
+            state[node] = 2
+            stack.pop()
+            continue
+        stack[-1] = (node, position + 1)
+        child = edges[node][position]
+        if state[child] == 1:
+            removed += 1  # Points back at an ancestor: closes a cycle
+            continue
+        acyclic[node].append(child)
+        if state[child] == 0:
+            state[child] = 1
+            stack.append((child, 0))
+    return acyclic, removed
+
+
+def _breadth_first(edges: List[List[int]], root: int = 0) -> List[int]:
+    order = [root]
+    seen = {root}
+    for node in order:
+        for child in edges[node]:
+            if child not in seen:
+                seen.add(child)
+                order.append(child)
+    return order
+
+
+def _depths(order: List[int], edges: List[List[int]]) -> List[int]:
+    """Longest-path depth from the root (node 0) of every node of an acyclic graph."""
+    parents: Dict[int, List[int]] = {i: [] for i in range(len(order))}
+    for node in range(len(order)):
+        for child in edges[node]:
+            parents[child].append(node)
+
+    # Kahn's algorithm: a node's depth is final once all its parents are placed
+    remaining = {node: len(parents[node]) for node in parents}
+    depth = [0] * len(order)
+    ready = [0]
+    while ready:
+        node = ready.pop()
+        for child in edges[node]:
+            depth[child] = max(depth[child], depth[node] + 1)
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                ready.append(child)
+    return depth
+
+
+def _order_levels(levels: List[List[int]], edges: List[List[int]]) -> List[List[int]]:
+    """Reorder each level by the mean position of its neighbours in the adjacent level."""
+    parents: Dict[int, List[int]] = {}
+    for node, children in enumerate(edges):
+        for child in children:
+            parents.setdefault(child, []).append(node)
+
+    def sweep(level: List[int], neighbours: Dict[int, List[int]], position: Dict[int, int]) -> List[int]:
+        def barycenter(node: int) -> float:
+            placed = [position[n] for n in neighbours.get(node, []) if n in position]
+            return sum(placed) / len(placed) if placed else position.get(node, 0)
+        return sorted(level, key=lambda node: (barycenter(node), node))
+
+    for sweep_round in range(ORDERING_SWEEPS):
+        downward = sweep_round % 2 == 0
+        indices = range(1, len(levels)) if downward else range(len(levels) - 2, -1, -1)
+        for i in indices:
+            adjacent = levels[i - 1] if downward else levels[i + 1]
+            position = {node: p for p, node in enumerate(adjacent)}
+            position.update({node: p for p, node in enumerate(levels[i]) if node not in position})
+            levels[i] = sweep(levels[i], parents if downward else {n: edges[n] for n in levels[i]}, position)
+    return levels
+
+
+def layout_flowchart(flowchart: Nodes) -> Nodes:
+    """
+    Return the flowchart as a layered, acyclic graph reachable from node 0, with
+    ``depth``, ``x`` and ``y`` set on every node and ``levels`` on the flowchart.
+    """
+    if not flowchart.nodes:
+        return flowchart
+
+    edges, removed = break_cycles(_clean_edges(flowchart.nodes))
+    order = _breadth_first(edges)
+    pruned = len(flowchart.nodes) - len(order)
+    if removed or pruned:
+        print(f"Flowchart cleaned up: {removed} cycle edges removed, {pruned} unreachable nodes pruned")
+
+    # Renumber in breadth-first order; the root keeps index 0
+    new_index = {old: new for new, old in enumerate(order)}
+    new_edges = [[new_index[child] for child in edges[old]] for old in order]
+    depth = _depths(order, new_edges)
+
+    levels: List[List[int]] = [[] for _ in range(max(depth) + 1)]
+    for node, d in enumerate(depth):
+        levels[d].append(node)
+    levels = _order_levels(levels, new_edges)
+
+    x: Dict[int, float] = {}
+    for level in levels:
+        # Each level is centred under the root
+        offset = (len(level) - 1) / 2
+        for position, node in enumerate(level):
+            x[node] = (position - offset) * NODE_SPACING_X
+
+    nodes = [
+        Node(
+            label=flowchart.nodes[old].label,
+            children=new_edges[new] or None,
+            depth=depth[new],
+            x=x[new],
+            y=depth[new] * LEVEL_SPACING_Y,
+        )
+        for new, old in enumerate(order)
+    ]
+    width = max(len(level) for level in levels)
+    return Nodes(
+        nodes=nodes,
+        levels=levels,
+        width=(width - 1) * NODE_SPACING_X,
+        height=(len(levels) - 1) * LEVEL_SPACING_Y,
+    )
+
@@ -0,0 +1,103 @@
+"""
+Lazy loading of heavy third-party modules.
+
+Importing ``main`` used to pull in PyMuPDF, python-docx, python-pptx, PIL, the
+speech and audio stack, BeautifulSoup, readability, deep_translator, the Firestore
+SDK and google-genai before the first request could be served, although most
+requests touch one or two of them. Modules are now registered here with
+``lazy_import`` and imported on first attribute access:
+
+    fitz = lazy_import("fitz")
+    doc = fitz.open(...)  # PyMuPDF is imported here, once
+
+``preload`` imports registered modules ahead of time (used by worker warmup), and
+``load_times`` reports what was loaded and how long it took.
+"""
+
+import importlib
+import threading
+import time
+from types import ModuleType
+from typing import Dict, Iterable, Optional
+
+
+class LazyModule:
+    """Stands in for a module and imports it the first time one of its attributes is used."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    _load_times[self._name] = (time.perf_counter() - start) * 1000
+                    self._module = module
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute: str, value) -> None:
+        # Assignments such as monkeypatching ``requests.get`` must reach the real module
+        if attribute.startswith("_"):
+            object.__setattr__(self, attribute, value)
+        else:
+            setattr(self._load(), attribute, value)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+_lock = threading.RLock()
+_registry: Dict[str, LazyModule] = {}
+_load_times: Dict[str, float] = {}
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Register a module to be imported on first use.
+
+    Args:
+        name (str): Absolute module name, e.g. "PIL.Image"
+
+    Returns:
+        LazyModule: The same stand-in for every caller registering this name
+    """
+    with _lock:
+        if name not in _registry:
+            _registry[name] = LazyModule(name)
+        return _registry[name]
+
+
+def preload(names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """
+    Import registered modules now, e.g. before a worker starts taking requests.
+
+    Args:
+        names (Optional[Iterable[str]]): Modules to load, all registered ones by default.
+            Modules that fail to import are reported and skipped.
+
+    Returns:
+        Dict[str, float]: Import time in milliseconds of every module loaded so far
+    """
+    for name in list(names if names is not None else _registry):
+        try:
+            lazy_import(name)._load()
+        except ImportError as e:
+            print(f"Could not preload {name}: {e}")
+    return load_times()
+
+
+def load_times() -> Dict[str, float]:
+    """Import time in milliseconds of each lazily loaded module that has been loaded."""
+    with _lock:
+        return dict(_load_times)
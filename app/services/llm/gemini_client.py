@@ -0,0 +1,236 @@
+"""
+Shared Gemini client.
+
+All Gemini calls go through ``generate_content`` / ``generate_content_stream`` here
+instead of module-level clients, so quota, retries and the circuit breaker apply to
+the whole process. The model is picked by the router from the task class the caller
+declares. Transient failures (429, 5xx, network errors) are retried with jittered
+exponential backoff; when they persist the caller gets GeminiUnavailableError and can
+degrade, and the API answers 503 with a Retry-After header.
+"""
+
+import os
+import random
+import time
+from typing import Any, Dict, Iterator, Optional
+from dotenv import load_dotenv
+from app.services.llm.rate_limiter import rate_limiter, circuit_breaker, CircuitOpenError, QuotaTimeoutError
+from app.services.llm.token_counter import token_counter
+from app.services.llm.model_router import model_router, DEFAULT_MODEL, LONG_GENERATE, MODEL_UNAVAILABLE_TTL
+from app.services.lazy_imports import lazy_import
+from app.services.tracing import span, traced, start_span, use_span, end_span, annotate, add_event
+
+# google-genai takes about half a second to import; it is loaded with the first client
+genai = lazy_import("google.genai")
+errors = lazy_import("google.genai.errors")
+httpx = lazy_import("httpx")
+
+load_dotenv()
+
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "4"))
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 20.0
+# Room for the response when estimating the tokens a call will use
+EXPECTED_OUTPUT_TOKENS = 1500
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+_client: Optional["genai.Client"] = None
+
+
+class GeminiUnavailableError(Exception):
+    """Gemini could not serve the request: quota exhausted, backend failing, or circuit open."""
+
+    def __init__(self, message: str, retry_after: float = 30):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def get_client() -> "genai.Client":
+    global _client
+    if _client is None:
+        _client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    return _client
+
+
+def estimate_request_tokens(contents: Any) -> int:
+    """Rough token estimate for quota accounting, reconciled with the reported usage afterwards."""
+    return token_counter.estimate_tokens(str(contents)) + EXPECTED_OUTPUT_TOKENS
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+def _call_with_retries(call, contents: Any, call_site: str):
+    """Run ``call()`` under the rate limiter, retrying transient failures."""
+    try:
+        circuit_breaker.before_call()
+    except CircuitOpenError as e:
+        raise GeminiUnavailableError(str(e), retry_after=e.retry_after)
+
+    estimated = estimate_request_tokens(contents)
+    last_error: Optional[Exception] = None
+    for attempt in range(GEMINI_MAX_ATTEMPTS):
+        try:
+            with span("gemini.quota_wait", estimated_tokens=estimated):
+                rate_limiter.acquire(estimated)
+        except QuotaTimeoutError as e:
+            # Our own queue was full, which says nothing about Gemini's health
+            circuit_breaker.release_trial()
+            raise GeminiUnavailableError(str(e))
+        try:
+            result = call()
+        except Exception as e:
+            if not _is_retryable(e):
+                # Bad request or similar: Gemini is healthy, the call itself is wrong
+                circuit_breaker.record_success()
+                raise
+            last_error = e
+            if isinstance(e, errors.APIError) and e.code == 429:
+                rate_limiter.on_throttled()
+            if attempt + 1 < GEMINI_MAX_ATTEMPTS:
+                delay = _backoff(attempt)
+                add_event("gemini.retry", attempt=attempt + 1, error=str(e)[:200], delay_seconds=round(delay, 2))
+                print(f"Gemini {call_site} call failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+            continue
+        circuit_breaker.record_success()
+        rate_limiter.on_success()
+        return result, estimated
+
+    circuit_breaker.record_failure()
+    raise GeminiUnavailableError(f"Gemini {call_site} call failed after {GEMINI_MAX_ATTEMPTS} attempts: {last_error}")
+
+
+def _is_model_missing(error: Exception) -> bool:
+    return isinstance(error, errors.APIError) and error.code == 404
+
+
+@traced("gemini.generate_content")
+def generate_content(contents: Any, config: Optional[Dict[str, Any]] = None, task: str = LONG_GENERATE, call_site: str = "gemini", model: Optional[str] = None):
+    """
+    Rate-limited ``client.models.generate_content`` on the model routed for ``task``.
+
+    Args:
+        contents: The prompt
+        config: Generation config
+        task (str): Task class (see model_router), decides the model
+        call_site (str): Name of the caller, for metrics
+        model (Optional[str]): Explicit model, bypassing the router
+
+    Raises:
+        GeminiUnavailableError: If the call could not be completed
+    """
+    model = model or model_router.model_for(task)
+    started = time.perf_counter()
+    try:
+        try:
+            response, estimated = _call_with_retries(
+                lambda: get_client().models.generate_content(model=model, contents=contents, config=config),
+                contents,
+                call_site,
+            )
+        except errors.APIError as e:
+            if not _is_model_missing(e) or model == DEFAULT_MODEL:
+                raise
+            # A routed model that is not enabled for this project should not take the feature down;
+            # the router sends the next calls straight to the default model
+            print(f"Model {model} unavailable for {call_site}, using {DEFAULT_MODEL} for the next {MODEL_UNAVAILABLE_TTL:.0f}s")
+            model_router.mark_unavailable(model)
+            model = DEFAULT_MODEL
+            response, estimated = _call_with_retries(
+                lambda: get_client().models.generate_content(model=model, contents=contents, config=config),
+                contents,
+                call_site,
+            )
+    except Exception:
+        annotate(**{"gemini.task": task, "gemini.call_site": call_site, "gemini.model": model})
+        model_router.record(task, call_site, model, (time.perf_counter() - started) * 1000, error=True)
+        raise
+
+    usage = getattr(response, "usage_metadata", None)
+    input_tokens = output_tokens = 0
+    if usage is not None:
+        input_tokens = usage.prompt_token_count or 0
+        output_tokens = usage.candidates_token_count or 0
+        if usage.total_token_count:
+            rate_limiter.reconcile(estimated, usage.total_token_count)
+    annotate(**{
+        "gemini.task": task,
+        "gemini.call_site": call_site,
+        "gemini.model": model,
+        "gemini.input_tokens": input_tokens,
+        "gemini.output_tokens": output_tokens,
+    })
+    model_router.record(task, call_site, model, (time.perf_counter() - started) * 1000, input_tokens, output_tokens)
+    return response
+
+
+def generate_content_stream(contents: Any, config: Optional[Dict[str, Any]] = None, task: str = LONG_GENERATE, call_site: str = "gemini", model: Optional[str] = None) -> Iterator[Any]:
+    """
+    Rate-limited ``client.models.generate_content_stream`` on the model routed for ``task``.
+
+    Only opening the stream and receiving the first chunk are retried; a stream that
+    fails halfway raises to the caller, which has already passed data on.
+    """
+    model = model or model_router.model_for(task)
+    started = time.perf_counter()
+
+    def open_stream():
+        stream = iter(get_client().models.generate_content_stream(model=model, contents=contents, config=config))
+        return stream, next(stream, None)
+
+    # Not made current: the generator is suspended between chunks, possibly in other threads
+    current = start_span("gemini.generate_content_stream", **{"gemini.task": task, "gemini.call_site": call_site, "gemini.model": model})
+    usage = None
+    estimated = 0
+    error: Optional[BaseException] = None
+    try:
+        with use_span(current):
+            try:
+                (stream, first), estimated = _call_with_retries(open_stream, contents, call_site)
+            except errors.APIError as e:
+                if not _is_model_missing(e) or model == DEFAULT_MODEL:
+                    raise
+                # Nothing has been yielded yet, so the stream can still be reopened on the default model
+                print(f"Model {model} unavailable for {call_site}, using {DEFAULT_MODEL} for the next {MODEL_UNAVAILABLE_TTL:.0f}s")
+                model_router.mark_unavailable(model)
+                model = DEFAULT_MODEL
+                current.set_attribute("gemini.model", model)
+                (stream, first), estimated = _call_with_retries(open_stream, contents, call_site)
+        if first is not None:
+            usage = getattr(first, "usage_metadata", None)
+            current.add_event("first_chunk")
+            yield first
+            for chunk in stream:
+                # Usage is reported on the chunks, the last one carries the totals
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                yield chunk
+    except Exception as e:
+        error = e
+        model_router.record(task, call_site, model, (time.perf_counter() - started) * 1000, error=True)
+        raise
+    finally:
+        # Also reached when the consumer stops reading early
+        if usage is not None:
+            current.set_attribute("gemini.input_tokens", usage.prompt_token_count or 0)
+            current.set_attribute("gemini.output_tokens", usage.candidates_token_count or 0)
+            if estimated and usage.total_token_count:
+                rate_limiter.reconcile(estimated, usage.total_token_count)
+        end_span(current, error)
+    model_router.record(
+        task,
+        call_site,
+        model,
+        (time.perf_counter() - started) * 1000,
+        (usage.prompt_token_count or 0) if usage else 0,
+        (usage.candidates_token_count or 0) if usage else 0,
+    )
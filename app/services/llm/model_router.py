@@ -0,0 +1,167 @@
+"""
+Model routing by task class.
+
+Call sites declare what kind of work they send to Gemini instead of naming a model:
+
+- ``title``: a handful of words from a short excerpt (quiz titles)
+- ``short_transform``: rewriting text the model is given, e.g. merging chunk summaries
+  or translating segments
+- ``long_generate``: generating study material from long source text
+
+Each class maps to a model (overridable per environment) with a latency and a cost
+budget. Every call is recorded per route so the budgets can be checked against what
+the models actually deliver. A routed model the project cannot use (404) is skipped in
+favour of the default model for a while, instead of failing once per call.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from dotenv import load_dotenv
+from app.services.metrics import observe_gemini_call
+
+load_dotenv()
+
+TITLE = "title"
+SHORT_TRANSFORM = "short_transform"
+LONG_GENERATE = "long_generate"
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+# USD per million tokens (input, output)
+MODEL_PRICES = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+}
+
+# Latency samples kept per route for percentiles
+LATENCY_WINDOW = 500
+# Seconds a model that answered 404 is replaced by DEFAULT_MODEL before it is tried again
+MODEL_UNAVAILABLE_TTL = float(os.getenv("GEMINI_MODEL_UNAVAILABLE_TTL", "600"))
+
+
+class ModelRoute:
+    def __init__(self, task: str, model: str, latency_budget_ms: int, cost_budget_usd: float):
+        self.task = task
+        self.model = model
+        self.latency_budget_ms = latency_budget_ms
+        self.cost_budget_usd = cost_budget_usd  # Per call
+
+
+def _route_from_env(task: str, model: str, latency_budget_ms: int, cost_budget_usd: float) -> ModelRoute:
+    prefix = f"GEMINI_{task.upper()}"
+    return ModelRoute(
+        task=task,
+        model=os.getenv(f"{prefix}_MODEL", model),
+        latency_budget_ms=int(os.getenv(f"{prefix}_LATENCY_BUDGET_MS", str(latency_budget_ms))),
+        cost_budget_usd=float(os.getenv(f"{prefix}_COST_BUDGET_USD", str(cost_budget_usd))),
+    )
+
+
+def call_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    input_price, output_price = MODEL_PRICES.get(model, MODEL_PRICES[DEFAULT_MODEL])
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+class RouteStats:
+    def __init__(self):
+        self.calls = 0
+        self.models: Dict[str, int] = {}  # Calls per model actually used
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+        self.over_latency_budget = 0
+        self.over_cost_budget = 0
+        self.latencies_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.latencies_ms:
+            return None
+        ordered = sorted(self.latencies_ms)
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 1)
+
+
+class ModelRouter:
+    def __init__(self):
+        self.routes: Dict[str, ModelRoute] = {
+            TITLE: _route_from_env(TITLE, "gemini-2.0-flash-lite", 2000, 0.0005),
+            SHORT_TRANSFORM: _route_from_env(SHORT_TRANSFORM, "gemini-2.0-flash-lite", 8000, 0.002),
+            LONG_GENERATE: _route_from_env(LONG_GENERATE, DEFAULT_MODEL, 30000, 0.01),
+        }
+        self._stats: Dict[str, RouteStats] = {}
+        self._unavailable: Dict[str, float] = {}  # Model -> monotonic time it may be tried again
+        self._lock = threading.Lock()
+
+    def route(self, task: str) -> ModelRoute:
+        return self.routes.get(task, self.routes[LONG_GENERATE])
+
+    def model_for(self, task: str) -> str:
+        """The model to call for ``task``: its route's model, unless that was recently unavailable."""
+        model = self.route(task).model
+        with self._lock:
+            retry_at = self._unavailable.get(model)
+            if retry_at is None:
+                return model
+            if time.monotonic() < retry_at:
+                return DEFAULT_MODEL
+            del self._unavailable[model]
+        return model
+
+    def mark_unavailable(self, model: str, ttl: float = MODEL_UNAVAILABLE_TTL) -> None:
+        """Route around ``model`` for ``ttl`` seconds, e.g. after it answered 404."""
+        if model == DEFAULT_MODEL:
+            return
+        with self._lock:
+            self._unavailable[model] = time.monotonic() + ttl
+
+    def record(self, task: str, call_site: str, model: str, latency_ms: float, input_tokens: int = 0, output_tokens: int = 0, error: bool = False) -> None:
+        """Record one call for the ``task/call_site`` route."""
+        route = self.route(task)
+        key = f"{task}/{call_site}"
+        cost = call_cost(model, input_tokens, output_tokens)
+        observe_gemini_call(task, call_site, model, latency_ms, input_tokens, output_tokens, error)
+        with self._lock:
+            stats = self._stats.setdefault(key, RouteStats())
+            stats.calls += 1
+            stats.models[model] = stats.models.get(model, 0) + 1
+            stats.latencies_ms.append(latency_ms)
+            if error:
+                stats.errors += 1
+                return
+            stats.input_tokens += input_tokens
+            stats.output_tokens += output_tokens
+            stats.cost_usd += cost
+            if latency_ms > route.latency_budget_ms:
+                stats.over_latency_budget += 1
+            if cost > route.cost_budget_usd:
+                stats.over_cost_budget += 1
+        if latency_ms > route.latency_budget_ms:
+            print(f"Gemini {key} on {model} took {latency_ms:.0f}ms, over its {route.latency_budget_ms}ms budget")
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            return {
+                key: {
+                    "model": self.route(key.split("/")[0]).model,
+                    "models_used": dict(stats.models),
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "p50_ms": stats.percentile(0.5),
+                    "p95_ms": stats.percentile(0.95),
+                    "input_tokens": stats.input_tokens,
+                    "output_tokens": stats.output_tokens,
+                    "cost_usd": round(stats.cost_usd, 6),
+                    "over_latency_budget": stats.over_latency_budget,
+                    "over_cost_budget": stats.over_cost_budget,
+                }
+                for key, stats in self._stats.items()
+            }
+
+
+# Global instance
+model_router = ModelRouter()
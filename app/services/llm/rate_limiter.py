@@ -0,0 +1,224 @@
+"""
+Client-side quota management for Gemini.
+
+Every Gemini call goes through one process-wide limiter:
+
+- Two token buckets sized to the project quota, one for requests per minute and one
+  for tokens per minute. A call waits until both have room.
+- Waiting callers are served by priority class, so interactive requests jump ahead of
+  bulk jobs that are queued behind the same quota.
+- When Gemini answers 429 the request rate is halved and then recovers a little with
+  every success (AIMD), so the limiter settles just under the real quota instead of
+  bursting into it repeatedly.
+- A circuit breaker stops sending requests for a cooldown after consecutive failures,
+  so callers fail fast and can degrade instead of queueing behind a dead backend.
+"""
+
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "60"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+# Worker processes sharing the project quota (set by gunicorn.conf.py); each limits itself to an equal share
+GEMINI_QUOTA_WORKERS = max(1, int(os.getenv("GEMINI_QUOTA_WORKERS", "1")))
+# Longest a call waits for quota before giving up
+GEMINI_QUEUE_TIMEOUT = float(os.getenv("GEMINI_QUEUE_TIMEOUT", "60"))
+GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5"))
+GEMINI_BREAKER_COOLDOWN = float(os.getenv("GEMINI_BREAKER_COOLDOWN", "30"))
+
+# Priority classes, lower is served first
+INTERACTIVE = 0
+BULK = 1
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("gemini_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority(level: int) -> Iterator[None]:
+    """Run the Gemini calls made inside the block with the given priority class."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+class QuotaTimeoutError(Exception):
+    """No quota became available within the queue timeout."""
+
+
+class CircuitOpenError(Exception):
+    """Gemini has failed repeatedly and calls are paused for a cooldown."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Gemini is unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket refilled continuously. Not thread-safe; the limiter holds the lock."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until the bucket holds ``amount`` tokens (never more than capacity)."""
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.refill_per_second)
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = GEMINI_BREAKER_THRESHOLD, cooldown: float = GEMINI_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if calls are paused. In half-open state one trial call is let through."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            elapsed = time.monotonic() - self.opened_at
+            raise CircuitOpenError(max(1.0, self.cooldown - elapsed))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """End a half-open trial that never reached Gemini, without counting it either way."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    print(f"Gemini circuit breaker opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class RateLimiter:
+    def __init__(self, rpm: float = GEMINI_RPM / GEMINI_QUOTA_WORKERS, tpm: float = GEMINI_TPM / GEMINI_QUOTA_WORKERS, queue_timeout: float = GEMINI_QUEUE_TIMEOUT):
+        self.max_rps = rpm / 60
+        self.requests = TokenBucket(capacity=max(1, int(rpm // 6)), refill_per_second=self.max_rps)  # Bursts up to 10s worth
+        self.tokens = TokenBucket(capacity=tpm, refill_per_second=tpm / 60)
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._waiting: List[Tuple[int, int]] = []  # heap of (priority, ticket)
+        self._tickets = itertools.count()
+        self.throttled = 0  # 429 responses seen
+        self.queued_seconds = 0.0
+
+    def acquire(self, estimated_tokens: int, level: Optional[int] = None) -> float:
+        """
+        Block until one request and ``estimated_tokens`` tokens are available.
+
+        Callers are served in priority order, then first come first served.
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            QuotaTimeoutError: If the quota did not free up within the queue timeout
+        """
+        entry = (current_priority() if level is None else level, next(self._tickets))
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.requests.refill(now)
+                    self.tokens.refill(now)
+                    if self._waiting[0] == entry:
+                        wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+                        if wait == 0:
+                            self.requests.tokens -= 1
+                            self.tokens.tokens -= estimated_tokens
+                            break
+                    else:
+                        wait = 0.05  # Re-check once the head of the queue has been served
+                    if now + wait > deadline:
+                        raise QuotaTimeoutError(f"Waited {self.queue_timeout:.0f}s for Gemini quota")
+                    self._cond.wait(timeout=min(wait, deadline - now))
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+        waited = time.monotonic() - started
+        self.queued_seconds += waited
+        return waited
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Charge the difference between the estimate and the tokens Gemini reports."""
+        with self._cond:
+            self.tokens.tokens -= actual_tokens - estimated_tokens
+
+    def on_throttled(self) -> None:
+        """Gemini returned 429: halve the request rate and drain the burst allowance."""
+        with self._cond:
+            self.throttled += 1
+            self.requests.refill_per_second = max(self.max_rps / 16, self.requests.refill_per_second / 2)
+            self.requests.tokens = min(self.requests.tokens, 0)
+        print(f"Gemini quota exceeded, request rate reduced to {self.requests.refill_per_second * 60:.0f}/min")
+
+    def on_success(self) -> None:
+        """Recover the request rate gradually after throttling."""
+        if self.requests.refill_per_second < self.max_rps:
+            with self._cond:
+                self.requests.refill_per_second = min(self.max_rps, self.requests.refill_per_second + self.max_rps / 20)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "current_rpm": round(self.requests.refill_per_second * 60, 1),
+            "configured_rpm": round(self.max_rps * 60, 1),
+            "waiting": len(self._waiting),
+            "throttled": self.throttled,
+            "queued_seconds": round(self.queued_seconds, 2),
+        }
+
+
+# Global instances
+rate_limiter = RateLimiter()
+circuit_breaker = CircuitBreaker()
@@ -0,0 +1,115 @@
+"""
+Schema-constrained Gemini output.
+
+The pydantic model describing a response is passed to Gemini as ``response_schema``,
+so the model can only produce JSON of that shape, and the same model validates the
+result in one step. Responses that still fail validation are counted per call site
+so the malformed-output rate can be watched.
+"""
+
+import threading
+from typing import Any, Dict, Type, TypeVar
+from pydantic import TypeAdapter, ValidationError
+from app.services.llm.gemini_client import generate_content
+from app.services.llm.model_router import LONG_GENERATE
+
+T = TypeVar("T")
+
+# One retry covers the rare truncated or empty response; anything beyond that is a real failure
+MAX_STRUCTURED_ATTEMPTS = 2
+
+
+class MalformedOutputError(ValueError):
+    """Gemini returned output that does not match the requested schema."""
+
+
+class StructuredOutputStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, int] = {}
+        self._malformed: Dict[str, int] = {}
+
+    def record(self, call_site: str, malformed: bool) -> None:
+        with self._lock:
+            self._calls[call_site] = self._calls.get(call_site, 0) + 1
+            if malformed:
+                self._malformed[call_site] = self._malformed.get(call_site, 0) + 1
+
+    def malformed_rate(self, call_site: str) -> float:
+        calls = self._calls.get(call_site, 0)
+        return round(self._malformed.get(call_site, 0) / calls, 4) if calls else 0.0
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                call_site: {
+                    "calls": calls,
+                    "malformed": self._malformed.get(call_site, 0),
+                    "malformed_rate": self.malformed_rate(call_site),
+                }
+                for call_site, calls in self._calls.items()
+            }
+
+
+# Global instance
+structured_output_stats = StructuredOutputStats()
+
+_adapters: Dict[Any, TypeAdapter] = {}
+
+
+def _adapter(schema: Any) -> TypeAdapter:
+    if schema not in _adapters:
+        _adapters[schema] = TypeAdapter(schema)
+    return _adapters[schema]
+
+
+def structured_config(schema: Any) -> Dict[str, Any]:
+    """Generation config that constrains the response to the given pydantic model or list of models."""
+    return {"response_mime_type": "application/json", "response_schema": schema}
+
+
+def parse_structured(text: str, schema: Type[T], call_site: str) -> T:
+    """Validate a complete JSON response against the schema, recording the outcome."""
+    try:
+        value = _adapter(schema).validate_json(text)
+    except ValidationError as e:
+        structured_output_stats.record(call_site, malformed=True)
+        print(f"Malformed {call_site} output ({structured_output_stats.malformed_rate(call_site):.1%} of calls): {e.error_count()} errors")
+        raise MalformedOutputError(f"Response does not match the {call_site} schema: {e.errors()[0]['msg']}") from e
+    structured_output_stats.record(call_site, malformed=False)
+    return value
+
+
+def generate_structured(
+    prompt: str,
+    schema: Type[T],
+    call_site: str,
+    task: str = LONG_GENERATE,
+) -> T:
+    """
+    Generate a response constrained to a schema and return it validated.
+
+    Args:
+        prompt (str): The prompt
+        schema: A pydantic model, or a ``list[...]`` of one, describing the response
+        call_site (str): Name used for the malformed-output metric, e.g. "flashcards"
+        task (str): Task class that picks the model (see model_router)
+
+    Returns:
+        The validated response
+
+    Raises:
+        MalformedOutputError: If no valid response was produced
+        GeminiUnavailableError: If Gemini could not be reached
+    """
+    error: Exception = MalformedOutputError(f"No {call_site} response received from Gemini")
+    for _ in range(MAX_STRUCTURED_ATTEMPTS):
+        response = generate_content(prompt, structured_config(schema), task=task, call_site=call_site)
+        if not response.text:
+            structured_output_stats.record(call_site, malformed=True)
+            continue
+        try:
+            return parse_structured(response.text, schema, call_site)
+        except MalformedOutputError as e:
+            error = e
+    raise error
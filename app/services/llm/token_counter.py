@@ -0,0 +1,250 @@
+"""
+Token accounting for Gemini prompts.
+
+``count_tokens`` asks the model for the real token count and caches it by text hash.
+When the remote count is unavailable (the text is too short to be worth a call, the
+circuit breaker is open, or the caller is on the event loop, which must not wait on
+the network) the offline estimator is used: letters are counted per Unicode script and divided by
+a characters-per-token ratio for that script. The ratios start from conservative
+defaults and are refined from every real count, so the estimator tracks the model's
+tokenizer for the scripts we actually serve instead of assuming 4 characters per token.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from app.services.llm.rate_limiter import circuit_breaker
+from app.services.text.language_detection import script_counts
+from app.services.shared_cache import shared_cache
+from app.services.tracing import traced
+
+load_dotenv()
+
+# Set to 0 to never call the count_tokens API (offline estimates only)
+TOKEN_COUNT_REMOTE = os.getenv("TOKEN_COUNT_REMOTE", "1") != "0"
+# Below this size the estimate is close enough that a network call is not worth it
+MIN_REMOTE_COUNT_CHARS = 2000
+TOKEN_COUNT_CACHE_ENTRIES = 4096
+# Remote counts are also kept in the node-wide cache, so other workers do not recount the same text
+TOKEN_COUNT_SHARED_TTL = 7 * 24 * 3600
+
+# Starting characters-per-token ratios (letters only, whitespace excluded), refined at runtime
+DEFAULT_CHARS_PER_TOKEN = {
+    "Latin": 3.6,
+    "Greek": 2.4,
+    "Cyrillic": 3.0,
+    "Hebrew": 2.4,
+    "Arabic": 2.6,
+    "Devanagari": 2.4,
+    "Bengali": 2.2,
+    "Gurmukhi": 2.2,
+    "Gujarati": 2.2,
+    "Tamil": 2.3,
+    "Telugu": 2.2,
+    "Thai": 2.4,
+    "Hangul": 1.5,
+    "Hiragana": 1.3,
+    "Katakana": 1.5,
+    "Han": 1.2,
+    "Other": 2.0,
+}
+# Digits and punctuation
+SYMBOLS_PER_TOKEN = 1.6
+# Weight of a new observation when refining a ratio
+CALIBRATION_RATE = 0.2
+# Only calibrate a script from texts where it makes up most of the letters
+CALIBRATION_MIN_SHARE = 0.8
+
+SENTENCE_END = re.compile(r'(?<=[.!?。！？।])\s+')
+WORD = re.compile(r'\S+')
+
+# (start, end, tokens) of a piece of the text being split
+Span = Tuple[int, int, float]
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def _sentence_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """Start and end of every sentence, without the whitespace between sentences."""
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        if match.start() > start:
+            yield start, match.start()
+        start = match.end()
+    if start < len(text):
+        yield start, len(text)
+
+
+class TokenCounter:
+    def __init__(self, remote: bool = TOKEN_COUNT_REMOTE, cache_entries: int = TOKEN_COUNT_CACHE_ENTRIES):
+        self.remote = remote
+        self.cache_entries = cache_entries
+        self.chars_per_token: Dict[str, float] = dict(DEFAULT_CHARS_PER_TOKEN)
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.remote_counts = 0
+        self.remote_failures = 0
+
+    def _breakdown(self, text: str) -> Dict[str, int]:
+        """Letters per script plus a "Symbols" entry for digits and punctuation."""
+        counts = dict(script_counts(text))
+        letters = sum(counts.values())
+        counts["Symbols"] = len(text) - letters - sum(ch.isspace() for ch in text)
+        return counts
+
+    def _estimate_from(self, counts: Dict[str, int]) -> float:
+        tokens = counts.get("Symbols", 0) / SYMBOLS_PER_TOKEN
+        for script, letters in counts.items():
+            if script != "Symbols":
+                tokens += letters / self.chars_per_token.get(script, self.chars_per_token["Other"])
+        return tokens
+
+    def estimate_tokens(self, text: str) -> int:
+        """Offline estimate, no network call."""
+        if not text:
+            return 0
+        return max(1, round(self._estimate_from(self._breakdown(text))))
+
+    def _calibrate(self, counts: Dict[str, int], actual: int) -> None:
+        letters = {script: n for script, n in counts.items() if script != "Symbols"}
+        total_letters = sum(letters.values())
+        if not total_letters:
+            return
+        script, n = max(letters.items(), key=lambda item: item[1])
+        if n / total_letters < CALIBRATION_MIN_SHARE:
+            return
+        with self._lock:
+            # Tokens left for the dominant script after the other scripts and symbols are accounted for
+            others = self._estimate_from({k: v for k, v in counts.items() if k != script})
+            script_tokens = actual - others
+            if script_tokens <= 0:
+                return
+            observed = min(8.0, max(0.5, n / script_tokens))
+            current = self.chars_per_token.get(script, self.chars_per_token["Other"])
+            self.chars_per_token[script] = round(current + CALIBRATION_RATE * (observed - current), 3)
+
+    @traced("gemini.count_tokens")
+    def _count_remote(self, text: str, model: str) -> Optional[int]:
+        # Imported here: the Gemini client module itself uses this counter for quota estimates
+        from app.services.llm.gemini_client import get_client
+        try:
+            response = get_client().models.count_tokens(model=model, contents=text)
+            self.remote_counts += 1
+            return response.total_tokens
+        except Exception as e:
+            self.remote_failures += 1
+            print(f"Token count unavailable, using estimate: {e}")
+            return None
+
+    def count_tokens(self, text: str, model: str = "gemini-2.0-flash") -> int:
+        """
+        Number of tokens the model will see for this text.
+
+        Uses the model's count when available (cached per text), otherwise the estimate.
+        Never calls the API from the event loop thread or while Gemini's circuit breaker
+        is open.
+        """
+        if not text:
+            return 0
+        if not self.remote or len(text) < MIN_REMOTE_COUNT_CHARS:
+            return self.estimate_tokens(text)
+
+        key = hashlib.sha1(f"{model}\0{text}".encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        actual = shared_cache.get("token_counts", key)
+        if actual is None:
+            if _on_event_loop() or circuit_breaker.state != "closed":
+                return self.estimate_tokens(text)
+            actual = self._count_remote(text, model)
+            if actual is None:
+                return self.estimate_tokens(text)
+            self._calibrate(self._breakdown(text), actual)
+            shared_cache.set("token_counts", key, actual, TOKEN_COUNT_SHARED_TTL)
+        with self._lock:
+            self._cache[key] = actual
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return actual
+
+    def split_by_tokens(self, text: str, max_tokens: int) -> List[str]:
+        """
+        Split text into chunks of at most ``max_tokens``, on sentence boundaries where possible.
+
+        Sentences are measured with the estimator, scaled so that the estimate for the
+        whole text matches its real count. Chunks are cut out of the text as it is, so
+        paragraph breaks and other separators inside a chunk are kept.
+        """
+        total = self.count_tokens(text)
+        if total <= max_tokens:
+            return [text]
+        scale = total / max(1, self.estimate_tokens(text))
+
+        spans: List[Span] = []
+        for start, end in _sentence_spans(text):
+            tokens = self.estimate_tokens(text[start:end]) * scale
+            if tokens > max_tokens:
+                # A single sentence that is too long on its own: split it by words
+                spans.extend(self._split_words(text, start, end, max_tokens, scale))
+            else:
+                spans.append((start, end, tokens))
+        return [text[start:end] for start, end, _ in self._pack(spans, max_tokens)]
+
+    @staticmethod
+    def _pack(spans: List[Span], max_tokens: int) -> List[Span]:
+        """Merge consecutive spans into spans of at most ``max_tokens``."""
+        packed: List[Span] = []
+        for start, end, tokens in spans:
+            if packed and packed[-1][2] + tokens <= max_tokens:
+                packed[-1] = (packed[-1][0], end, packed[-1][2] + tokens)
+            else:
+                packed.append((start, end, tokens))
+        return packed
+
+    def _split_words(self, text: str, start: int, end: int, max_tokens: int, scale: float) -> List[Span]:
+        spans: List[Span] = []
+        for match in WORD.finditer(text, start, end):
+            tokens = self.estimate_tokens(match.group()) * scale
+            if tokens > max_tokens:
+                # No spaces to split on (e.g. Chinese or Japanese): cut by characters
+                step = max(1, int(len(match.group()) * max_tokens / tokens))
+                spans.extend(
+                    (i, min(i + step, match.end()), self.estimate_tokens(text[i:min(i + step, match.end())]) * scale)
+                    for i in range(match.start(), match.end(), step)
+                )
+            else:
+                spans.append((match.start(), match.end(), tokens))
+        return self._pack(spans, max_tokens)
+
+    def truncate_to_tokens(self, text: str, max_tokens: int) -> str:
+        """Return the longest prefix of whole sentences that fits in ``max_tokens``."""
+        chunks = self.split_by_tokens(text, max_tokens)
+        if len(chunks) > 1:
+            print(f"Text truncated to {max_tokens} tokens ({len(chunks[0])} of {len(text)} characters)")
+        return chunks[0]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "remote_counts": self.remote_counts,
+            "remote_failures": self.remote_failures,
+            "cached": len(self._cache),
+            "chars_per_token": dict(self.chars_per_token),
+        }
+
+
+# Global instance
+token_counter = TokenCounter()
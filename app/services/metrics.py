@@ -0,0 +1,273 @@
+"""
+Prometheus metrics, served at ``/metrics``.
+
+Measured as requests run:
+
+- ``http_request_duration_seconds``: latency per route template, method and status
+- ``gemini_call_duration_seconds`` / ``gemini_tokens``: every Gemini call per task,
+  call site and model (recorded with the model router's stats)
+- ``firestore_reads_total`` per collection, and ``firestore_reads_per_request`` per route
+- ``extraction_duration_seconds``: text extraction per uploaded file type
+
+Read from the in-process stats at scrape time (``AppStatsCollector``): cache hit
+ratios, executor queue depths, the Gemini rate limiter, structured output and
+language drift counters, lazy import times.
+
+Under gunicorn, set ``PROMETHEUS_MULTIPROC_DIR`` to an empty directory shared by the
+workers: the histograms and counters are then aggregated across workers, and the
+scrape-time gauges describe the worker that answered, labelled with its pid.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from starlette.responses import Response
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Gemini calls range from sub-second titles to minute-long generations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+READ_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to serve a request, including streamed bodies",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+GEMINI_CALL_DURATION = Histogram(
+    "gemini_call_duration_seconds",
+    "Gemini call latency",
+    ["task", "call_site", "model", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+GEMINI_TOKENS = Histogram(
+    "gemini_tokens",
+    "Tokens per Gemini call",
+    ["call_site", "model", "direction"],
+    buckets=TOKEN_BUCKETS,
+)
+FIRESTORE_READS = Counter(
+    "firestore_reads_total",
+    "Firestore documents read",
+    ["collection"],
+)
+FIRESTORE_READS_PER_REQUEST = Histogram(
+    "firestore_reads_per_request",
+    "Firestore documents read while serving one request",
+    ["route"],
+    buckets=READ_BUCKETS,
+)
+EXTRACTION_DURATION = Histogram(
+    "extraction_duration_seconds",
+    "Text extraction time per uploaded file type",
+    ["file_type", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Firestore reads of the request being served; a list so executor threads running
+# in a copied context add to the same count (under the lock, as several threads of
+# one request can read at once)
+_request_reads: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar("firestore_reads", default=None)
+_request_reads_lock = threading.Lock()
+
+
+def observe_gemini_call(task: str, call_site: str, model: str, latency_ms: float, input_tokens: int = 0, output_tokens: int = 0, error: bool = False) -> None:
+    GEMINI_CALL_DURATION.labels(task, call_site, model, "error" if error else "ok").observe(latency_ms / 1000)
+    if error:
+        return
+    GEMINI_TOKENS.labels(call_site, model, "input").observe(input_tokens)
+    GEMINI_TOKENS.labels(call_site, model, "output").observe(output_tokens)
+
+
+def record_firestore_reads(collection: str, count: int = 1) -> None:
+    """Count documents read from ``collection``, for the process and the current request."""
+    if count <= 0:
+        return
+    FIRESTORE_READS.labels(collection).inc(count)
+    reads = _request_reads.get()
+    if reads is not None:
+        with _request_reads_lock:
+            reads[0] += count
+
+
+@contextmanager
+def extraction_timer(file_type: str) -> Iterator[None]:
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        EXTRACTION_DURATION.labels(file_type, outcome).observe(time.perf_counter() - start)
+
+
+def route_template(scope) -> Optional[str]:
+    """
+    Full template of the route that served the request, e.g. ``/api/v1/flashcard/reviews/due``.
+
+    The router leaves the matched route in the scope; behind ``include_router`` its path
+    can be relative to the router's prefix, so the prefix is taken from the request path.
+    """
+    route = getattr(scope.get("route"), "path", None)
+    if not route:
+        return None
+    segments = scope["path"].strip("/").split("/")
+    prefix = segments[:max(0, len(segments) - len(route.strip("/").split("/")))]
+    return "".join(f"/{segment}" for segment in prefix) + route
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request under its route template (``/api/v1/flashcard/reviews/due``,
+    never the raw path) and counts its Firestore reads. Streaming bodies are included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        reads = [0]
+        token = _request_reads.set(reads)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_reads.reset(token)
+            # Unmatched paths share one label
+            route = route_template(scope) or "unmatched"
+            if route != "/metrics":
+                HTTP_REQUEST_DURATION.labels(scope["method"], route, str(status["code"])).observe(time.perf_counter() - start)
+                FIRESTORE_READS_PER_REQUEST.labels(route).observe(reads[0])
+
+
+def _gauge(name: str, documentation: str, labels: List[str]) -> GaugeMetricFamily:
+    return GaugeMetricFamily(name, documentation, labels=labels + (["pid"] if MULTIPROC_DIR else []))
+
+
+class AppStatsCollector:
+    """Turns the services' own ``stats()`` into gauges when Prometheus scrapes."""
+
+    def describe(self):
+        # Registered at import time, before the services it reads can be imported
+        return []
+
+    def collect(self):
+        # Imported here: these modules record into this one
+        from app.services.llm.model_router import model_router
+        from app.services.llm.rate_limiter import rate_limiter
+        from app.services.llm.structured_output import structured_output_stats
+        from app.services.llm.token_counter import token_counter
+        from app.services.lazy_imports import load_times
+        from app.services.shared_cache import shared_cache
+        from app.services.text.language_detection import detect_language
+        from app.services.text.output_language import output_language_stats
+        from app.services.text.translation_memory import translation_memory
+        from app.services.warmup import executors
+
+        pid = [str(os.getpid())] if MULTIPROC_DIR else []
+
+        cache_hit_ratio = _gauge("cache_hit_ratio", "Hit ratio of in-process and shared caches since start", ["cache"])
+        cache_requests = _gauge("cache_requests", "Cache lookups since start", ["cache", "result"])
+        memory = translation_memory.stats()
+        caches = {"translation_memory": (memory["hits"], memory["misses"])}
+        for namespace, stats in shared_cache.stats().items():
+            caches[f"shared:{namespace}"] = (stats["hits"], stats["misses"])
+        language = detect_language.cache_info()
+        caches["language_detection"] = (language.hits, language.misses)
+        for cache, (hits, misses) in caches.items():
+            cache_hit_ratio.add_metric([cache] + pid, hits / (hits + misses) if hits + misses else 0.0)
+            cache_requests.add_metric([cache, "hit"] + pid, hits)
+            cache_requests.add_metric([cache, "miss"] + pid, misses)
+        yield cache_hit_ratio
+        yield cache_requests
+
+        token_cache = _gauge("token_counter_remote_counts", "Token counts fetched from Gemini since start", ["result"])
+        token_stats = token_counter.stats()
+        token_cache.add_metric(["ok"] + pid, token_stats["remote_counts"])
+        token_cache.add_metric(["failed"] + pid, token_stats["remote_failures"])
+        yield token_cache
+
+        queue_depth = _gauge("executor_queue_depth", "Tasks waiting for a thread in each executor", ["executor"])
+        threads = _gauge("executor_threads", "Threads started by each executor", ["executor"])
+        for name, executor in executors().items():
+            queue_depth.add_metric([name] + pid, executor._work_queue.qsize())
+            threads.add_metric([name] + pid, len(executor._threads))
+        yield queue_depth
+        yield threads
+
+        limiter = rate_limiter.stats()
+        rate_limit = _gauge("gemini_rate_limiter", "Gemini client-side rate limiter state", ["field"])
+        for field in ("current_rpm", "configured_rpm", "waiting", "throttled", "queued_seconds"):
+            rate_limit.add_metric([field] + pid, limiter[field])
+        yield rate_limit
+
+        budget = _gauge("gemini_over_budget_calls", "Gemini calls over their route's latency or cost budget", ["route", "budget"])
+        for route, stats in model_router.stats().items():
+            budget.add_metric([route, "latency"] + pid, stats["over_latency_budget"])
+            budget.add_metric([route, "cost"] + pid, stats["over_cost_budget"])
+        yield budget
+
+        malformed = _gauge("structured_output_malformed_ratio", "Share of Gemini responses that did not match the schema", ["call_site"])
+        for call_site, stats in structured_output_stats.stats().items():
+            malformed.add_metric([call_site] + pid, stats["malformed_rate"])
+        yield malformed
+
+        drift = _gauge("output_language_fields", "Generated fields checked for the requested language", ["call_site", "result"])
+        for call_site, stats in output_language_stats.stats().items():
+            drift.add_metric([call_site, "checked"] + pid, stats["fields_checked"])
+            drift.add_metric([call_site, "drifted"] + pid, stats["fields_drifted"])
+            drift.add_metric([call_site, "regenerated"] + pid, stats["fields_regenerated"])
+        yield drift
+
+        imports = _gauge("lazy_import_seconds", "Time spent importing each lazily loaded module", ["module"])
+        for module, milliseconds in load_times().items():
+            imports.add_metric([module] + pid, milliseconds / 1000)
+        yield imports
+
+
+# Global instance
+app_stats_collector = AppStatsCollector()
+if not MULTIPROC_DIR:
+    REGISTRY.register(app_stats_collector)
+
+
+def metrics_response() -> Response:
+    """The Prometheus exposition for this process, or for all workers in multiprocess mode."""
+    registry = REGISTRY
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(app_stats_collector)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop a gunicorn worker's live series when it exits."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,64 @@
+from app.db.mongodb import get_db
+from app.models.BaseModel.mongo.Schema import Response, ScoreHistory
+from bson import ObjectId
+from typing import List, Optional
+
+# Fields of a response without the question bodies
+SCORE_HISTORY_PROJECTION = {
+    "quiz_type": 1,
+    "difficulty": 1,
+    "numbers": 1,
+    "attempts": 1,
+    "best_score": 1,
+    "score": 1,
+}
+SUMMARY_PROJECTION = {"questions": 0, "score.question_answer": 0}
+
+
+def _object_id(value: str):
+    return ObjectId(value) if ObjectId.is_valid(value) else value
+
+
+async def get_response(response_id: str) -> Optional[Response]:
+    """
+    Read a full response, questions included.
+    """
+    db = get_db()
+    document = await db.responses.find_one({"_id": _object_id(response_id)})
+    return Response.model_validate(document) if document else None
+
+
+async def get_score_history(response_id: str, last: Optional[int] = None) -> Optional[ScoreHistory]:
+    """
+    Read the scores of a quiz without its questions.
+
+    Args:
+        response_id (str): ID of the response
+        last (Optional[int]): Only return the most recent ``last`` scores
+
+    Returns:
+        Optional[ScoreHistory]: The score history, or None if the response does not exist
+    """
+    db = get_db()
+    projection = dict(SCORE_HISTORY_PROJECTION)
+    if last:
+        projection["score"] = {"$slice": -last}
+    document = await db.responses.find_one({"_id": _object_id(response_id)}, projection)
+    return ScoreHistory.model_validate(document) if document else None
+
+
+async def list_user_responses(user_id: str, limit: int = 20, skip: int = 0) -> List[dict]:
+    """
+    Most recent responses of a user, without questions or submitted answers.
+
+    Served by the (userId, createdAt) index. Responses are saved with their userId as a
+    string (see ``PyObjectId``'s serializer), so it is matched as one.
+    """
+    db = get_db()
+    cursor = (
+        db.responses.find({"userId": str(user_id)}, SUMMARY_PROJECTION)
+        .sort("createdAt", -1)
+        .skip(skip)
+        .limit(limit)
+    )
+    return await cursor.to_list(length=limit)
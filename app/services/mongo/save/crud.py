@@ -1,5 +1,9 @@
 from app.db.mongodb import get_db
 from app.models.BaseModel.mongo.Schema import Response, User
+from typing import List, Any
+
+# Documents per insert_many/bulk_write round trip
+BULK_CHUNK_SIZE = 500
 
 async def save_response(response: Response) -> Response:
     """
@@ -21,4 +25,46 @@ async def save_user(user_data: User) -> User:
     user_dict.pop("_id", None)
     result = await db.users.insert_one(user_dict)
     user_data._id = result.inserted_id
-    return user_data
\ No newline at end of file
+    return user_data
+
+
+def _response_document(response: Response) -> dict:
+    response_dict = response.model_dump(by_alias=True)
+    response_dict.pop("_id", None)
+    return response_dict
+
+
+async def save_responses(responses: List[Response]) -> List[Response]:
+    """
+    Save several responses with unordered insert_many calls instead of one round trip each.
+
+    Args:
+        responses (List[Response]): Responses to save
+
+    Returns:
+        List[Response]: The same responses, with their new IDs set
+    """
+    db = get_db()
+    for start in range(0, len(responses), BULK_CHUNK_SIZE):
+        chunk = responses[start:start + BULK_CHUNK_SIZE]
+        result = await db.responses.insert_many([_response_document(r) for r in chunk], ordered=False)
+        for response, inserted_id in zip(chunk, result.inserted_ids):
+            response._id = inserted_id
+    return responses
+
+
+async def bulk_write_responses(operations: List[Any]) -> List[Any]:
+    """
+    Apply a mix of response inserts and updates in unordered bulk_write calls.
+
+    Args:
+        operations (List[Any]): pymongo write operations (InsertOne, UpdateOne, ...) on the responses collection
+
+    Returns:
+        List[Any]: One pymongo BulkWriteResult per round trip
+    """
+    db = get_db()
+    results = []
+    for start in range(0, len(operations), BULK_CHUNK_SIZE):
+        results.append(await db.responses.bulk_write(operations[start:start + BULK_CHUNK_SIZE], ordered=False))
+    return results
@@ -1,5 +1,14 @@
 from app.db.mongodb import get_db
-from app.models.BaseModel.mongo.Schema import Response, User
+from app.models.BaseModel.mongo.Schema import Response, User, Score
+from bson import ObjectId
+from datetime import datetime, timezone
+from typing import Dict
+
+
+def _object_id(value: str):
+    return ObjectId(value) if ObjectId.is_valid(value) else value
+
+
 async def update_response(response_id: str, response_data: Response) -> Response:
     """
     Update a response in the MongoDB database.
@@ -24,4 +33,67 @@ async def update_user(user_id: str, user_data: User) -> User:
     if result.modified_count == 0:
         raise ValueError("No user found with the given ID.")
     
-    return user_data
\ No newline at end of file
+    return user_data
+
+async def add_score(response_id: str, score: Score) -> bool:
+    """
+    Record one quiz attempt: push the score and update the counters in a single update.
+
+    Only the new score is sent, instead of rewriting the whole response with its questions.
+    Responses scored before the counters existed get them computed from their score list
+    once, the first time a score is added.
+
+    Args:
+        response_id (str): ID of the response (quiz) the attempt belongs to
+        score (Score): The attempt's score
+
+    Returns:
+        bool: True if the response was found
+    """
+    db = get_db()
+    now = datetime.now(timezone.utc)
+    if score.createdAt is None:
+        score = score.model_copy(update={"createdAt": now.isoformat()})
+    _id = _object_id(response_id)
+    update = {
+        "$push": {"score": score.model_dump()},
+        "$inc": {"attempts": 1, "total_score": score.score},
+        "$max": {"best_score": score.score},
+        "$set": {"updatedAt": now},
+    }
+    # Only responses whose counters are maintained, so $inc never starts a legacy one from 0
+    result = await db.responses.update_one({"_id": _id, "attempts": {"$ne": None}}, update)
+    if result.matched_count == 0:
+        # No counters yet (saved as null, or older than the field): backfill them from the
+        # score list once, then add the attempt. Concurrent backfills match only once.
+        await db.responses.update_one(
+            {"_id": _id, "attempts": None},
+            [{
+                "$set": {
+                    "attempts": {"$size": {"$ifNull": ["$score", []]}},
+                    "total_score": {"$sum": "$score.score"},
+                    "best_score": {"$max": "$score.score"},
+                }
+            }],
+        )
+        result = await db.responses.update_one({"_id": _id, "attempts": {"$ne": None}}, update)
+    if result.matched_count == 0:
+        raise ValueError("No response found with the given ID.")
+    return True
+
+
+async def increment_response_counters(response_id: str, counters: Dict[str, int]) -> bool:
+    """
+    Increment numeric counters on a response, e.g. {"attempts": 1}.
+
+    Returns:
+        bool: True if the response was found
+    """
+    db = get_db()
+    result = await db.responses.update_one(
+        {"_id": _object_id(response_id)},
+        {"$inc": counters, "$set": {"updatedAt": datetime.now(timezone.utc)}},
+    )
+    if result.matched_count == 0:
+        raise ValueError("No response found with the given ID.")
+    return True
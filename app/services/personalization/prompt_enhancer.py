@@ -2,37 +2,44 @@
 Utility functions for creating personalized prompts based on user details
 """
 
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from app.services.firebase.get_persionalized_content import get_personalized_content
-from app.models.BaseModel.personalized.personal import Personalized_User_Content, Personalized_Content, Personalized_Quiz, Personalized_Flowchart, Personalized_Flashcard
+from app.models.BaseModel.personalized.personal import Personalized_User_Content, Personalized_Content, Personalized_Flowchart, Personalized_Flashcard
+from app.models.BaseModel.analytics import accuracy_breakdown, quiz_analytics_summary
 
 
-def get_quiz_performance_insights(quizzes: List[Personalized_Quiz]) -> List[str]:
+def _most_attempted(breakdowns: Dict[str, accuracy_breakdown]) -> Optional[str]:
+    return max(breakdowns.items(), key=lambda x: x[1].attempts)[0] if breakdowns else None
+
+
+def _weakest(breakdowns: Dict[str, accuracy_breakdown], min_questions: int = 10) -> Optional[Tuple[str, float]]:
+    """The category with the lowest accuracy, if there are at least two with enough questions."""
+    measured = [(name, b.accuracy) for name, b in breakdowns.items() if b.questions >= min_questions]
+    return min(measured, key=lambda x: x[1]) if len(measured) >= 2 else None
+
+
+def get_quiz_performance_insights(analytics: Optional[quiz_analytics_summary]) -> List[str]:
     """
-    Analyze quiz performance patterns and return insights.
+    Turn the user's precomputed quiz analytics into insights.
     
     Args:
-        quizzes: List of personalized quiz data
+        analytics: Lifetime quiz rollup (accuracy overall, by difficulty and by type)
         
     Returns:
         List[str]: Performance insights for personalization
     """
-    if not quizzes:
+    if not analytics or not analytics.attempts:
         return []
     
     insights = []
     
     try:
-        # Calculate overall performance metrics
-        total_questions = sum(quiz.total_questions for quiz in quizzes)
-        total_correct = sum(quiz.correct_answers for quiz in quizzes)
-        total_incorrect = sum(quiz.incorrect_answers for quiz in quizzes)
-        
-        if total_questions > 0:
-            accuracy = (total_correct / total_questions) * 100
+        # Overall performance
+        if analytics.questions > 0:
+            accuracy = analytics.accuracy
             
             if accuracy >= 85:
-                insights.append(f"Quiz Performance: Excellent ({accuracy:.0f}% accuracy across {len(quizzes)} recent quizzes)")
+                insights.append(f"Quiz Performance: Excellent ({accuracy:.0f}% accuracy across {analytics.attempts} quiz attempts)")
             elif accuracy >= 70:
                 insights.append(f"Quiz Performance: Good ({accuracy:.0f}% accuracy, room for improvement)")
             elif accuracy >= 50:
@@ -40,35 +47,26 @@ def get_quiz_performance_insights(quizzes: List[Personalized_Quiz]) -> List[str]
             else:
                 insights.append(f"Quiz Performance: Needs improvement ({accuracy:.0f}% accuracy, requires more practice)")
         
-        # Analyze difficulty preferences
-        difficulty_counts = {}
-        for quiz in quizzes:
-            difficulty = quiz.difficulty
-            difficulty_counts[difficulty] = difficulty_counts.get(difficulty, 0) + 1
-        
-        if difficulty_counts:
-            preferred_difficulty = max(difficulty_counts.items(), key=lambda x: x[1])[0]
+        # Difficulty and quiz type preferences
+        preferred_difficulty = _most_attempted(analytics.by_difficulty)
+        if preferred_difficulty:
             insights.append(f"Preferred Difficulty: {preferred_difficulty} level questions")
         
-        # Analyze quiz types
-        quiz_type_counts = {}
-        for quiz in quizzes:
-            quiz_type = quiz.quiz_type
-            quiz_type_counts[quiz_type] = quiz_type_counts.get(quiz_type, 0) + 1
-        
-        if quiz_type_counts:
-            preferred_type = max(quiz_type_counts.items(), key=lambda x: x[1])[0]
+        preferred_type = _most_attempted(analytics.by_type)
+        if preferred_type:
             insights.append(f"Preferred Quiz Type: {preferred_type} questions")
         
-        # Analyze time patterns
-        avg_time_per_question = []
-        for quiz in quizzes:
-            if quiz.time_taken and quiz.total_questions > 0:
-                avg_time = sum(quiz.time_taken) / len(quiz.time_taken) if quiz.time_taken else 0
-                avg_time_per_question.append(avg_time / quiz.total_questions if avg_time > 0 else 0)
+        weakest_difficulty = _weakest(analytics.by_difficulty)
+        if weakest_difficulty:
+            insights.append(f"Weakest Difficulty: {weakest_difficulty[0]} questions ({weakest_difficulty[1]:.0f}% accuracy)")
+        
+        weakest_type = _weakest(analytics.by_type)
+        if weakest_type:
+            insights.append(f"Weakest Quiz Type: {weakest_type[0]} questions ({weakest_type[1]:.0f}% accuracy)")
         
-        if avg_time_per_question:
-            avg_time = sum(avg_time_per_question) / len(avg_time_per_question)
+        # Time patterns
+        if analytics.time_taken and analytics.questions > 0:
+            avg_time = analytics.time_taken / analytics.questions
             if avg_time > 120:  # More than 2 minutes per question
                 insights.append("Learning Style: Takes time to think through questions carefully")
             elif avg_time < 30:  # Less than 30 seconds per question
@@ -177,28 +175,25 @@ def get_flashcard_pattern_insights(flashcards: List[Personalized_Flashcard]) ->
     return insights
 
 
-def get_quiz_based_instructions(quizzes: List[Personalized_Quiz]) -> List[str]:
+def get_quiz_based_instructions(analytics: Optional[quiz_analytics_summary]) -> List[str]:
     """
-    Generate personalization instructions based on quiz history.
+    Generate personalization instructions from the user's precomputed quiz analytics.
     
     Args:
-        quizzes: List of personalized quiz data
+        analytics: Lifetime quiz rollup (accuracy overall, by difficulty and by type)
         
     Returns:
         List[str]: Instructions based on quiz patterns
     """
-    if not quizzes:
+    if not analytics or not analytics.attempts:
         return []
     
     instructions = []
     
     try:
         # Performance-based instructions
-        total_questions = sum(quiz.total_questions for quiz in quizzes)
-        total_correct = sum(quiz.correct_answers for quiz in quizzes)
-        
-        if total_questions > 0:
-            accuracy = (total_correct / total_questions) * 100
+        if analytics.questions > 0:
+            accuracy = analytics.accuracy
             
             if accuracy < 60:
                 instructions.append("Provide more detailed explanations and examples to reinforce understanding")
@@ -208,32 +203,25 @@ def get_quiz_based_instructions(quizzes: List[Personalized_Quiz]) -> List[str]:
                 instructions.append("Focus on application and analysis rather than basic recall")
         
         # Difficulty preference instructions
-        difficulty_counts = {}
-        for quiz in quizzes:
-            difficulty = quiz.difficulty
-            difficulty_counts[difficulty] = difficulty_counts.get(difficulty, 0) + 1
-        
-        if difficulty_counts:
-            most_attempted = max(difficulty_counts.items(), key=lambda x: x[1])[0]
-            if most_attempted == "Easy":
-                instructions.append("Gradually introduce intermediate concepts with clear explanations")
-            elif most_attempted == "Hard":
-                instructions.append("Provide challenging content with deep analytical questions")
+        most_attempted = _most_attempted(analytics.by_difficulty)
+        if most_attempted == "Easy":
+            instructions.append("Gradually introduce intermediate concepts with clear explanations")
+        elif most_attempted == "Hard":
+            instructions.append("Provide challenging content with deep analytical questions")
         
         # Quiz type preferences
-        quiz_type_counts = {}
-        for quiz in quizzes:
-            quiz_type = quiz.quiz_type
-            quiz_type_counts[quiz_type] = quiz_type_counts.get(quiz_type, 0) + 1
-        
-        if quiz_type_counts:
-            preferred_type = max(quiz_type_counts.items(), key=lambda x: x[1])[0]
-            if preferred_type == "mcq":
-                instructions.append("Include multiple-choice questions with clear, distinct options")
-            elif preferred_type == "truefalse":
-                instructions.append("Use true/false format for quick concept verification")
-            elif preferred_type == "shortanswer":
-                instructions.append("Encourage descriptive answers and critical thinking")
+        preferred_type = _most_attempted(analytics.by_type)
+        if preferred_type == "mcq":
+            instructions.append("Include multiple-choice questions with clear, distinct options")
+        elif preferred_type == "truefalse":
+            instructions.append("Use true/false format for quick concept verification")
+        elif preferred_type == "shortanswer":
+            instructions.append("Encourage descriptive answers and critical thinking")
+        
+        # Weak spots
+        weakest_type = _weakest(analytics.by_type)
+        if weakest_type and weakest_type[1] < 60:
+            instructions.append(f"Give extra practice and explanation for {weakest_type[0]} questions, where accuracy is lowest")
         
     except Exception as e:
         print(f"Error generating quiz-based instructions: {e}")
@@ -306,11 +294,16 @@ def get_learning_pattern_insights(personalized_content: Personalized_Content) ->
     insights = []
     
     try:
-        quizzes = personalized_content.personalized_quiz.quizzes
+        analytics = personalized_content.quiz_analytics
         flowcharts = personalized_content.personalized_flowchart.flowcharts
         
+        # Quiz engagement is the number of attempts (submissions) in the lifetime rollup, capped at 5
+        # like the flowcharts; retaking one quiz counts every time
+        quiz_count = min(analytics.attempts if analytics else 0, 5)
+        flowchart_count = len(flowcharts)
+        
         # Overall engagement patterns
-        total_activities = len(quizzes) + len(flowcharts)
+        total_activities = quiz_count + flowchart_count
         if total_activities >= 10:
             insights.append("Learning Pattern: Highly engaged learner with consistent practice")
         elif total_activities >= 5:
@@ -321,9 +314,6 @@ def get_learning_pattern_insights(personalized_content: Personalized_Content) ->
             insights.append("Learning Pattern: New to the platform, building learning habits")
         
         # Learning modality preferences
-        quiz_count = len(quizzes)
-        flowchart_count = len(flowcharts)
-        
         if quiz_count > flowchart_count * 2:
             insights.append("Learning Style: Prefers assessment-based learning and testing knowledge")
         elif flowchart_count > quiz_count * 2:
@@ -331,21 +321,15 @@ def get_learning_pattern_insights(personalized_content: Personalized_Content) ->
         elif quiz_count > 0 and flowchart_count > 0:
             insights.append("Learning Style: Balanced approach using both assessment and visual learning")
         
-        # Progress tracking
-        if quizzes and len(quizzes) >= 3:
-            recent_scores = []
-            for quiz in quizzes[-3:]:
-                if quiz.total_questions > 0:
-                    score = (quiz.correct_answers / quiz.total_questions) * 100
-                    recent_scores.append(score)
-            
-            if len(recent_scores) >= 2:
-                if recent_scores[-1] > recent_scores[0] + 10:
-                    insights.append("Progress Trend: Showing improvement in recent assessments")
-                elif recent_scores[-1] < recent_scores[0] - 10:
-                    insights.append("Progress Trend: May need additional support or review")
-                else:
-                    insights.append("Progress Trend: Consistent performance level maintained")
+        # Progress tracking over the most recent days with quiz attempts
+        recent_scores = [day.accuracy for day in personalized_content.quiz_trend if day.questions > 0]
+        if len(recent_scores) >= 2:
+            if recent_scores[-1] > recent_scores[0] + 10:
+                insights.append("Progress Trend: Showing improvement in recent assessments")
+            elif recent_scores[-1] < recent_scores[0] - 10:
+                insights.append("Progress Trend: May need additional support or review")
+            else:
+                insights.append("Progress Trend: Consistent performance level maintained")
         
     except Exception as e:
         print(f"Error analyzing learning patterns: {e}")
@@ -382,7 +366,7 @@ def get_user_context_string(userId: Optional[str] = None, user_context: Optional
             context_parts.append(f"Location: {user_info.country}")
         
         # Add quiz performance insights
-        quiz_insights = get_quiz_performance_insights(personalized_content.personalized_quiz.quizzes)
+        quiz_insights = get_quiz_performance_insights(personalized_content.quiz_analytics)
         if quiz_insights:
             context_parts.extend(quiz_insights)
         
@@ -500,7 +484,7 @@ def get_personalization_instructions(userId: Optional[str] = None, user_context:
             instructions.append(f"When possible, relate concepts to the user's interests: {interests_str}")
         
         # Add quiz-based personalization
-        quiz_based_instructions = get_quiz_based_instructions(personalized_content.personalized_quiz.quizzes)
+        quiz_based_instructions = get_quiz_based_instructions(personalized_content.quiz_analytics)
         instructions.extend(quiz_based_instructions)
         
         # Add flowchart-based personalization
@@ -0,0 +1,126 @@
+"""
+Cache shared by all worker processes on a node.
+
+In-process caches start cold in every gunicorn worker and hold a copy per worker.
+Values that are expensive to recompute (remote token counts, for example) are
+stored here instead: a small SQLite key-value table in WAL mode, which any number
+of processes can read concurrently, with a per-entry expiry.
+
+Connections are per process. A connection opened before gunicorn forks (with
+``preload_app``) is never reused by the children: the owning PID is checked on
+every access and a forked process opens its own.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from app.services.tracing import span
+
+load_dotenv()
+
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", ".cache/shared_cache.sqlite3")
+# Expired entries are purged after this many writes
+PURGE_EVERY_WRITES = 1000
+
+
+class SharedCache:
+    def __init__(self, path: str = SHARED_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._disabled = False
+        self._writes = 0
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def _get_conn(self) -> Optional[sqlite3.Connection]:
+        """Open the store on first use in this process. Falls back to no caching if it cannot be opened."""
+        if self._disabled:
+            return None
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires_at ON cache (expires_at)")
+            # A connection inherited from the parent process is left to the parent
+            self._conn = conn
+            self._pid = os.getpid()
+        except sqlite3.Error as e:
+            print(f"Shared cache unavailable, caching per process only: {e}")
+            self._disabled = True
+        return self._conn
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """The cached value, or None if it is missing or expired."""
+        with span("cache.shared.get", namespace=namespace) as current, self._lock:
+            conn = self._get_conn()
+            row = None
+            if conn is not None:
+                try:
+                    row = conn.execute(
+                        "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+                        (namespace, key, time.time()),
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"Shared cache lookup failed: {e}")
+            counter = self.hits if row else self.misses
+            counter[namespace] = counter.get(namespace, 0) + 1
+            current.set_attribute("cache.hit", row is not None)
+        return json.loads(row[0]) if row else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: float) -> None:
+        """Store a JSON-serializable value for ``ttl_seconds``."""
+        with self._lock:
+            conn = self._get_conn()
+            if conn is None:
+                return
+            now = time.time()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value), now + ttl_seconds),
+                )
+                self._writes += 1
+                if self._writes % PURGE_EVERY_WRITES == 0:
+                    conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+            except sqlite3.Error as e:
+                print(f"Shared cache write failed: {e}")
+
+    def warm(self) -> bool:
+        """Open this process's connection ahead of the first request."""
+        with self._lock:
+            return self._get_conn() is not None
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            namespaces = set(self.hits) | set(self.misses)
+            return {
+                namespace: {
+                    "hits": self.hits.get(namespace, 0),
+                    "misses": self.misses.get(namespace, 0),
+                    "hit_ratio": round(self.hits.get(namespace, 0) / (self.hits.get(namespace, 0) + self.misses.get(namespace, 0)), 3),
+                }
+                for namespace in namespaces
+            }
+
+
+# Global instance
+shared_cache = SharedCache()
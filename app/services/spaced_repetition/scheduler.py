@@ -0,0 +1,76 @@
+"""
+SM-2 spaced-repetition scheduling.
+
+Each card carries a small state record: ease factor, current interval in days,
+successful repetitions in a row, lapses and the next due time. A review grades the
+recall from 0 (blackout) to 5 (perfect); grades of 3 and above count as
+remembered and grow the interval, lower grades reset it.
+"""
+
+import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+# Intervals after the first and second successful review, in days
+FIRST_INTERVAL = 1
+SECOND_INTERVAL = 6
+MAX_INTERVAL = 365
+PASSING_GRADE = 3
+
+
+class card_state(BaseModel):
+    ease: float = INITIAL_EASE
+    interval: int = 0  # Days
+    reps: int = 0  # Successful reviews in a row
+    lapses: int = 0
+    due: datetime.datetime
+    last_review: Optional[datetime.datetime] = None
+
+
+def new_card_state(now: Optional[datetime.datetime] = None) -> card_state:
+    """State of a card that has never been reviewed: due immediately."""
+    return card_state(due=now or datetime.datetime.now(datetime.timezone.utc))
+
+
+def review(state: card_state, grade: int, reviewed_at: Optional[datetime.datetime] = None) -> card_state:
+    """
+    Apply one review to a card's state.
+
+    Args:
+        state (card_state): The card's current state
+        grade (int): Recall quality, 0-5
+        reviewed_at (Optional[datetime.datetime]): Time of the review, now by default
+
+    Returns:
+        card_state: The new state
+    """
+    if not 0 <= grade <= 5:
+        raise ValueError(f"Grade must be between 0 and 5, got {grade}")
+    reviewed_at = reviewed_at or datetime.datetime.now(datetime.timezone.utc)
+
+    if grade >= PASSING_GRADE:
+        if state.reps == 0:
+            interval = FIRST_INTERVAL
+        elif state.reps == 1:
+            interval = SECOND_INTERVAL
+        else:
+            interval = round(state.interval * state.ease)
+        reps = state.reps + 1
+        lapses = state.lapses
+    else:
+        interval = FIRST_INTERVAL
+        reps = 0
+        lapses = state.lapses + 1
+
+    ease = max(MIN_EASE, state.ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    interval = min(MAX_INTERVAL, max(FIRST_INTERVAL, interval))
+    return card_state(
+        ease=round(ease, 3),
+        interval=interval,
+        reps=reps,
+        lapses=lapses,
+        due=reviewed_at + datetime.timedelta(days=interval),
+        last_review=reviewed_at,
+    )
@@ -0,0 +1,52 @@
+"""
+Streaming Gemini JSON responses.
+
+Wraps ``generate_content_stream`` with the incremental JSON parser so callers get
+items, fields and text deltas while the model is still writing, followed by the
+fully parsed document.
+"""
+
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional
+from app.services.llm.gemini_client import generate_content_stream
+from app.services.llm.model_router import LONG_GENERATE
+from app.services.streaming.incremental_json import IncrementalJSONParser
+from app.services.llm.structured_output import structured_config, parse_structured
+
+
+def stream_json_events(
+    prompt: str,
+    item_paths: Iterable[str] = (),
+    delta_paths: Iterable[str] = (),
+    task: str = LONG_GENERATE,
+    schema: Optional[Any] = None,
+    call_site: str = "stream",
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream a JSON response from Gemini.
+
+    Yields the parser events (see IncrementalJSONParser) as they complete, then a final
+    ``{"type": "result", "value": ...}`` with the whole document. With a ``schema`` the
+    output is constrained to it and the result is the validated model. Raises ValueError
+    if the stream ends before the document is complete or does not match the schema.
+    """
+    parser = IncrementalJSONParser(item_paths=item_paths, delta_paths=delta_paths)
+    started = time.perf_counter()
+    first_event_ms = None
+    config = structured_config(schema) if schema is not None else {"response_mime_type": "application/json"}
+    stream = generate_content_stream(prompt, config, task=task, call_site=call_site)
+    for chunk in stream:
+        if not chunk.text:
+            continue
+        for event in parser.feed(chunk.text):
+            if first_event_ms is None:
+                first_event_ms = round((time.perf_counter() - started) * 1000)
+            yield event
+        if parser.complete:
+            break
+
+    print(f"Streamed response: first content after {first_event_ms}ms, complete after {round((time.perf_counter() - started) * 1000)}ms")
+    if schema is not None:
+        yield {"type": "result", "value": parse_structured(parser.document(), schema, call_site)}
+    else:
+        yield {"type": "result", "value": parser.result()}
@@ -0,0 +1,186 @@
+"""
+Incremental JSON parsing for streamed LLM output.
+
+Gemini streams a JSON document in arbitrary text chunks. The parser below consumes
+those chunks and reports pieces of the document as soon as they are complete:
+each element of a watched array, each top-level field, and the growing text of
+watched string fields. That lets an endpoint show the first flashcard or bullet
+while the rest is still being generated.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# A trailing backslash escape that has not fully arrived yet
+INCOMPLETE_ESCAPE = re.compile(r'(?<!\\)((?:\\\\)*)\\(u[0-9a-fA-F]{0,3})?$')
+
+
+class IncrementalJSONParser:
+    """
+    Streaming parser for a single JSON object.
+
+    Paths are dotted object keys from the root, e.g. ``"flowchart.nodes"``. Events:
+
+    - ``{"type": "item", "path": ..., "index": n, "value": ...}`` for every complete
+      element of an array at one of ``item_paths``
+    - ``{"type": "field", "key": ..., "value": ...}`` for every complete top-level field
+    - ``{"type": "delta", "key": ..., "text": ...}`` for newly received text of a string
+      at one of ``delta_paths``
+    """
+
+    def __init__(self, item_paths: Iterable[str] = (), delta_paths: Iterable[str] = ()):
+        self.item_paths = {tuple(path.split(".")) for path in item_paths}
+        self.delta_paths = {tuple(path.split(".")) for path in delta_paths}
+        self.buffer = ""
+        self.pos = 0
+        self.root_start: Optional[int] = None
+        self.stack: List[Dict[str, Any]] = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.string_is_key = False
+        self.scalar_start: Optional[int] = None
+        self.delta_emitted = 0
+        self.complete = False
+
+    def _value_path(self) -> Tuple[str, ...]:
+        frame = self.stack[-1]
+        if frame["type"] == "object":
+            return frame["path"] + (frame["key"],)
+        return frame["path"]
+
+    def _in_delta_string(self) -> bool:
+        # Only strings that are the value of a field, not array elements at the same path
+        return self.stack[-1]["type"] == "object" and self._value_path() in self.delta_paths
+
+    def _value_start(self, i: int) -> None:
+        frame = self.stack[-1]
+        if frame["type"] == "array" and frame["watched"]:
+            frame["item_start"] = i
+
+    def _value_end(self, end: int, events: List[Dict[str, Any]]) -> None:
+        if not self.stack:
+            return
+        frame = self.stack[-1]
+        if frame["type"] == "array" and frame["watched"] and frame["item_start"] is not None:
+            value = json.loads(self.buffer[frame["item_start"]:end])
+            events.append({"type": "item", "path": ".".join(frame["path"]), "index": frame["index"], "value": value})
+            frame["index"] += 1
+            frame["item_start"] = None
+        elif frame["type"] == "object" and len(self.stack) == 1 and frame.get("value_start") is not None:
+            value = json.loads(self.buffer[frame["value_start"]:end])
+            events.append({"type": "field", "key": frame["key"], "value": value})
+            frame["value_start"] = None
+
+    def _end_scalar(self, i: int, events: List[Dict[str, Any]]) -> None:
+        if self.scalar_start is not None:
+            self.scalar_start = None
+            self._value_end(i, events)
+
+    def _mark_root_value(self, i: int) -> None:
+        if len(self.stack) == 1 and self.stack[0]["type"] == "object":
+            self.stack[0]["value_start"] = i
+
+    def _string_delta(self, final: bool) -> Optional[str]:
+        raw = self.buffer[self.string_start + 1:self.pos - 1 if final else self.pos]
+        if not final:
+            raw = INCOMPLETE_ESCAPE.sub(lambda m: m.group(1) or "", raw)
+        text = json.loads('"' + raw + '"')
+        if not final and text and "\ud800" <= text[-1] <= "\udbff":
+            # First half of a surrogate pair; wait for the second half
+            text = text[:-1]
+        delta = text[self.delta_emitted:]
+        self.delta_emitted = len(text)
+        return delta or None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume the next chunk of text and return the events it completed."""
+        events: List[Dict[str, Any]] = []
+        self.buffer += chunk
+        while self.pos < len(self.buffer) and not self.complete:
+            i = self.pos
+            c = self.buffer[i]
+            self.pos += 1
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.string_is_key:
+                        self.stack[-1]["key"] = json.loads(self.buffer[self.string_start:i + 1])
+                    else:
+                        if self._in_delta_string():
+                            delta = self._string_delta(final=True)
+                            if delta:
+                                events.append({"type": "delta", "key": ".".join(self._value_path()), "text": delta})
+                        self._value_end(i + 1, events)
+                continue
+
+            if not self.stack:
+                # Skip anything before the root object, e.g. a stray markdown fence
+                if c == "{":
+                    self.root_start = i
+                    self.stack.append({"type": "object", "path": (), "key": None, "expect": "key", "value_start": None})
+                continue
+
+            frame = self.stack[-1]
+            if c == '"':
+                self.in_string = True
+                self.string_start = i
+                self.string_is_key = frame["type"] == "object" and frame["expect"] == "key"
+                if not self.string_is_key:
+                    self.delta_emitted = 0
+                    self._mark_root_value(i)
+                    self._value_start(i)
+            elif c in "{[":
+                path = self._value_path()
+                self._mark_root_value(i)
+                self._value_start(i)
+                if c == "{":
+                    self.stack.append({"type": "object", "path": path, "key": None, "expect": "key"})
+                else:
+                    self.stack.append({"type": "array", "path": path, "watched": path in self.item_paths, "item_start": None, "index": 0})
+            elif c in "}]":
+                self._end_scalar(i, events)
+                self.stack.pop()
+                if not self.stack:
+                    self.complete = True
+                else:
+                    self._value_end(i + 1, events)
+            elif c == ":":
+                frame["expect"] = "value"
+            elif c == ",":
+                self._end_scalar(i, events)
+                if frame["type"] == "object":
+                    frame["expect"] = "key"
+            elif c.isspace():
+                self._end_scalar(i, events)
+            elif self.scalar_start is None:
+                self.scalar_start = i
+                self._mark_root_value(i)
+                self._value_start(i)
+
+        if self.in_string and not self.string_is_key and self.stack and self._in_delta_string():
+            delta = self._string_delta(final=False)
+            if delta:
+                events.append({"type": "delta", "key": ".".join(self._value_path()), "text": delta})
+        return events
+
+    def document(self) -> str:
+        """Return the text of the complete document. Raises ValueError if the stream ended early."""
+        if not self.complete or self.root_start is None:
+            raise ValueError("Streamed JSON response ended before the document was complete")
+        return self.buffer[self.root_start:self.pos]
+
+    def result(self) -> Any:
+        """Parse the complete document. Raises ValueError if the stream ended early."""
+        return json.loads(self.document())
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -1,50 +1,35 @@
 import json
 import os
-from google import genai
-from deep_translator import GoogleTranslator
 from fastapi import HTTPException
-import asyncio
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Union
 from dotenv import load_dotenv
 from app.services.personalization.prompt_enhancer import enhance_prompt_with_personalization
+from app.services.text.translation_engine import translation_engine, TranslationBatch
+from app.services.text.language_detection import detect_language, get_language_code
+from app.services.llm.structured_output import generate_structured, MalformedOutputError
+from app.services.llm.gemini_client import GeminiUnavailableError
+from app.services.llm.model_router import SHORT_TRANSFORM
+from app.models.BaseModel.translation import segment_translations
 
 load_dotenv()
 
-# Configure Gemini API
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-
-# Language code mapping
-LANGUAGE_CODES = {
-    'english': 'en', 'spanish': 'es', 'french': 'fr', 'german': 'de',
-    'italian': 'it', 'portuguese': 'pt', 'russian': 'ru', 'japanese': 'ja',
-    'korean': 'ko', 'chinese': 'zh', 'arabic': 'ar', 'hindi': 'hi',
-    'dutch': 'nl', 'swedish': 'sv', 'norwegian': 'no', 'danish': 'da',
-    'finnish': 'fi', 'polish': 'pl', 'turkish': 'tr', 'greek': 'el',
-    'hebrew': 'he', 'thai': 'th', 'vietnamese': 'vi', 'indonesian': 'id',
-    'malay': 'ms', 'bengali': 'bn', 'tamil': 'ta', 'telugu': 'te',
-    'gujarati': 'gu', 'marathi': 'mr', 'punjabi': 'pa', 'urdu': 'ur'
-}
-
-def get_language_code(language: str) -> str:
-    language_lower = language.lower().strip()
-    if len(language_lower) == 2:
-        return language_lower
-    return LANGUAGE_CODES.get(language_lower, language_lower)
-
-async def personalized_translate_with_ai(text: str, target_language: str, userId: Optional[str] = None) -> Dict[str, str]:
+
+def gemini_engine(userId: Optional[str] = None) -> str:
     """
-    Use Gemini AI to provide personalized, context-aware translation that considers user background.
-    This provides more nuanced translations than basic machine translation.
+    Translation memory engine name for Gemini translations.
+
+    Translations personalized for a user are kept under that user only, so they are
+    never served to someone else.
     """
-    try:
-        if not text.strip():
-            raise HTTPException(status_code=400, detail="Text cannot be empty")
-        if not target_language.strip():
-            raise HTTPException(status_code=400, detail="Target language cannot be empty")
+    return f"gemini:{userId}" if userId else "gemini"
 
-        # Create base translation prompt
-        base_prompt = f"""
-Please provide a high-quality, contextually appropriate translation of the following text to {target_language}.
+def translate_segments_with_ai(segments: List[str], target_language: str, userId: Optional[str] = None) -> List[str]:
+    """
+    Translate a list of segments with Gemini in a single call, preserving their order.
+    """
+    # Create base translation prompt
+    base_prompt = f"""
+Please provide a high-quality, contextually appropriate translation of each text segment below to {target_language}.
 
 TRANSLATION REQUIREMENTS:
 1. Maintain the original meaning and tone
@@ -53,52 +38,64 @@ TRANSLATION REQUIREMENTS:
 4. Preserve any technical terms or educational content appropriately
 5. If the text contains educational content, ensure the translation is suitable for learning
 6. Adapt formality level appropriately for the target language and context
+7. Translate every segment separately and keep them in the same order
 
-Original Text:
-{text}
+Original Segments (JSON array):
+{json.dumps(segments, ensure_ascii=False)}
 
 Target Language: {target_language}
 
 Please respond in JSON format with:
 {{
-    "translated_text": "The translated text in {target_language}",
+    "translations": ["Translation of segment 1 in {target_language}", "Translation of segment 2 in {target_language}"]
 }}
 """
 
-        # Enhance prompt with personalization if userId provided
-        if userId:
-            prompt = enhance_prompt_with_personalization(base_prompt, userId)
-        else:
-            prompt = base_prompt
+    # Enhance prompt with personalization if userId provided
+    if userId:
+        prompt = enhance_prompt_with_personalization(base_prompt, userId)
+    else:
+        prompt = base_prompt
 
-        # Generate translation using Gemini AI
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt,
-            config={"response_mime_type": "application/json"}
-        )
+    # Generate translation using Gemini AI, constrained to the response schema
+    return generate_structured(prompt, segment_translations, "translation", task=SHORT_TRANSFORM).translations
 
-        if response.text is None:
-            raise ValueError("No response received from AI translation service")
+async def personalized_translate_with_ai(text: str, target_language: str, userId: Optional[str] = None) -> Dict[str, Union[str, float]]:
+    """
+    Use Gemini AI to provide personalized, context-aware translation that considers user background.
+    This provides more nuanced translations than basic machine translation.
+    Segments this user already had translated are reused from the translation memory;
+    only the rest are sent to Gemini.
+    """
+    try:
+        if not text.strip():
+            raise HTTPException(status_code=400, detail="Text cannot be empty")
+        if not target_language.strip():
+            raise HTTPException(status_code=400, detail="Target language cannot be empty")
+
+        batch = await translation_engine.translate_texts_async(
+            [text],
+            get_language_code(target_language),
+            engine=gemini_engine(userId),
+            batch_translator=lambda segments: translate_segments_with_ai(segments, target_language, userId),
+        )
+        print(f"Translation: {batch['segments']} segments, {batch['cached_segments']} cached, {batch['skipped_segments']} already in target language")
 
-        result = json.loads(response.text)
-        
         return {
-            "translated_text": result.get("translated_text", ""),
+            "translated_text": batch["translations"][0],
+            "cache_hit_ratio": batch["cache_hit_ratio"],
         }
 
-    except json.JSONDecodeError:
-        # Fallback to basic translation if AI parsing fails
+    except (MalformedOutputError, GeminiUnavailableError) as e:
+        # Fallback to basic translation if AI output is unusable or Gemini is out of quota
+        print(f"AI translation unavailable, using basic translation: {e}")
         return await change_language(text, target_language, fallback=True)
+    except HTTPException:
+        raise
     except Exception as e:
-        error_msg = str(e).lower()
-        if "api" in error_msg or "quota" in error_msg:
-            # Fallback to basic translation if AI service fails
-            return await change_language(text, target_language, fallback=True)
-        else:
-            raise HTTPException(status_code=500, detail=f"Personalized translation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Personalized translation failed: {str(e)}")
 
-async def change_language(text: str, target_language: str, userId: Optional[str] = None, fallback: bool = False) -> Dict[str, str]:
+async def change_language(text: str, target_language: str, userId: Optional[str] = None, fallback: bool = False) -> Dict[str, Union[str, float]]:
     """
     Enhanced translation function that can use AI personalization or fallback to basic translation.
     """
@@ -115,35 +112,56 @@ async def change_language(text: str, target_language: str, userId: Optional[str]
             except Exception as e:
                 print(f"AI translation failed, falling back to basic translation: {e}")
 
-        # Basic translation using GoogleTranslator
+        # Basic translation using GoogleTranslator, segmented to stay under the provider limit
         target_lang_code = get_language_code(target_language)
-
-        loop = asyncio.get_running_loop()
-        translated = await loop.run_in_executor(
-            None,
-            lambda: GoogleTranslator(source="auto", target=target_lang_code).translate(text)
-        )
+        batch = await translation_engine.translate_texts_async([text], target_lang_code)
+        print(f"Translation: {batch['segments']} segments, {batch['cached_segments']} cached, {batch['skipped_segments']} already in target language")
 
         return {
-            "translated_text": translated,
+            "translated_text": batch["translations"][0],
+            "cache_hit_ratio": batch["cache_hit_ratio"],
         }
 
     except HTTPException:
         raise
     except Exception as e:
-        error_msg = str(e).lower()
-        if "not supported" in error_msg or "invalid" in error_msg:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported language: {target_language}"
-            )
-        elif any(x in error_msg for x in ["network", "connection", "timeout"]):
-            raise HTTPException(
-                status_code=503,
-                detail="Translation service temporarily unavailable. Try again later."
+        raise translation_error(e, target_language)
+
+def translation_error(error: Exception, target_language: str) -> HTTPException:
+    """
+    Map a translation backend error to the HTTPException returned to the client.
+    """
+    error_msg = str(error).lower()
+    if "not supported" in error_msg or "no support" in error_msg or "invalid" in error_msg:
+        return HTTPException(
+            status_code=400,
+            detail=f"Unsupported language: {target_language}"
+        )
+    elif any(x in error_msg for x in ["network", "connection", "timeout"]):
+        return HTTPException(
+            status_code=503,
+            detail="Translation service temporarily unavailable. Try again later."
+        )
+    else:
+        return HTTPException(status_code=500, detail=f"Translation failed: {str(error)}")
+
+async def translate_many(texts: List[str], target_language: str, userId: Optional[str] = None) -> TranslationBatch:
+    """
+    Translate several strings in one batched engine call, with repeated strings translated once.
+    Uses personalized AI translation when a userId is given, falling back to basic translation.
+    """
+    target_lang_code = get_language_code(target_language)
+    if userId:
+        try:
+            return await translation_engine.translate_texts_async(
+                texts,
+                target_lang_code,
+                engine=gemini_engine(userId),
+                batch_translator=lambda segments: translate_segments_with_ai(segments, target_language, userId),
             )
-        else:
-            raise HTTPException(status_code=500, detail=f"Translation failed: {str(e)}")
+        except Exception as e:
+            print(f"AI translation failed, falling back to basic translation: {e}")
+    return await translation_engine.translate_texts_async(texts, target_lang_code)
 
 async def get_translation_with_context(text: str, target_language: str, userId: Optional[str] = None, context: Optional[str] = None) -> Dict[str, str]:
     """
@@ -179,10 +197,9 @@ async def detect_and_translate(text: str, target_language: str, userId: Optional
     Detect source language and translate with personalization.
     """
     try:
-        # For now, we'll use auto-detection in GoogleTranslator
-        # In the future, this could be enhanced with AI-based language detection
+        # Segments already in the target language are detected locally and never sent out
         result = await change_language(text, target_language, userId)
-        result["source_language"] = "auto-detected"
+        result["source_language"] = detect_language(text) or "unknown"
         return result
         
     except Exception as e:
@@ -196,26 +213,3 @@ async def simple_translate(text: str, target_language: str) -> str:
     """
     result = await change_language(text, target_language)
     return result["translated_text"]
-
-# For detection you need a different lib
-# Example with langdetect:
-# pip install langdetect
-# from langdetect import detect, detect_langs
-
-# async def detect_language(text: str) -> Dict[str, str]:
-#     try:
-#         if not text.strip():
-#             raise HTTPException(status_code=400, detail="Text cannot be empty")
-
-#         loop = asyncio.get_running_loop()
-#         detected = await loop.run_in_executor(
-#             None,
-#             lambda: detect_langs(text)
-#         )
-
-#         # detect_langs gives list of possibilities with probabilities
-#         best = detected[0]
-#         return {"language": best.lang, "confidence": str(best.prob)}
-
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=f"Language detection failed: {str(e)}")
@@ -0,0 +1,87 @@
+"""
+Concept coverage ranking.
+
+When more candidates (flashcards, questions) are generated than will be kept, the
+final set is chosen greedily to cover as many of the source's key terms as possible,
+instead of keeping whichever came first. Key terms are weighted like tf-idf over
+the source chunks: frequent in the document, concentrated in few chunks.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Set
+from app.services.text.similarity import normalize_text
+
+MAX_KEY_TERMS = 300
+# Words shorter than this are mostly function words in space-separated languages
+MIN_TERM_LENGTH = 4
+# Picking a second item from the same chunk before every chunk has one costs this much weight
+SAME_CHUNK_PENALTY = 0.5
+
+SPACED_WORD = re.compile(r'^[^\W\d_]+$')
+
+
+def _term_list(text: str) -> List[str]:
+    words = normalize_text(text).split()
+    found = [word for word in words if len(word) >= MIN_TERM_LENGTH and SPACED_WORD.match(word)]
+    if found or not words:
+        return found
+    # Chinese or Japanese: words are not separated, use bigrams of letters
+    letters = "".join(ch for ch in "".join(words) if ch.isalpha())
+    return [letters[i:i + 2] for i in range(len(letters) - 1)]
+
+
+def terms(text: str) -> Set[str]:
+    """Candidate concept terms: longer words, or character bigrams for text written without spaces."""
+    return set(_term_list(text))
+
+
+def key_terms(chunks: List[str], limit: int = MAX_KEY_TERMS) -> Dict[str, float]:
+    """The ``limit`` highest-weighted terms of the source, with their weights."""
+    frequency: Counter = Counter()
+    chunk_frequency: Counter = Counter()
+    for chunk in chunks:
+        chunk_terms = _term_list(chunk)
+        frequency.update(chunk_terms)
+        chunk_frequency.update(set(chunk_terms))
+    weights = {
+        term: math.log1p(count) * math.log1p(len(chunks) / chunk_frequency[term])
+        for term, count in frequency.items()
+    }
+    return dict(sorted(weights.items(), key=lambda item: item[1], reverse=True)[:limit])
+
+
+def select_by_coverage(candidates: List[str], weights: Dict[str, float], k: int, groups: Optional[List[int]] = None) -> List[int]:
+    """
+    Choose ``k`` candidates that together cover the most key-term weight.
+
+    Args:
+        candidates (List[str]): Candidate texts
+        weights (Dict[str, float]): Key terms and their weights
+        k (int): Number of candidates to keep
+        groups (Optional[List[int]]): Source chunk of each candidate; spreading the
+            selection over chunks is preferred
+
+    Returns:
+        List[int]: Indices of the chosen candidates, in the order they were picked
+    """
+    candidate_terms = [terms(text) & weights.keys() for text in candidates]
+    covered: Set[str] = set()
+    picked_per_group: Counter = Counter()
+    chosen: List[int] = []
+    remaining = set(range(len(candidates)))
+    while remaining and len(chosen) < k:
+        def gain(i: int) -> float:
+            value = sum(weights[term] for term in candidate_terms[i] - covered)
+            if groups is not None:
+                value *= SAME_CHUNK_PENALTY ** picked_per_group[groups[i]]
+            return value
+        # Ties (including no gain at all) go to the earliest candidate
+        best = max(sorted(remaining), key=gain)
+        chosen.append(best)
+        remaining.discard(best)
+        covered |= candidate_terms[best]
+        if groups is not None:
+            picked_per_group[groups[best]] += 1
+    return chosen
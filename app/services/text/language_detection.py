@@ -0,0 +1,175 @@
+"""
+In-process language identification.
+
+Text written in a script used by a single language (Hangul, kana, Tamil, ...) is
+identified from its Unicode script alone. Everything else goes through langdetect's
+character n-gram profiles, loaded once per process, so deciding whether a text needs
+translating costs a few milliseconds instead of a remote call.
+"""
+
+import threading
+from bisect import bisect_right
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Optional
+from langdetect import DetectorFactory, detect_langs
+from langdetect.detector_factory import init_factory
+from langdetect.lang_detect_exception import LangDetectException
+
+# Deterministic results for the same input
+DetectorFactory.seed = 0
+
+# Below this many letters the n-gram model is too unreliable to act on
+MIN_DETECTION_LETTERS = 12
+MIN_DETECTION_CONFIDENCE = 0.85
+# Detection accuracy plateaus well before this; longer texts are sampled
+DETECTION_SAMPLE_CHARS = 2000
+
+# langdetect codes that differ from the codes returned by get_language_code
+LANGUAGE_CODE_ALIASES = {
+    "zh-cn": "zh",
+    "zh-tw": "zh",
+    "iw": "he",
+    "nb": "no",
+}
+
+# (first code point, last code point, script) for the scripts we serve, sorted by first code point
+SCRIPT_RANGES = [
+    (0x0370, 0x03FF, "Greek"),
+    (0x0400, 0x052F, "Cyrillic"),
+    (0x0590, 0x05FF, "Hebrew"),
+    (0x0600, 0x06FF, "Arabic"),
+    (0x0750, 0x077F, "Arabic"),
+    (0x0900, 0x097F, "Devanagari"),
+    (0x0980, 0x09FF, "Bengali"),
+    (0x0A00, 0x0A7F, "Gurmukhi"),
+    (0x0A80, 0x0AFF, "Gujarati"),
+    (0x0B80, 0x0BFF, "Tamil"),
+    (0x0C00, 0x0C7F, "Telugu"),
+    (0x0E00, 0x0E7F, "Thai"),
+    (0x1100, 0x11FF, "Hangul"),
+    (0x3040, 0x309F, "Hiragana"),
+    (0x30A0, 0x30FF, "Katakana"),
+    (0x3400, 0x4DBF, "Han"),
+    (0x4E00, 0x9FFF, "Han"),
+    (0xAC00, 0xD7AF, "Hangul"),
+]
+_SCRIPT_STARTS = [start for start, _, _ in SCRIPT_RANGES]
+
+# Scripts that identify the language on their own
+SCRIPT_LANGUAGES = {
+    "Greek": "el",
+    "Hebrew": "he",
+    "Bengali": "bn",
+    "Gurmukhi": "pa",
+    "Gujarati": "gu",
+    "Tamil": "ta",
+    "Telugu": "te",
+    "Thai": "th",
+    "Hangul": "ko",
+    "Hiragana": "ja",
+    "Katakana": "ja",
+    "Han": "zh",
+}
+
+# Language names as requested by clients, mapped to ISO 639-1 codes
+LANGUAGE_CODES = {
+    'english': 'en', 'spanish': 'es', 'french': 'fr', 'german': 'de',
+    'italian': 'it', 'portuguese': 'pt', 'russian': 'ru', 'japanese': 'ja',
+    'korean': 'ko', 'chinese': 'zh', 'arabic': 'ar', 'hindi': 'hi',
+    'dutch': 'nl', 'swedish': 'sv', 'norwegian': 'no', 'danish': 'da',
+    'finnish': 'fi', 'polish': 'pl', 'turkish': 'tr', 'greek': 'el',
+    'hebrew': 'he', 'thai': 'th', 'vietnamese': 'vi', 'indonesian': 'id',
+    'malay': 'ms', 'bengali': 'bn', 'tamil': 'ta', 'telugu': 'te',
+    'gujarati': 'gu', 'marathi': 'mr', 'punjabi': 'pa', 'urdu': 'ur'
+}
+
+
+def get_language_code(language: str) -> str:
+    language_lower = language.lower().strip()
+    if len(language_lower) == 2:
+        return language_lower
+    return LANGUAGE_CODES.get(language_lower, language_lower)
+
+
+_model_lock = threading.Lock()
+_model_loaded = False
+
+
+def load_language_model() -> None:
+    """Load the n-gram profiles. Safe to call repeatedly; only the first call does any work."""
+    global _model_loaded
+    if _model_loaded:
+        return
+    with _model_lock:
+        if not _model_loaded:
+            init_factory()
+            _model_loaded = True
+
+
+def normalize_language_code(code: str) -> str:
+    code = code.lower().strip()
+    return LANGUAGE_CODE_ALIASES.get(code, code.split("-")[0])
+
+
+def script_of(ch: str) -> Optional[str]:
+    """Return the script of a letter, or None for digits, punctuation and whitespace."""
+    if not ch.isalpha():
+        return None
+    code_point = ord(ch)
+    if code_point < 0x0250:
+        return "Latin"
+    i = bisect_right(_SCRIPT_STARTS, code_point) - 1
+    if i >= 0 and code_point <= SCRIPT_RANGES[i][1]:
+        return SCRIPT_RANGES[i][2]
+    return "Other"
+
+
+def script_counts(text: str) -> Dict[str, int]:
+    """Count letters per script."""
+    return Counter(script for script in map(script_of, text) if script)
+
+
+def _language_from_script(counts: Dict[str, int]) -> Optional[str]:
+    total = sum(counts.values())
+    if not total:
+        return None
+    # Japanese mixes Han with kana; any real share of kana means Japanese
+    if (counts.get("Hiragana", 0) + counts.get("Katakana", 0)) / total >= 0.1:
+        return "ja"
+    script, count = max(counts.items(), key=lambda item: item[1])
+    if count / total >= 0.6:
+        return SCRIPT_LANGUAGES.get(script)
+    return None
+
+
+@lru_cache(maxsize=2048)
+def detect_language(text: str) -> Optional[str]:
+    """
+    Detect the language of a text.
+
+    Returns:
+        Optional[str]: ISO 639-1 code, or None when the text is too short or the model is not confident
+    """
+    sample = text.strip()[:DETECTION_SAMPLE_CHARS]
+    counts = script_counts(sample)
+    by_script = _language_from_script(counts)
+    if by_script:
+        return by_script
+    if sum(counts.values()) < MIN_DETECTION_LETTERS:
+        return None
+
+    load_language_model()
+    try:
+        best = detect_langs(sample)[0]
+    except LangDetectException:
+        return None
+    if best.prob < MIN_DETECTION_CONFIDENCE:
+        return None
+    return normalize_language_code(best.lang)
+
+
+def is_in_language(text: str, language_code: str) -> bool:
+    """True only when the text is confidently detected as the given language."""
+    detected = detect_language(text)
+    return detected is not None and detected == normalize_language_code(language_code)
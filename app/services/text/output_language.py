@@ -0,0 +1,180 @@
+"""
+Output language validation for generated study material.
+
+Gemini sometimes drifts out of the requested language for a few fields (a title in
+the source document's language, a label left in English). Every generator passes
+its result through ``enforce_output_language``, which checks each text field
+locally and rewrites only the fields in the wrong language with one small Gemini
+call, instead of regenerating the whole artifact.
+
+A field is in the wrong language when:
+
+- its letters are mostly in a script the target language does not use (e.g. Latin
+  text in a Hindi flowchart), or
+- it is long enough for the n-gram model and is confidently detected as another
+  language written in the same script (e.g. Portuguese in an English summary).
+
+Short fields in the right script are accepted: names and technical terms are often
+the same across languages and the n-gram model is unreliable on them.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple, TypeVar
+from pydantic import BaseModel
+from app.services.text.language_detection import detect_language, get_language_code, script_counts
+from app.services.text.change_language import translate_segments_with_ai
+from app.services.llm.gemini_client import GeminiUnavailableError
+from app.services.llm.structured_output import MalformedOutputError
+from app.services.tracing import traced
+
+T = TypeVar("T")
+
+# Scripts each non-Latin language is written in; every other language is checked against Latin
+LANGUAGE_SCRIPTS = {
+    "hi": {"Devanagari"},
+    "mr": {"Devanagari"},
+    "ar": {"Arabic"},
+    "ur": {"Arabic"},
+    "ru": {"Cyrillic"},
+    "el": {"Greek"},
+    "he": {"Hebrew"},
+    "bn": {"Bengali"},
+    "pa": {"Gurmukhi"},
+    "gu": {"Gujarati"},
+    "ta": {"Tamil"},
+    "te": {"Telugu"},
+    "th": {"Thai"},
+    "ko": {"Hangul", "Han"},
+    "ja": {"Hiragana", "Katakana", "Han"},
+    "zh": {"Han"},
+}
+
+# Fewer letters than this are not checked at all
+MIN_SCRIPT_LETTERS = 6
+# Below this share of letters in the expected script, a field is in the wrong script
+MIN_EXPECTED_SCRIPT_SHARE = 0.5
+# The n-gram model is only trusted on fields at least this long
+MIN_NGRAM_LETTERS = 24
+
+# Keys that hold identifiers or enum values rather than text for the reader
+NON_TEXT_FIELDS = {"id", "type", "difficulty", "format"}
+
+Path = Tuple[Any, ...]
+
+
+class OutputLanguageStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked: Dict[str, int] = {}
+        self._drifted: Dict[str, int] = {}
+        self._regenerated: Dict[str, int] = {}
+
+    def record(self, call_site: str, checked: int, drifted: int, regenerated: int) -> None:
+        with self._lock:
+            self._checked[call_site] = self._checked.get(call_site, 0) + checked
+            self._drifted[call_site] = self._drifted.get(call_site, 0) + drifted
+            self._regenerated[call_site] = self._regenerated.get(call_site, 0) + regenerated
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                call_site: {
+                    "fields_checked": checked,
+                    "fields_drifted": self._drifted.get(call_site, 0),
+                    "fields_regenerated": self._regenerated.get(call_site, 0),
+                }
+                for call_site, checked in self._checked.items()
+            }
+
+
+# Global instance
+output_language_stats = OutputLanguageStats()
+
+
+def is_wrong_language(text: str, language_code: str) -> bool:
+    """True when the text is clearly not written in the given language."""
+    counts = script_counts(text)
+    letters = sum(counts.values())
+    if letters < MIN_SCRIPT_LETTERS:
+        return False
+    expected = LANGUAGE_SCRIPTS.get(language_code, {"Latin"})
+    if sum(counts.get(script, 0) for script in expected) / letters < MIN_EXPECTED_SCRIPT_SHARE:
+        return True
+    if letters < MIN_NGRAM_LETTERS:
+        return False
+    detected = detect_language(text)
+    # Only languages sharing the script can be told apart here, and only when confident
+    return detected is not None and detected != language_code and LANGUAGE_SCRIPTS.get(detected, {"Latin"}) == expected
+
+
+def text_fields(value: Any, path: Path = ()) -> List[Tuple[Path, str]]:
+    """All reader-facing strings in a pydantic model, dict or list, with their paths."""
+    if isinstance(value, str):
+        return [(path, value)]
+    if isinstance(value, BaseModel):
+        items = ((key, getattr(value, key)) for key in type(value).model_fields)
+    elif isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return []
+    fields = []
+    for key, item in items:
+        if key not in NON_TEXT_FIELDS:
+            fields.extend(text_fields(item, path + (key,)))
+    return fields
+
+
+def _set_path(value: Any, path: Path, text: str) -> None:
+    for key in path[:-1]:
+        value = getattr(value, key) if isinstance(value, BaseModel) else value[key]
+    if isinstance(value, BaseModel):
+        setattr(value, path[-1], text)
+    else:
+        value[path[-1]] = text
+
+
+@traced("output_language.enforce")
+def enforce_output_language(value: T, language: Optional[str], call_site: str, userId: Optional[str] = None) -> T:
+    """
+    Rewrite the text fields of a generated result that are not in the requested language.
+
+    Args:
+        value: Generated result (pydantic model, dict or list), updated in place
+        language (Optional[str]): Requested language name or code, e.g. "Hindi"
+        call_site (str): Name used for the drift metric, e.g. "flashcards"
+        userId (Optional[str]): User ID for personalization of the rewrite
+
+    Returns:
+        The same object, with drifted fields rewritten where possible
+    """
+    if not language:
+        return value
+    language_code = get_language_code(language)
+    if len(language_code) != 2:
+        # A language we cannot identify locally; nothing to compare against
+        return value
+
+    fields = text_fields(value)
+    drifted = [(path, text) for path, text in fields if is_wrong_language(text, language_code)]
+    if not drifted:
+        output_language_stats.record(call_site, len(fields), 0, 0)
+        return value
+
+    print(f"{len(drifted)} of {len(fields)} {call_site} fields not in {language}, rewriting them")
+    try:
+        rewritten = translate_segments_with_ai([text for _, text in drifted], language, userId)
+    except (GeminiUnavailableError, MalformedOutputError) as e:
+        print(f"Could not rewrite {call_site} fields in {language}: {e}")
+        output_language_stats.record(call_site, len(fields), len(drifted), 0)
+        return value
+    if len(rewritten) != len(drifted):
+        print(f"Expected {len(drifted)} rewritten {call_site} fields, received {len(rewritten)}")
+        output_language_stats.record(call_site, len(fields), len(drifted), 0)
+        return value
+
+    for (path, _), text in zip(drifted, rewritten):
+        _set_path(value, path, text)
+    output_language_stats.record(call_site, len(fields), len(drifted), len(drifted))
+    return value
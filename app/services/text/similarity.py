@@ -0,0 +1,107 @@
+"""
+Near-duplicate detection for short texts (generated questions, flashcards).
+
+Texts are normalized (Unicode NFKC, case-folded, punctuation and repeated whitespace
+removed) and compared as sets of character shingles. MinHash signatures estimate the
+Jaccard similarity of those sets in constant time per pair, so "What is X?" and
+"What's X" are caught as duplicates without an embedding model or a network call.
+Character shingles work the same for scripts written without spaces.
+"""
+
+import hashlib
+import random
+import re
+import unicodedata
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+SHINGLE_SIZE = 4
+NUM_PERMUTATIONS = 64
+# Estimated Jaccard similarity above which two texts count as the same
+DEFAULT_SIMILARITY_THRESHOLD = 0.6
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+PUNCTUATION = re.compile(r'[^\w\s]')
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Case-folded NFKC text without punctuation and with single spaces."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return WHITESPACE.sub(" ", PUNCTUATION.sub(" ", text)).strip()
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Character shingles of the normalized text. Texts shorter than ``size`` are one shingle."""
+    normalized = normalize_text(text)
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+def _hash_shingle(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+class MinHasher:
+    def __init__(self, num_permutations: int = NUM_PERMUTATIONS, seed: int = 1):
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_permutations)
+        ]
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        hashes = [_hash_shingle(shingle) for shingle in shingles(text)]
+        if not hashes:
+            return tuple(_MAX_HASH for _ in self.permutations)
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self.permutations
+        )
+
+    @staticmethod
+    def similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of the two texts the signatures were computed from."""
+        return sum(a == b for a, b in zip(left, right)) / len(left)
+
+
+class NearDuplicateFilter:
+    """
+    Keeps the first of every group of near-identical texts.
+
+    Exact duplicates (after normalization) are caught by a set lookup; the rest are
+    compared by MinHash signature against everything kept so far.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_SIMILARITY_THRESHOLD, hasher: Optional[MinHasher] = None):
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        self._normalized: Dict[str, Hashable] = {}
+        self._signatures: List[Tuple[Hashable, Tuple[int, ...]]] = []
+
+    def _match(self, normalized: str, signature: Tuple[int, ...]) -> Optional[Hashable]:
+        if normalized in self._normalized:
+            return self._normalized[normalized]
+        for key, kept in self._signatures:
+            if self.hasher.similarity(signature, kept) >= self.threshold:
+                return key
+        return None
+
+    def find_duplicate(self, text: str) -> Optional[Hashable]:
+        """Key of a kept text that ``text`` duplicates, or None."""
+        return self._match(normalize_text(text), self.hasher.signature(text))
+
+    def add(self, key: Hashable, text: str) -> bool:
+        """Keep ``text`` under ``key`` unless it duplicates a kept text. Returns whether it was kept."""
+        normalized = normalize_text(text)
+        signature = self.hasher.signature(text)
+        if self._match(normalized, signature) is not None:
+            return False
+        self._normalized[normalized] = key
+        self._signatures.append((key, signature))
+        return True
+
+    def __len__(self) -> int:
+        return len(self._signatures)
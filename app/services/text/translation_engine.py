@@ -0,0 +1,209 @@
+"""
+Translation engine for long texts.
+
+Google Translate rejects requests above ~5000 characters, so texts are cut into
+segments on paragraph and sentence boundaries, the segments are translated
+concurrently on a bounded pool, and the results are stitched back together with
+the original whitespace between them. Segments already in the translation memory
+are not sent to the provider again, and segments already written in the target
+language are passed through untouched.
+"""
+
+import asyncio
+import contextvars
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TypedDict
+from app.services.text.translation_memory import translation_memory
+from app.services.text.language_detection import detect_language, normalize_language_code
+from app.services.lazy_imports import lazy_import
+
+deep_translator = lazy_import("deep_translator")
+deep_translator_errors = lazy_import("deep_translator.exceptions")
+
+# Provider limit is 5000 characters per request, keep some headroom
+MAX_SEGMENT_CHARS = 4500
+MAX_TRANSLATION_WORKERS = 8
+
+PARAGRAPH_BREAK = re.compile(r'(\n\s*\n)')
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?。！？।])(?=\s)')
+WORD_BOUNDARY = re.compile(r'(?<=\s)(?=\S)')
+SURROUNDING_WHITESPACE = re.compile(r'^(\s*)(.*?)(\s*)$', re.DOTALL)
+
+
+class TranslationBatch(TypedDict):
+    translations: List[str]
+    segments: int
+    cached_segments: int
+    skipped_segments: int  # Already in the target language
+    cache_hit_ratio: float
+
+
+def _pack(units: List[str], max_chars: int) -> List[str]:
+    """Greedily join consecutive units into pieces of at most max_chars."""
+    pieces = []
+    current = ""
+    for unit in units:
+        if current and len(current) + len(unit) > max_chars:
+            pieces.append(current)
+            current = ""
+        current += unit
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _split_long_unit(unit: str, max_chars: int) -> List[str]:
+    """Split a unit that is too long on its own, by words and as a last resort by characters."""
+    words = []
+    for word in WORD_BOUNDARY.split(unit):
+        if len(word) > max_chars:
+            words.extend(word[i:i + max_chars] for i in range(0, len(word), max_chars))
+        else:
+            words.append(word)
+    return _pack(words, max_chars)
+
+
+def split_into_segments(text: str, max_chars: int = MAX_SEGMENT_CHARS) -> List[str]:
+    """
+    Split text into contiguous segments that each fit within max_chars.
+
+    Paragraph breaks are kept as their own segments so the formatting between
+    paragraphs survives translation untouched. ``"".join(segments) == text``.
+    """
+    segments = []
+    for part in PARAGRAPH_BREAK.split(text):
+        if not part:
+            continue
+        if len(part) <= max_chars:
+            segments.append(part)
+            continue
+
+        units = []
+        for sentence in SENTENCE_BOUNDARY.split(part):
+            if len(sentence) > max_chars:
+                units.extend(_split_long_unit(sentence, max_chars))
+            else:
+                units.append(sentence)
+        segments.extend(_pack(units, max_chars))
+    return segments
+
+
+def split_whitespace(segment: str) -> Tuple[str, str, str]:
+    """Return (leading whitespace, content, trailing whitespace) of a segment."""
+    match = SURROUNDING_WHITESPACE.match(segment)
+    return match.group(1), match.group(2), match.group(3)
+
+
+class TranslationEngine:
+    def __init__(self, max_segment_chars: int = MAX_SEGMENT_CHARS, max_workers: int = MAX_TRANSLATION_WORKERS):
+        self.max_segment_chars = max_segment_chars
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translator")
+        # GoogleTranslator keeps the request text in instance state, so each worker thread gets its own
+        self._local = threading.local()
+
+    def _get_translator(self, target_code: str, source_code: str = "auto") -> "deep_translator.GoogleTranslator":
+        translators: Dict[Tuple[str, str], "deep_translator.GoogleTranslator"] = getattr(self._local, "translators", None)
+        if translators is None:
+            translators = self._local.translators = {}
+        key = (source_code, target_code)
+        if key not in translators:
+            translators[key] = deep_translator.GoogleTranslator(source=source_code, target=target_code)
+        return translators[key]
+
+    def _translate_content(self, content: str, target_code: str, source_code: Optional[str] = None) -> str:
+        translator = None
+        if source_code:
+            try:
+                translator = self._get_translator(target_code, source_code)
+            except deep_translator_errors.LanguageNotSupportedException:
+                # The detector knows a few codes the provider spells differently; let it auto-detect
+                pass
+        if translator is None:
+            translator = self._get_translator(target_code)
+        translated = translator.translate(content)
+        # deep_translator returns None when the provider echoes the input back
+        return translated if translated else content
+
+    @staticmethod
+    def _detect_sources(contents: List[str]) -> Dict[str, Optional[str]]:
+        return {content: detect_language(content) for content in contents}
+
+    def _plan(self, texts: List[str]) -> Tuple[List[List[Tuple[str, str, str]]], List[str]]:
+        """Segment every text and collect the distinct segment contents that need translating."""
+        plans = []
+        pending: Dict[str, None] = {}
+        for text in texts:
+            parts = [split_whitespace(segment) for segment in split_into_segments(text, self.max_segment_chars)]
+            for _, content, _ in parts:
+                if content:
+                    pending.setdefault(content)
+            plans.append(parts)
+        return plans, list(pending)
+
+    @staticmethod
+    def _assemble(plans: List[List[Tuple[str, str, str]]], translations: Dict[str, str]) -> List[str]:
+        return [
+            "".join(lead + (translations[content] if content else "") + trail for lead, content, trail in parts)
+            for parts in plans
+        ]
+
+    async def translate_texts_async(
+        self,
+        texts: List[str],
+        target_code: str,
+        engine: str = "google",
+        batch_translator: Optional[Callable[[List[str]], List[str]]] = None,
+    ) -> TranslationBatch:
+        """
+        Translate several texts in one go.
+
+        Identical segments across texts are translated once, and segments found in the
+        translation memory or already in the target language are not sent at all. By default each remaining segment is a
+        separate Google Translate request; pass ``batch_translator`` (a blocking callable
+        mapping a list of segments to their translations) to send them in one call instead.
+        """
+        plans, pending = self._plan(texts)
+        loop = asyncio.get_running_loop()
+
+        # Worker threads run in a copy of the caller's context: its trace, request id and Gemini priority class
+        translations = await loop.run_in_executor(self.executor, contextvars.copy_context().run, translation_memory.get_many, pending, target_code, engine)
+        misses = [content for content in pending if content not in translations]
+
+        # Route each segment by its own language: mixed-language input only sends the foreign parts
+        sources = await loop.run_in_executor(self.executor, contextvars.copy_context().run, self._detect_sources, misses)
+        target_language = normalize_language_code(target_code)
+        skipped = {content: content for content in misses if sources[content] == target_language}
+        translations.update(skipped)
+        misses = [content for content in misses if content not in skipped]
+
+        if misses:
+            if batch_translator is not None:
+                results = await loop.run_in_executor(self.executor, contextvars.copy_context().run, batch_translator, misses)
+                if len(results) != len(misses):
+                    raise ValueError(f"Expected {len(misses)} translated segments, received {len(results)}")
+            else:
+                results = await asyncio.gather(*[
+                    loop.run_in_executor(self.executor, contextvars.copy_context().run, self._translate_content, content, target_code, sources[content])
+                    for content in misses
+                ])
+            fresh = dict(zip(misses, results))
+            await loop.run_in_executor(self.executor, contextvars.copy_context().run, translation_memory.put_many, fresh, target_code, engine)
+            translations.update(fresh)
+
+        cached = len(pending) - len(misses) - len(skipped)
+        return {
+            "translations": self._assemble(plans, translations),
+            "segments": len(pending),
+            "cached_segments": cached,
+            "skipped_segments": len(skipped),
+            "cache_hit_ratio": round(cached / len(pending), 3) if pending else 1.0,
+        }
+
+    async def translate_async(self, text: str, target_code: str) -> str:
+        return (await self.translate_texts_async([text], target_code))["translations"][0]
+
+
+# Global instance
+translation_engine = TranslationEngine()
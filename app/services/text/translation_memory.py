@@ -0,0 +1,183 @@
+"""
+Segment-level translation memory.
+
+Translated segments are stored on disk (SQLite) keyed by the normalized source
+segment, the target language code and the engine that produced them, with a small
+in-process LRU in front. The on-disk store is trimmed to the least recently used
+entries once it grows past its limit.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from app.services.tracing import span
+
+load_dotenv()
+
+TRANSLATION_MEMORY_PATH = os.getenv("TRANSLATION_MEMORY_PATH", ".cache/translation_memory.sqlite3")
+TRANSLATION_MEMORY_MAX_ENTRIES = int(os.getenv("TRANSLATION_MEMORY_MAX_ENTRIES", "200000"))
+TRANSLATION_MEMORY_HOT_ENTRIES = int(os.getenv("TRANSLATION_MEMORY_HOT_ENTRIES", "5000"))
+
+
+def normalize_segment(segment: str) -> str:
+    """Normalize a source segment so trivially different copies share a cache entry."""
+    return re.sub(r'\s+', ' ', unicodedata.normalize("NFC", segment)).strip()
+
+
+class TranslationMemory:
+    def __init__(self, path: str = TRANSLATION_MEMORY_PATH, max_entries: int = TRANSLATION_MEMORY_MAX_ENTRIES, hot_entries: int = TRANSLATION_MEMORY_HOT_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hot_entries = hot_entries
+        self._hot: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._disk_disabled = False
+        self._disk_entries = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _get_conn(self) -> Optional[sqlite3.Connection]:
+        """Open the on-disk store on first use. Falls back to memory only if it cannot be opened."""
+        if self._disk_disabled:
+            return None
+        # A connection opened before a fork (gunicorn preload) stays with the parent process
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS translations (
+                    source TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    engine TEXT NOT NULL,
+                    translated TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (source, target, engine)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)")
+            self._disk_entries = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            self._conn = conn
+            self._pid = os.getpid()
+        except sqlite3.Error as e:
+            print(f"Translation memory disk store unavailable, using memory only: {e}")
+            self._disk_disabled = True
+        return self._conn
+
+    def _remember(self, key: Tuple[str, str, str], translated: str) -> None:
+        self._hot[key] = translated
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_entries:
+            self._hot.popitem(last=False)
+
+    def get_many(self, segments: List[str], target: str, engine: str) -> Dict[str, str]:
+        """
+        Look up cached translations.
+
+        Returns:
+            Dict[str, str]: Translations for the segments that were found, keyed by the segment as given
+        """
+        found: Dict[str, str] = {}
+        with span("cache.translation_memory.get", segments=len(segments)) as current, self._lock:
+            cold: Dict[str, str] = {}
+            for segment in segments:
+                key = (normalize_segment(segment), target, engine)
+                if key in self._hot:
+                    self._hot.move_to_end(key)
+                    found[segment] = self._hot[key]
+                else:
+                    cold[key[0]] = segment
+
+            conn = self._get_conn()
+            if cold and conn is not None:
+                try:
+                    sources = list(cold)
+                    # Stay well below SQLite's bound-parameter limit
+                    for start in range(0, len(sources), 500):
+                        batch = sources[start:start + 500]
+                        placeholders = ",".join("?" * len(batch))
+                        rows = conn.execute(
+                            f"SELECT source, translated FROM translations WHERE target = ? AND engine = ? AND source IN ({placeholders})",
+                            [target, engine, *batch],
+                        ).fetchall()
+                        for source, translated in rows:
+                            found[cold[source]] = translated
+                            self._remember((source, target, engine), translated)
+                        if rows:
+                            conn.execute(
+                                f"UPDATE translations SET last_used = ? WHERE target = ? AND engine = ? AND source IN ({','.join('?' * len(rows))})",
+                                [time.time(), target, engine, *[source for source, _ in rows]],
+                            )
+                except sqlite3.Error as e:
+                    print(f"Translation memory lookup failed: {e}")
+
+            self.hits += len(found)
+            self.misses += len(segments) - len(found)
+            current.set_attribute("cache.hits", len(found))
+        return found
+
+    def put_many(self, translations: Dict[str, str], target: str, engine: str) -> None:
+        """Store translations for source segments and evict the oldest entries if the store is full."""
+        if not translations:
+            return
+        now = time.time()
+        rows = []
+        with self._lock:
+            for segment, translated in translations.items():
+                source = normalize_segment(segment)
+                self._remember((source, target, engine), translated)
+                rows.append((source, target, engine, translated, now))
+
+            conn = self._get_conn()
+            if conn is None:
+                return
+            try:
+                before = conn.total_changes
+                conn.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)", rows)
+                self._disk_entries += conn.total_changes - before
+                if self._disk_entries > self.max_entries:
+                    self._disk_entries = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+                    overflow = self._disk_entries - self.max_entries
+                    if overflow > 0:
+                        conn.execute(
+                            "DELETE FROM translations WHERE rowid IN (SELECT rowid FROM translations ORDER BY last_used LIMIT ?)",
+                            (overflow,),
+                        )
+                        self._disk_entries -= overflow
+            except sqlite3.Error as e:
+                print(f"Translation memory write failed: {e}")
+
+    def warm(self) -> bool:
+        """Open this process's on-disk store ahead of the first request."""
+        with self._lock:
+            return self._get_conn() is not None
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return round(self.hits / total, 3) if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hit_ratio,
+            "hot_entries": len(self._hot),
+            "disk_entries": self._disk_entries,
+        }
+
+
+# Global instance
+translation_memory = TranslationMemory()
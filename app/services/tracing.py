@@ -0,0 +1,282 @@
+"""
+Per-request tracing with OpenTelemetry.
+
+Every HTTP request gets a root span and a request id (the caller's ``X-Request-ID``
+or a fresh one, echoed in the response). Firestore calls, Gemini calls, extractor
+stages and cache lookups open child spans with ``span(...)`` or ``@traced(...)``.
+Both the span context and the request id live in contextvars, so work sent to the
+thread pools with ``contextvars.copy_context().run`` stays in the request's trace.
+
+The code only depends on the OpenTelemetry API; without a configured SDK every span
+is a no-op. ``configure_tracing`` (called by each worker at startup) installs the SDK
+when one of these is set:
+
+- ``TRACING_EXPORTER=console`` or ``file``: finished spans as JSON lines on stdout or
+  appended to ``TRACING_FILE``
+- ``TRACING_SLOW_REQUEST_MS``: requests slower than this print their span tree, so
+  a 40 s ``/summarize`` shows where the 40 s went
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from dotenv import load_dotenv
+from opentelemetry import trace
+from app.services.metrics import route_template
+
+try:
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+except ImportError:
+    # The API alone runs every span as a no-op
+    SpanProcessor = object
+    TracerProvider = None
+
+load_dotenv()
+
+SERVICE_NAME = "codeed-backend"
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()  # none, console or file
+TRACING_FILE = os.getenv("TRACING_FILE", ".cache/traces.jsonl")
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+SLOW_REQUEST_MS = float(os.getenv("TRACING_SLOW_REQUEST_MS", "0"))  # 0 disables the slow request report
+
+REQUEST_ID_HEADER = b"x-request-id"
+# Traces of requests still running, kept for the slow request report
+MAX_PENDING_TRACES = 1000
+# Spans listed per slow request
+MAX_REPORT_SPANS = 60
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+tracer = trace.get_tracer(SERVICE_NAME)
+
+_configured = False
+
+
+def current_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[trace.Span]:
+    """
+    Run the block in a child span of the current one. Exceptions are recorded on the span.
+
+    Args:
+        name (str): Span name, e.g. ``firestore.users.get``
+        **attributes: Span attributes; None values are left out
+    """
+    with tracer.start_as_current_span(name, attributes={k: v for k, v in attributes.items() if v is not None}) as current:
+        yield current
+
+
+def start_span(name: str, **attributes: Any) -> trace.Span:
+    """
+    Start a span that is not made current, for work spread over several steps such
+    as a generator. The caller ends it; ``use_span`` makes it current for one step.
+    """
+    return tracer.start_span(name, attributes={k: v for k, v in attributes.items() if v is not None})
+
+
+def use_span(current: trace.Span):
+    return trace.use_span(current, end_on_exit=False)
+
+
+def end_span(current: trace.Span, error: Optional[BaseException] = None) -> None:
+    """End a span from ``start_span``, marking it failed if ``error`` is given."""
+    if error is not None:
+        current.record_exception(error)
+        current.set_status(trace.Status(trace.StatusCode.ERROR, str(error)[:200]))
+    current.end()
+
+
+def annotate(**attributes: Any) -> None:
+    """Set attributes on the current span, e.g. results only known at the end of the call."""
+    trace.get_current_span().set_attributes({k: v for k, v in attributes.items() if v is not None})
+
+
+def add_event(name: str, **attributes: Any) -> None:
+    trace.get_current_span().add_event(name, {k: v for k, v in attributes.items() if v is not None})
+
+
+def traced(name: str, **attributes: Any) -> Callable:
+    """Decorator form of ``span`` for sync and async functions."""
+    def decorator(function: Callable) -> Callable:
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **attributes):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracingMiddleware:
+    """Opens the root span of each HTTP request and assigns its request id."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(REQUEST_ID_HEADER, b"").decode("latin-1")[:128] or uuid.uuid4().hex
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER, request_id.encode("latin-1"))]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            with tracer.start_as_current_span(
+                f"{method} {scope['path']}",
+                kind=trace.SpanKind.SERVER,
+                attributes={"http.request.method": method, "url.path": scope["path"]},
+            ) as root:
+                try:
+                    await self.app(scope, receive, send_with_request_id)
+                finally:
+                    # Named after the route template once the router has matched it
+                    route = route_template(scope)
+                    if route:
+                        root.update_name(f"{method} {route}")
+                        root.set_attribute("http.route", route)
+                    root.set_attribute("http.response.status_code", status["code"])
+                    if status["code"] >= 500:
+                        root.set_status(trace.Status(trace.StatusCode.ERROR))
+        finally:
+            request_id_var.reset(token)
+
+
+def _json_line(finished) -> str:
+    return json.dumps(json.loads(finished.to_json()), separators=(",", ":")) + "\n"
+
+
+class RequestIdProcessor(SpanProcessor):
+    """Tags every span with the request id of the context it was started in."""
+
+    def on_start(self, started, parent_context=None) -> None:
+        request_id = request_id_var.get()
+        if request_id:
+            started.set_attribute("request.id", request_id)
+
+
+class SlowRequestReport(SpanProcessor):
+    """
+    Prints the span tree of requests slower than ``threshold_ms``. A request is the
+    server span opened by ``TracingMiddleware`` and everything started under it (the
+    spans tagged with its request id); spans outside a request are ignored.
+    """
+
+    def __init__(self, threshold_ms: float):
+        self.threshold_ms = threshold_ms
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[int, List[Any]]" = OrderedDict()
+
+    def on_end(self, finished) -> None:
+        if "request.id" not in (finished.attributes or {}):
+            return
+        trace_id = finished.context.trace_id
+        with self._lock:
+            spans = self._pending.setdefault(trace_id, [])
+            spans.append(finished)
+            if finished.kind != trace.SpanKind.SERVER:
+                if len(self._pending) > MAX_PENDING_TRACES:
+                    self._pending.popitem(last=False)
+                return
+            del self._pending[trace_id]
+
+        duration_ms = (finished.end_time - finished.start_time) / 1e6
+        if duration_ms >= self.threshold_ms:
+            print(self.report(spans, finished))
+
+    def report(self, spans: List[Any], root) -> str:
+        children: Dict[Optional[int], List[Any]] = {}
+        for item in spans:
+            parent = item.parent.span_id if item.parent is not None else None
+            children.setdefault(parent, []).append(item)
+
+        lines = [f"Slow request {root.name}, request_id={root.attributes.get('request.id')}:"]
+
+        def walk(item, depth: int) -> None:
+            if len(lines) > MAX_REPORT_SPANS:
+                return
+            duration_ms = (item.end_time - item.start_time) / 1e6
+            offset_ms = (item.start_time - root.start_time) / 1e6
+            status = " ERROR" if item.status.status_code == trace.StatusCode.ERROR else ""
+            lines.append(f"  {'  ' * depth}{item.name}: {duration_ms:.0f} ms (at +{offset_ms:.0f} ms){status}")
+            for child in sorted(children.get(item.context.span_id, []), key=lambda c: c.start_time):
+                walk(child, depth + 1)
+
+        walk(root, 0)
+        if len(spans) >= MAX_REPORT_SPANS:
+            lines.append(f"  ... {len(spans)} spans in total")
+        return "\n".join(lines)
+
+
+def configure_tracing() -> bool:
+    """
+    Install the OpenTelemetry SDK for this process if an exporter or the slow request
+    report is enabled. Runs after the fork, so each worker owns its export thread.
+
+    Returns:
+        bool: True when spans are recorded
+    """
+    global _configured
+    if _configured:
+        return True
+    if TRACING_EXPORTER == "none" and SLOW_REQUEST_MS <= 0:
+        return False
+    if TracerProvider is None:
+        print("opentelemetry-sdk is not installed, tracing disabled")
+        return False
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": SERVICE_NAME, "process.pid": os.getpid()}),
+        sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO)),
+    )
+    provider.add_span_processor(RequestIdProcessor())
+    if TRACING_EXPORTER == "console":
+        provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter(formatter=_json_line)))
+    elif TRACING_EXPORTER == "file":
+        directory = os.path.dirname(TRACING_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter(out=open(TRACING_FILE, "a"), formatter=_json_line)))
+    elif TRACING_EXPORTER != "none":
+        print(f"Unknown TRACING_EXPORTER {TRACING_EXPORTER!r}, spans are not exported")
+    if SLOW_REQUEST_MS > 0:
+        provider.add_span_processor(SlowRequestReport(SLOW_REQUEST_MS))
+    trace.set_tracer_provider(provider)
+    _configured = True
+    print(f"Tracing enabled (exporter={TRACING_EXPORTER}, slow requests over {SLOW_REQUEST_MS:.0f} ms reported)")
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush spans still waiting in the export queue."""
+    provider = trace.get_tracer_provider()
+    if _configured and hasattr(provider, "shutdown"):
+        provider.shutdown()
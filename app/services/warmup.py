@@ -0,0 +1,121 @@
+"""
+Process warmup for production workers.
+
+Two stages, matching gunicorn's process model:
+
+- ``preload_shared`` runs once in the master before workers are forked (with
+  ``preload_app``). It only imports modules and loads read-only data (the heavy
+  libraries behind ``lazy_import``, the language detector's n-gram profiles), so
+  the memory is shared copy-on-write by every worker. It opens no sockets, files
+  or threads, which must not cross a fork.
+- ``warmup_worker`` runs in each worker at startup and creates what is per process:
+  the Gemini and Firestore clients, the SQLite cache connections and a thread in
+  each executor, so the first request does not pay for them.
+
+Failures are reported and skipped; a worker that could not warm up still serves
+requests and initializes lazily as before.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+from app.services.lazy_imports import preload
+
+# Imported in the master so workers share them
+SHARED_MODULES = [
+    "google.genai",
+    "google.genai.errors",
+    "httpx",
+    "firebase_admin",
+    "firebase_admin.credentials",
+    "firebase_admin.firestore",
+    "google.cloud.firestore_v1",
+    "google.cloud.firestore_v1.base_query",
+    "google.api_core.exceptions",
+    "deep_translator",
+    "deep_translator.exceptions",
+    "requests",
+    "bs4",
+    "fitz",
+    "docx",
+    "pptx",
+    "PIL.Image",
+]
+
+
+def _timed(steps: List[Tuple[str, Callable[[], object]]]) -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+            timings[name] = round((time.perf_counter() - start) * 1000, 1)
+        except Exception as e:
+            print(f"Warmup step {name} failed: {e}")
+    return timings
+
+
+def preload_shared() -> Dict[str, float]:
+    """
+    Import heavy modules and load read-only models before workers are forked.
+
+    Returns:
+        Dict[str, float]: Milliseconds per step
+    """
+    from app.services.text.language_detection import load_language_model
+
+    timings = _timed([
+        ("modules", lambda: preload(SHARED_MODULES)),
+        ("language_model", load_language_model),
+    ])
+    print(f"Preloaded shared modules: {timings}")
+    return timings
+
+
+def executors() -> Dict[str, ThreadPoolExecutor]:
+    from app.services.Questions.quiz_engine import quiz_executor
+    from app.api.v1.logic.flowchart_logic import flowchart_executor
+    from app.api.v1.logic.flashcard_logic import flashcard_executor
+    from app.api.v1.logic.scrape_web_page import scraper_executor, page_executor
+    from app.services.text.translation_engine import translation_engine
+
+    return {
+        "quiz": quiz_executor,
+        "flowchart": flowchart_executor,
+        "flashcards": flashcard_executor,
+        "scraper": scraper_executor,
+        "page_scraper": page_executor,
+        "translator": translation_engine.executor,
+    }
+
+
+def _start_executor_threads() -> None:
+    # Each submit starts a worker thread while the pool is below its size and no thread is idle
+    for executor in executors().values():
+        executor.submit(lambda: None).result()
+
+
+def warmup_worker() -> Dict[str, float]:
+    """
+    Create the per-process clients and connections before the first request.
+
+    Returns:
+        Dict[str, float]: Milliseconds per step that succeeded
+    """
+    from app.services.llm.gemini_client import get_client
+    from app.services.firebase.config import get_firebase_db
+    from app.services.text.language_detection import load_language_model
+    from app.services.text.translation_memory import translation_memory
+    from app.services.shared_cache import shared_cache
+
+    timings = _timed([
+        ("modules", lambda: preload(SHARED_MODULES)),
+        ("language_model", load_language_model),
+        ("gemini_client", get_client),
+        ("firestore_client", get_firebase_db),
+        ("translation_memory", translation_memory.warm),
+        ("shared_cache", shared_cache.warm),
+        ("executors", _start_executor_threads),
+    ])
+    print(f"Worker warmed up in {sum(timings.values()):.0f} ms: {timings}")
+    return timings
@@ -0,0 +1,16 @@
+"""
+Offline benchmark suite for the API.
+
+The app runs in-process against local stand-ins for everything it calls out to:
+
+- ``fake_gemini``: a Gemini client with configurable latency that answers every
+  call with a payload of the requested response schema
+- ``fake_firestore``: an in-memory Firestore seeded with users, quizzes,
+  flowcharts and flashcards, with a configurable latency per operation
+- ``fake_http``: a local HTTP server standing in for Google Translate, Google
+  speech recognition and the web pages that are scraped
+
+Fixture documents (PDF, DOCX, WAV audio, HTML) are generated deterministically by
+``corpus``. Scenarios are in ``scenarios`` and ``run`` drives them; see its
+docstring for usage.
+"""
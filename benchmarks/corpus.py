@@ -0,0 +1,195 @@
+"""
+Fixture corpus for the benchmarks.
+
+English study text is assembled from a fixed bank of sentences with a seeded
+generator, so the same seed always gives the same text, documents and payloads.
+The documents (PDF, DOCX, WAV, HTML) are written once per seed under
+``.cache/benchmarks/corpus`` and reused by later runs.
+"""
+
+import math
+import os
+import random
+import struct
+import wave
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(REPO_ROOT, ".cache", "benchmarks", "corpus")
+
+TOPICS: Dict[str, List[str]] = {
+    "Photosynthesis": [
+        "Photosynthesis converts light energy into chemical energy stored in glucose.",
+        "Chlorophyll in the chloroplasts absorbs mostly red and blue light and reflects green light.",
+        "The light dependent reactions split water molecules and release oxygen as a by-product.",
+        "The Calvin cycle uses carbon dioxide from the air to build sugars inside the stroma.",
+        "Plants open small pores called stomata to take in carbon dioxide during the day.",
+        "The rate of photosynthesis rises with light intensity until another factor becomes limiting.",
+        "Energy captured by producers flows through every food chain in an ecosystem.",
+        "Without photosynthesis the oxygen in the atmosphere would slowly run out.",
+    ],
+    "The French Revolution": [
+        "The French Revolution began in 1789 when the Estates General met for the first time in generations.",
+        "Heavy taxes, poor harvests and rising bread prices made ordinary people angry with the monarchy.",
+        "The storming of the Bastille on the fourteenth of July became a symbol of popular resistance.",
+        "The Declaration of the Rights of Man stated that all citizens are equal before the law.",
+        "King Louis the Sixteenth was tried for treason and executed in January 1793.",
+        "During the Reign of Terror thousands of suspected enemies of the revolution were executed.",
+        "Napoleon Bonaparte seized power in 1799 and later crowned himself emperor.",
+        "Ideas of liberty and national sovereignty from the revolution spread across Europe.",
+    ],
+    "Plate Tectonics": [
+        "The outer shell of the Earth is broken into large plates that move a few centimetres each year.",
+        "Heat from the mantle drives slow convection currents that push the plates apart.",
+        "New ocean floor forms at mid-ocean ridges where two plates move away from each other.",
+        "When an oceanic plate sinks beneath a continental plate, deep trenches and volcanoes form.",
+        "Earthquakes happen when stress builds up along a fault and is suddenly released.",
+        "The Himalayas are still rising because the Indian plate keeps pushing into Asia.",
+        "Matching fossils on different continents support the idea that they were once joined.",
+        "Geologists use seismic waves to study the layers deep inside the planet.",
+    ],
+    "Computer Networks": [
+        "A computer network lets devices exchange data over wired or wireless links.",
+        "The Internet Protocol gives every device an address so that packets can be routed to it.",
+        "Routers forward packets between networks by looking up the best path in their tables.",
+        "The Transmission Control Protocol resends lost packets and delivers data in order.",
+        "The Domain Name System translates readable names into numeric addresses.",
+        "Encryption with TLS keeps data private while it travels across public networks.",
+        "Bandwidth measures how much data a link can carry, while latency measures how long it takes.",
+        "Firewalls filter traffic according to rules to protect a network from attacks.",
+    ],
+}
+
+ALL_SENTENCES = [sentence for sentences in TOPICS.values() for sentence in sentences]
+
+
+def sentences(rng: random.Random, count: int) -> List[str]:
+    return [rng.choice(ALL_SENTENCES) for _ in range(count)]
+
+
+def phrase(rng: random.Random, max_words: int = 6) -> str:
+    """A short label cut from a random sentence, e.g. for titles and flowchart nodes."""
+    words = rng.choice(ALL_SENTENCES).rstrip(".").split()
+    start = rng.randrange(0, max(1, len(words) - max_words))
+    return " ".join(words[start:start + max_words]).capitalize()
+
+
+def study_text(seed: int, words: int = 1500) -> str:
+    """
+    English study text of about ``words`` words, in titled paragraphs.
+
+    Args:
+        seed (int): Texts with different seeds differ, so caches keyed by text stay cold
+        words (int): Approximate length
+    """
+    rng = random.Random(seed)
+    paragraphs = []
+    total = 0
+    while total < words:
+        topic = rng.choice(list(TOPICS))
+        paragraph = " ".join(rng.sample(TOPICS[topic], rng.randint(4, 6)))
+        paragraphs.append(f"{topic}\n{paragraph}")
+        total += len(paragraph.split()) + len(topic.split())
+    return "\n\n".join(paragraphs)
+
+
+def html_page(seed: int, words: int = 1500) -> str:
+    """A web page with the study text in its body, between navigation, scripts and a footer."""
+    body = "\n".join(
+        f"<h2>{paragraph.split(chr(10))[0]}</h2>\n<p>{paragraph.split(chr(10))[1]}</p>"
+        for paragraph in study_text(seed, words).split("\n\n")
+    )
+    return f"""<!DOCTYPE html>
+<html>
+<head><title>Study notes {seed}</title><style>body {{ font-family: sans-serif; }}</style></head>
+<body>
+<header><nav><a href="/">Home</a> <a href="/courses">Courses</a></nav></header>
+<script>window.analytics = {{ page: "notes-{seed}" }};</script>
+<article>
+{body}
+</article>
+<aside>Related: more study notes</aside>
+<footer>Copyright study notes</footer>
+</body>
+</html>
+"""
+
+
+def _write_pdf(path: str, text: str) -> None:
+    import fitz
+
+    document = fitz.open()
+    paragraphs = text.split("\n\n")
+    # About 350 words per A4 page at 11 pt
+    page_text: List[str] = []
+    page_words = 0
+    pages = []
+    for paragraph in paragraphs:
+        page_text.append(paragraph)
+        page_words += len(paragraph.split())
+        if page_words >= 350:
+            pages.append("\n\n".join(page_text))
+            page_text, page_words = [], 0
+    if page_text:
+        pages.append("\n\n".join(page_text))
+    for content in pages:
+        page = document.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50), content, fontsize=11)
+    document.save(path)
+    document.close()
+
+
+def _write_docx(path: str, text: str) -> None:
+    import docx
+
+    document = docx.Document()
+    for paragraph in text.split("\n\n"):
+        heading, body = paragraph.split("\n", 1)
+        document.add_heading(heading, level=2)
+        document.add_paragraph(body)
+    document.save(path)
+
+
+def _write_html(path: str, html: str) -> None:
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(html)
+
+
+def _write_wav(path: str, seconds: float = 4.0, sample_rate: int = 16000) -> None:
+    """A deterministic tone with a varying envelope; the fake recognizer supplies the transcript."""
+    frames = bytearray()
+    for i in range(int(seconds * sample_rate)):
+        t = i / sample_rate
+        envelope = 0.5 + 0.5 * math.sin(2 * math.pi * 3 * t)
+        sample = envelope * (math.sin(2 * math.pi * 220 * t) + 0.3 * math.sin(2 * math.pi * 660 * t))
+        frames += struct.pack("<h", int(sample * 12000))
+    with wave.open(path, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(bytes(frames))
+
+
+def build_corpus(seed: int = 0, directory: str = CORPUS_DIR) -> Dict[str, str]:
+    """
+    Write the fixture documents for ``seed`` if they are missing.
+
+    Returns:
+        Dict[str, str]: Path per document kind: "pdf", "docx", "html" and "wav"
+    """
+    directory = os.path.join(directory, f"seed-{seed}")
+    os.makedirs(directory, exist_ok=True)
+    text = study_text(seed, words=1500)
+    writers = {
+        "pdf": ("lecture.pdf", lambda path: _write_pdf(path, text)),
+        "docx": ("notes.docx", lambda path: _write_docx(path, text)),
+        "html": ("article.html", lambda path: _write_html(path, html_page(seed))),
+        "wav": ("lecture.wav", _write_wav),
+    }
+    paths = {}
+    for kind, (name, write) in writers.items():
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            write(path)
+        paths[kind] = path
+    return paths
@@ -0,0 +1,298 @@
+"""
+In-memory stand-in for the Firestore client.
+
+Covers the part of the API the services use: collection and document references,
+``get``/``stream``/``add``/``set`` (with ``merge`` and ``Increment``), ``where``
+with a ``FieldFilter``, ``order_by``, ``limit``, ``get_all`` and write batches.
+Every round trip sleeps for the configured latency, so personalization and
+analytics reads cost time roughly as they do against the real database.
+"""
+
+import copy
+import datetime
+import itertools
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from benchmarks.corpus import phrase, sentences
+
+OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+}
+
+
+def _merge(target: dict, update: dict) -> None:
+    """Apply a ``set(..., merge=True)`` update: nested maps are merged and ``Increment`` adds."""
+    for key, value in update.items():
+        if isinstance(value, dict):
+            existing = target.get(key)
+            if not isinstance(existing, dict):
+                existing = target[key] = {}
+            _merge(existing, value)
+        elif type(value).__name__ == "Increment":
+            target[key] = (target.get(key) or 0) + value.value
+        else:
+            target[key] = copy.deepcopy(value)
+
+
+def _resolve(data: dict) -> dict:
+    """Plain values for a full ``set``: ``Increment`` starts from zero."""
+    return {
+        key: _resolve(value) if isinstance(value, dict) else value.value if type(value).__name__ == "Increment" else copy.deepcopy(value)
+        for key, value in data.items()
+    }
+
+
+class FakeSnapshot:
+    def __init__(self, reference: "FakeDocument", data: Optional[dict]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[dict]:
+        return copy.deepcopy(self._data)
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+
+class FakeDocument:
+    def __init__(self, db: "FakeFirestore", collection_path: str, document_id: str):
+        self._db = db
+        self._collection_path = collection_path
+        self.id = document_id
+        self.path = f"{collection_path}/{document_id}"
+
+    def collection(self, name: str) -> "FakeCollection":
+        return FakeCollection(self._db, f"{self.path}/{name}")
+
+    def get(self) -> FakeSnapshot:
+        self._db.round_trip()
+        return self._db.read(self._collection_path, self.id)
+
+    def set(self, data: dict, merge: bool = False) -> None:
+        self._db.round_trip()
+        self._db.write(self._collection_path, self.id, data, merge)
+
+    def update(self, data: dict) -> None:
+        self.set(data, merge=True)
+
+
+class FakeCollection:
+    """A collection reference, or a query on one once filtered, ordered or limited."""
+
+    def __init__(self, db: "FakeFirestore", path: str, filters: Tuple = (), order: Tuple = (), limit_to: Optional[int] = None):
+        self._db = db
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+        self._filters = filters
+        self._order = order
+        self._limit = limit_to
+
+    def document(self, document_id: Optional[str] = None) -> FakeDocument:
+        return FakeDocument(self._db, self.path, document_id or self._db.new_id())
+
+    def add(self, data: dict) -> Tuple[datetime.datetime, FakeDocument]:
+        reference = self.document()
+        reference.set(data)
+        return datetime.datetime.now(datetime.timezone.utc), reference
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value: Any = None, filter: Any = None) -> "FakeCollection":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return FakeCollection(self._db, self.path, self._filters + ((field_path, op_string, value),), self._order, self._limit)
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING") -> "FakeCollection":
+        return FakeCollection(self._db, self.path, self._filters, self._order + ((field_path, direction),), self._limit)
+
+    def limit(self, count: int) -> "FakeCollection":
+        return FakeCollection(self._db, self.path, self._filters, self._order, count)
+
+    def get(self) -> List[FakeSnapshot]:
+        self._db.round_trip()
+        snapshots = [
+            snapshot for snapshot in self._db.scan(self.path)
+            if all(OPERATORS[op](snapshot.get(field), value) for field, op, value in self._filters)
+        ]
+        for field, direction in reversed(self._order):
+            snapshots.sort(key=lambda snapshot: snapshot.get(field), reverse=str(direction).upper() == "DESCENDING")
+        return snapshots[:self._limit] if self._limit is not None else snapshots
+
+    def stream(self) -> Iterator[FakeSnapshot]:
+        return iter(self.get())
+
+
+class FakeBatch:
+    def __init__(self, db: "FakeFirestore"):
+        self._db = db
+        self._writes: List[Tuple[str, FakeDocument, dict, bool]] = []
+
+    def set(self, reference: FakeDocument, data: dict, merge: bool = False) -> None:
+        self._writes.append(("set", reference, data, merge))
+
+    def create(self, reference: FakeDocument, data: dict) -> None:
+        self._writes.append(("create", reference, data, False))
+
+    def commit(self) -> None:
+        from google.api_core.exceptions import AlreadyExists
+
+        self._db.round_trip()
+        with self._db.lock:
+            # All or nothing, like a real batch
+            for kind, reference, _, _ in self._writes:
+                if kind == "create" and reference.id in self._db.documents(reference._collection_path):
+                    raise AlreadyExists(f"Document already exists: {reference.path}")
+            for _, reference, data, merge in self._writes:
+                self._db.write(reference._collection_path, reference.id, data, merge)
+
+
+class FakeFirestore:
+    """
+    Args:
+        latency_ms (float): Time per round trip (a get, a query, a batch commit)
+        seed (int): Seed of the generated document ids
+    """
+
+    def __init__(self, latency_ms: float = 5.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.lock = threading.RLock()
+        self._collections: Dict[str, Dict[str, dict]] = {}
+        self._ids = itertools.count()
+        self._seed = seed
+        self.round_trips = 0
+        self.reads = 0
+        self.writes = 0
+
+    def round_trip(self) -> None:
+        with self.lock:
+            self.round_trips += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def new_id(self) -> str:
+        with self.lock:
+            return f"doc-{self._seed}-{next(self._ids)}"
+
+    def documents(self, collection_path: str) -> Dict[str, dict]:
+        with self.lock:
+            return self._collections.get(collection_path, {})
+
+    def read(self, collection_path: str, document_id: str) -> FakeSnapshot:
+        with self.lock:
+            self.reads += 1
+            data = self._collections.get(collection_path, {}).get(document_id)
+        return FakeSnapshot(FakeDocument(self, collection_path, document_id), data)
+
+    def scan(self, collection_path: str) -> List[FakeSnapshot]:
+        with self.lock:
+            documents = list(self._collections.get(collection_path, {}).items())
+            self.reads += max(1, len(documents))
+        return [FakeSnapshot(FakeDocument(self, collection_path, document_id), data) for document_id, data in documents]
+
+    def write(self, collection_path: str, document_id: str, data: dict, merge: bool) -> None:
+        with self.lock:
+            self.writes += 1
+            documents = self._collections.setdefault(collection_path, {})
+            if merge and document_id in documents:
+                _merge(documents[document_id], data)
+            else:
+                documents[document_id] = _resolve(data)
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self, name)
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch(self)
+
+    def get_all(self, references: Iterable[FakeDocument]) -> Iterator[FakeSnapshot]:
+        self.round_trip()
+        return iter([self.read(reference._collection_path, reference.id) for reference in references])
+
+    def counters(self) -> Dict[str, int]:
+        with self.lock:
+            return {"round_trips": self.round_trips, "reads": self.reads, "writes": self.writes}
+
+
+def _feedback(rng: random.Random) -> dict:
+    return {"experience": sentences(rng, 1)[0], "improvements": [phrase(rng, 5)], "rating": rng.randint(1, 5)}
+
+
+def seed_users(db: FakeFirestore, users: int = 20, seed: int = 0) -> List[str]:
+    """
+    Give ``users`` users a profile and a history like an active account: quizzes with
+    submissions, flowcharts and flashcard sets. The quiz analytics rollup is left to be
+    built from that history by the first request that needs it.
+
+    Returns:
+        List[str]: The user ids
+    """
+    rng = random.Random(seed)
+    now = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    user_ids = []
+    for u in range(users):
+        user_id = f"bench-user-{u}"
+        user_ids.append(user_id)
+        user = db.collection("users").document(user_id)
+        db.write("users", user_id, {
+            "id": user_id,
+            "email": f"{user_id}@example.com",
+            "username": user_id,
+            "joined": now - datetime.timedelta(days=rng.randint(30, 400)),
+            "country": rng.choice(["India", "France", "Brazil", "Kenya"]),
+            "primaryGoal": "Exam preparation",
+            "educationLevel": rng.choice(["High School", "Undergraduate"]),
+        }, merge=False)
+        for q in range(rng.randint(3, 8)):
+            quiz = user.collection("quizes").document(f"quiz-{q}")
+            number = rng.choice([5, 10, 15])
+            submission_ids = []
+            for s in range(rng.randint(1, 3)):
+                submission_id = f"submission-{s}"
+                submission_ids.append(submission_id)
+                score = rng.randint(0, number)
+                db.write(f"{quiz.path}/submissions", submission_id, {
+                    "attempt_number": s + 1,
+                    "time_taken": rng.randint(60, 900),
+                    "submittedAt": now - datetime.timedelta(days=rng.randint(0, 60)),
+                    "answers": {str(i + 1): rng.randrange(4) for i in range(number)},
+                    "score": score,
+                }, merge=False)
+            db.write(f"users/{user_id}/quizes", quiz.id, {
+                "title": phrase(rng, 6),
+                "difficulty": rng.choice(["Easy", "Medium", "Hard"]),
+                "quiz_type": rng.choice(["mcq", "truefalse", "short", "mix"]),
+                "generatedAt": now - datetime.timedelta(days=rng.randint(0, 90)),
+                "number": number,
+                "time_limit": 600,
+                "total_submissions": len(submission_ids),
+                "list_score": [rng.randint(0, number) for _ in submission_ids],
+                "questions": [{"correct": rng.randrange(4)}],
+                "submissions": submission_ids,
+                "feedback": _feedback(rng),
+            }, merge=False)
+        for f in range(rng.randint(2, 6)):
+            db.write(f"users/{user_id}/flowcharts", f"flowchart-{f}", {
+                "title": phrase(rng, 6),
+                "generatedAt": now - datetime.timedelta(days=rng.randint(0, 90)),
+                "flowchart": {"nodes": [{"label": phrase(rng, 4)} for _ in range(rng.randint(5, 15))]},
+                "feedback": _feedback(rng),
+            }, merge=False)
+        for c in range(rng.randint(2, 6)):
+            db.write(f"users/{user_id}/flashcards", f"flashcards-{c}", {
+                "title": phrase(rng, 6),
+                "generatedAt": now - datetime.timedelta(days=rng.randint(0, 90)),
+                "flashcards": [{"question": phrase(rng, 6), "answer": sentences(rng, 1)[0]} for _ in range(rng.randint(5, 20))],
+                "feedback": _feedback(rng),
+            }, merge=False)
+    # Seeding is not part of the measured traffic
+    db.reads = db.writes = db.round_trips = 0
+    return user_ids
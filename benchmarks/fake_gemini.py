@@ -0,0 +1,261 @@
+"""
+Stand-in for the google-genai client.
+
+Installed as the process-wide client of ``app.services.llm.gemini_client``, so calls
+still go through the app's rate limiter, retries, model router and metrics; only the
+network call is replaced. Each response is built for the ``response_schema`` of the
+call's config (quiz, flowchart, flashcards, summaries, translations, titles) from
+the corpus sentences, seeded by the prompt: the same prompt always gets the same
+answer and the same simulated latency, whatever the thread scheduling.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import typing
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from pydantic import BaseModel
+from benchmarks.corpus import phrase, sentences
+
+# Characters per token, for the usage metadata and the simulated generation time
+CHARS_PER_TOKEN = 4
+STREAM_CHUNK_CHARS = 200
+
+
+@dataclass
+class GeminiLatency:
+    """Simulated latency of one call: time to first token plus time per output token."""
+    first_token_ms: float = 100.0
+    ms_per_output_token: float = 0.5
+    jitter: float = 0.2  # Up to this fraction slower or faster, seeded by the prompt
+
+    def seconds(self, rng: random.Random, output_tokens: int) -> float:
+        nominal = self.first_token_ms + self.ms_per_output_token * output_tokens
+        return max(0.0, nominal * (1 + rng.uniform(-self.jitter, self.jitter))) / 1000
+
+
+class FakeUsage:
+    def __init__(self, prompt_tokens: int, output_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class FakeResponse:
+    def __init__(self, text: str, usage: Optional[FakeUsage]):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class FakeTokenCount:
+    def __init__(self, total_tokens: int):
+        self.total_tokens = total_tokens
+
+
+def _count_range(prompt: str, default: int, rng: random.Random) -> int:
+    """A count inside the range a prompt asks for, e.g. "between 5 and 20" or "4 to 6"."""
+    match = re.search(r"(\d+) (?:to|and) (\d+)", prompt)
+    if not match:
+        return default
+    low, high = sorted((int(match.group(1)), int(match.group(2))))
+    return rng.randint(low, high)
+
+
+def _questions(rng: random.Random, prompt: str, scale: float) -> List[dict]:
+    counts = [(int(count), kind.lower()) for count, kind in re.findall(r"(\d+) (MCQ|TRUEFALSE|SHORT)\b", prompt)]
+    if not counts:
+        match = re.search(r"Generate (\d+) (\w+) questions", prompt)
+        counts = [(int(match.group(1)), match.group(2).lower())] if match else [(5, "mcq")]
+    difficulty = re.search(r'"difficulty": "(\w+)"', prompt)
+    questions = []
+    for count, kind in counts:
+        for _ in range(max(1, round(count * scale))):
+            question = {
+                "id": len(questions) + 1,
+                "question": f"Which statement is true? {sentences(rng, 1)[0]}",
+                "type": kind,
+                "difficulty": difficulty.group(1) if difficulty else "Medium",
+                "explanation": " ".join(sentences(rng, 2)),
+            }
+            if kind == "mcq":
+                question["options"] = [phrase(rng, 8) for _ in range(4)]
+                question["correct"] = rng.randrange(4)
+            elif kind == "truefalse":
+                question["correct"] = rng.random() < 0.5
+            else:
+                question["correct"] = sentences(rng, 1)[0]
+            questions.append(question)
+    return questions
+
+
+def _nodes(rng: random.Random, count: int) -> dict:
+    """A tree of ``count`` nodes rooted at node 0, every node after the first three under an earlier one."""
+    nodes = [{"label": phrase(rng, 5), "children": []} for _ in range(count)]
+    for child in range(1, count):
+        nodes[0 if child <= 3 else rng.randrange(1, child)]["children"].append(child)
+    return {"nodes": nodes}
+
+
+def _outline(rng: random.Random, prompt: str) -> dict:
+    sections = len(re.findall(r"^\s*\d+\. ", prompt, re.MULTILINE)) or 1
+    groups = min(sections, rng.randint(2, 6))
+    return {
+        "title": phrase(rng, 8),
+        "root": phrase(rng, 4),
+        "groups": [
+            {"label": phrase(rng, 5), "sections": list(range(sections))[i::groups]}
+            for i in range(groups)
+        ],
+    }
+
+
+def _translations(rng: random.Random, prompt: str) -> dict:
+    segments = json.loads(prompt.split("Original Segments (JSON array):", 1)[1].split("\n", 2)[1])
+    target = re.search(r"Target Language: (.+)", prompt)
+    marker = f"[{target.group(1).strip()}] " if target else ""
+    return {"translations": [marker + segment for segment in segments]}
+
+
+# Response payload per schema name; each builder gets a generator seeded by the
+# prompt, the prompt and the output scale
+PayloadBuilder = Callable[[random.Random, str, float], Any]
+
+PAYLOADS: Dict[str, PayloadBuilder] = {
+    "quiz_payload": lambda rng, prompt, scale: {"title": phrase(rng, 8), "questions": _questions(rng, prompt, scale)},
+    "list[Question]": _questions,
+    "Nodes": lambda rng, prompt, scale: _nodes(rng, max(3, round(rng.randint(8, 14) * scale))),
+    "flowchart_response": lambda rng, prompt, scale: {"title": phrase(rng, 8), "flowchart": _nodes(rng, max(3, round(rng.randint(10, 18) * scale)))},
+    "flowchart_outline": lambda rng, prompt, scale: _outline(rng, prompt),
+    "flashcard_response": lambda rng, prompt, scale: {
+        "title": phrase(rng, 8),
+        "flashcards": [
+            {"question": f"Explain: {phrase(rng, 8)}?", "answer": " ".join(sentences(rng, 2))}
+            for _ in range(max(1, round(_count_range(prompt, 10, rng) * scale)))
+        ],
+    },
+    "paragraph_summary": lambda rng, prompt, scale: {"title": phrase(rng, 8), "summary": " ".join(sentences(rng, max(2, round(8 * scale))))},
+    "bullet_summary": lambda rng, prompt, scale: {"title": phrase(rng, 8), "summary": sentences(rng, max(2, round(6 * scale)))},
+    "segment_translations": lambda rng, prompt, scale: _translations(rng, prompt),
+}
+
+
+def schema_name(schema: Any) -> str:
+    if schema is None:
+        return "text"
+    if typing.get_origin(schema) is list:
+        return f"list[{schema_name(typing.get_args(schema)[0])}]"
+    return getattr(schema, "__name__", str(schema))
+
+
+def _fill(annotation: Any, rng: random.Random) -> Any:
+    """Any value of the annotation's type, for schemas without a registered builder."""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        options = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return _fill(options[0], rng)
+    if origin in (list, List):
+        return [_fill(typing.get_args(annotation)[0], rng) for _ in range(3)]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return {
+            name: _fill(field.annotation, rng)
+            for name, field in annotation.model_fields.items()
+            if field.is_required()
+        }
+    if annotation is bool:
+        return rng.random() < 0.5
+    if annotation is int:
+        return rng.randint(0, 3)
+    if annotation is float:
+        return round(rng.random(), 3)
+    return sentences(rng, 1)[0]
+
+
+class FakeModels:
+    """The ``client.models`` part of the genai client."""
+
+    def __init__(self, client: "FakeGeminiClient"):
+        self._client = client
+
+    def generate_content(self, model: str, contents: Any, config: Optional[Dict[str, Any]] = None) -> FakeResponse:
+        text, rng = self._client.respond(contents, config)
+        usage = self._client.usage(contents, text)
+        time.sleep(self._client.latency.seconds(rng, usage.candidates_token_count))
+        return FakeResponse(text, usage)
+
+    def generate_content_stream(self, model: str, contents: Any, config: Optional[Dict[str, Any]] = None) -> Iterator[FakeResponse]:
+        text, rng = self._client.respond(contents, config)
+        usage = self._client.usage(contents, text)
+        chunks = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+        latency = self._client.latency
+        time.sleep(latency.seconds(rng, 0))
+        for i, chunk in enumerate(chunks):
+            time.sleep(latency.ms_per_output_token * len(chunk) / CHARS_PER_TOKEN / 1000)
+            # Usage is reported on the last chunk
+            yield FakeResponse(chunk, usage if i == len(chunks) - 1 else None)
+
+    def count_tokens(self, model: str, contents: Any) -> FakeTokenCount:
+        time.sleep(self._client.count_tokens_ms / 1000)
+        with self._client.lock:
+            self._client.calls["count_tokens"] = self._client.calls.get("count_tokens", 0) + 1
+        return FakeTokenCount(len(str(contents)) // CHARS_PER_TOKEN)
+
+
+class FakeGeminiClient:
+    """
+    Args:
+        latency (Optional[GeminiLatency]): Simulated generation latency
+        count_tokens_ms (float): Latency of a ``count_tokens`` call
+        seed (int): Changes every payload and latency
+        output_scale (float): Multiplies the number of questions, cards, nodes and sentences
+        error_rate (float): Share of calls failing with a connection error, retried by the app
+        payloads (Optional[Dict[str, PayloadBuilder]]): Builders replacing the defaults, by schema name
+    """
+
+    def __init__(
+        self,
+        latency: Optional[GeminiLatency] = None,
+        count_tokens_ms: float = 20.0,
+        seed: int = 0,
+        output_scale: float = 1.0,
+        error_rate: float = 0.0,
+        payloads: Optional[Dict[str, PayloadBuilder]] = None,
+    ):
+        self.latency = latency or GeminiLatency()
+        self.count_tokens_ms = count_tokens_ms
+        self.seed = seed
+        self.output_scale = output_scale
+        self.error_rate = error_rate
+        self.payloads = {**PAYLOADS, **(payloads or {})}
+        self.models = FakeModels(self)
+        self.lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self._errors = random.Random(seed)
+
+    def respond(self, contents: Any, config: Optional[Dict[str, Any]]) -> tuple:
+        """The response text for a call, and the generator seeded by its prompt."""
+        prompt = str(contents)
+        schema = (config or {}).get("response_schema")
+        name = schema_name(schema)
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            failed = self._errors.random() < self.error_rate
+        if failed:
+            raise ConnectionError("Simulated Gemini connection reset")
+
+        rng = random.Random(f"{self.seed}:{name}:{prompt}")
+        if schema is None:
+            return phrase(rng, 8), rng
+        builder = self.payloads.get(name)
+        value = builder(rng, prompt, self.output_scale) if builder else _fill(schema, rng)
+        return json.dumps(value, ensure_ascii=False), rng
+
+    @staticmethod
+    def usage(contents: Any, text: str) -> FakeUsage:
+        return FakeUsage(len(str(contents)) // CHARS_PER_TOKEN, len(text) // CHARS_PER_TOKEN)
+
+    def total_calls(self) -> int:
+        with self.lock:
+            return sum(count for name, count in self.calls.items() if name != "count_tokens")
@@ -0,0 +1,114 @@
+"""
+Local HTTP server standing in for the third-party services reached over HTTP.
+
+- ``GET /m?sl=..&tl=..&q=..``: the Google Translate page deep_translator scrapes,
+  answering with the text marked with the target language
+- ``POST /speech-api/v2/recognize``: Google speech recognition, answering with a
+  fixed transcript in its line-delimited JSON format
+- ``GET /pages/<seed>.html``: the corpus web page for a seed, for the scraper
+
+``install`` points deep_translator and speech_recognition at the server; the
+clients still build and parse real requests and responses.
+"""
+
+import functools
+import html
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+from benchmarks.corpus import html_page, study_text
+
+TRANSCRIPT_WORDS = 120
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _reply(self, status: int, body: str, content_type: str) -> None:
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        time.sleep(self.server.latency_ms / 1000)
+        url = urlparse(self.path)
+        if url.path == "/m":
+            params = parse_qs(url.query)
+            text = params.get("q", [""])[0]
+            target = params.get("tl", ["en"])[0]
+            self._reply(200, f'<html><body><div class="result-container">[{target}] {html.escape(text)}</div></body></html>', "text/html; charset=utf-8")
+        elif url.path.startswith("/pages/") and url.path.endswith(".html"):
+            try:
+                seed = int(url.path[len("/pages/"):-len(".html")])
+            except ValueError:
+                self._reply(404, "Not found", "text/plain")
+                return
+            self._reply(200, html_page(seed), "text/html; charset=utf-8")
+        else:
+            self._reply(404, "Not found", "text/plain")
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.server.latency_ms / 1000)
+        if urlparse(self.path).path != "/speech-api/v2/recognize":
+            self._reply(404, "Not found", "text/plain")
+            return
+        result = {"result": [{"alternative": [{"transcript": self.server.transcript, "confidence": 0.92}], "final": True}], "result_index": 0}
+        self._reply(200, json.dumps({"result": []}) + "\n" + json.dumps(result) + "\n", "application/json")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    latency_ms: float
+    transcript: str
+
+
+class FakeHttpServer:
+    """
+    Args:
+        latency_ms (float): Time before each response
+        seed (int): Seed of the speech transcript
+    """
+
+    def __init__(self, latency_ms: float = 20.0, seed: int = 0):
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.latency_ms = latency_ms
+        self._server.transcript = " ".join(study_text(seed, TRANSCRIPT_WORDS).replace("\n", " ").split()[:TRANSCRIPT_WORDS])
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def page_url(self, seed: int) -> str:
+        return f"{self.url}/pages/{seed}.html"
+
+    def start(self) -> "FakeHttpServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def install(self) -> None:
+        """Send Google Translate and speech recognition requests to this server."""
+        from deep_translator.constants import BASE_URLS
+        import speech_recognition as sr
+
+        # Read by each GoogleTranslator when it is created
+        BASE_URLS["GOOGLE_TRANSLATE"] = f"{self.url}/m"
+        recognize_google = getattr(sr.Recognizer.recognize_google, "func", sr.Recognizer.recognize_google)
+        sr.Recognizer.recognize_google = functools.partialmethod(recognize_google, endpoint=f"{self.url}/speech-api/v2/recognize")
@@ -0,0 +1,323 @@
+"""
+Offline benchmarks of the API endpoints.
+
+The app is served in-process (ASGI, one event loop, as in one uvicorn worker) with
+Gemini, Firestore, Google Translate, speech recognition and the scraped web pages
+replaced by the local fakes in this package. Nothing leaves the machine and no
+credentials are needed.
+
+Usage (from the repository root):
+
+    python -m benchmarks.run
+    python -m benchmarks.run --scenarios summarize,quiz_mix --concurrency 1,8,32 --requests 64
+    python -m benchmarks.run --gemini-first-token-ms 800 --gemini-ms-per-token 5
+    python -m benchmarks.run --json .cache/benchmarks/before.json
+    python -m benchmarks.run --baseline .cache/benchmarks/before.json --max-regression 10
+
+For every scenario and concurrency level, ``--requests`` requests are sent with that
+many in flight. Reported per level: throughput, p50/p99 latency, errors, CPU time,
+Gemini calls and Firestore reads per request. A separate sequential pass under
+tracemalloc (``--allocation-requests``, 0 to skip) reports the peak memory allocated
+while serving one request and the memory still held after the pass.
+
+With ``--baseline``, results are compared with an earlier ``--json`` file and the
+exit status is 1 when a p50 or p99 latency got more than ``--max-regression``
+percent worse.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import math
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from benchmarks.corpus import REPO_ROOT, build_corpus
+from benchmarks.fake_firestore import FakeFirestore, seed_users
+from benchmarks.fake_gemini import FakeGeminiClient, GeminiLatency
+from benchmarks.fake_http import FakeHttpServer
+from benchmarks.scenarios import SCENARIOS, SCENARIOS_BY_NAME, BenchContext, Scenario
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmarks with fake Gemini, Firestore and HTTP services")
+    parser.add_argument("--scenarios", default=",".join(scenario.name for scenario in SCENARIOS), help="Comma-separated scenario names")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated numbers of requests in flight")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per scenario and concurrency level")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured requests before each scenario")
+    parser.add_argument("--allocation-requests", type=int, default=8, help="Requests in the tracemalloc pass, 0 to skip it")
+    parser.add_argument("--text-words", type=int, default=1500, help="Length of the texts sent for generation")
+    parser.add_argument("--users", type=int, default=20, help="Seeded users the requests are personalized for")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gemini-first-token-ms", type=float, default=100.0)
+    parser.add_argument("--gemini-ms-per-token", type=float, default=0.5)
+    parser.add_argument("--gemini-jitter", type=float, default=0.2, help="Latency varies by up to this fraction")
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0, help="Share of Gemini calls failing and retried")
+    parser.add_argument("--count-tokens-ms", type=float, default=20.0)
+    parser.add_argument("--output-scale", type=float, default=1.0, help="Scales the size of generated payloads")
+    parser.add_argument("--firestore-ms", type=float, default=5.0, help="Latency per Firestore round trip")
+    parser.add_argument("--http-ms", type=float, default=20.0, help="Latency of Google Translate, speech recognition and web pages")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Compare with the results in this file")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="Percent p50/p99 slowdown tolerated against the baseline")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's own output")
+    return parser.parse_args(argv)
+
+
+def configure_environment(workdir: str) -> None:
+    """Settings the app reads at import time; must run before ``main`` is imported."""
+    os.environ["GEMINI_API_KEY"] = "offline-benchmark"
+    # The fakes set the pace, not the production quota
+    os.environ["GEMINI_RPM"] = "1000000"
+    os.environ["GEMINI_TPM"] = "1000000000"
+    os.environ["GEMINI_QUOTA_WORKERS"] = "1"
+    # Fresh caches for every run
+    os.environ["TRANSLATION_MEMORY_PATH"] = os.path.join(workdir, "translation_memory.sqlite3")
+    os.environ["SHARED_CACHE_PATH"] = os.path.join(workdir, "shared_cache.sqlite3")
+    os.environ["WARMUP_ON_STARTUP"] = "0"
+    os.environ["TRACING_EXPORTER"] = "none"
+    os.environ["TRACING_SLOW_REQUEST_MS"] = "0"
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    os.environ["NO_PROXY"] = "127.0.0.1,localhost"
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class Bench:
+    def __init__(self, args: argparse.Namespace, client, gemini: FakeGeminiClient, db: FakeFirestore, ctx: BenchContext):
+        self.args = args
+        self.client = client
+        self.gemini = gemini
+        self.db = db
+        self.ctx = ctx
+        # Numbers every request of the run, so no two requests share a text
+        self._request_numbers = itertools.count()
+
+    @contextlib.contextmanager
+    def quiet(self) -> Iterator[None]:
+        if self.args.verbose:
+            yield
+            return
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            yield
+
+    async def send(self, scenario: Scenario) -> Tuple[float, bool]:
+        request = scenario.build(next(self._request_numbers), self.ctx)
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(scenario.method, scenario.path, **request)
+            ok = response.status_code < 400
+        except Exception as e:
+            print(f"{scenario.name} request failed: {e}", file=sys.stderr)
+            ok = False
+        return time.perf_counter() - start, ok
+
+    async def run_level(self, scenario: Scenario, concurrency: int) -> Dict[str, Any]:
+        remaining = iter(range(self.args.requests))
+        latencies: List[float] = []
+        errors = 0
+
+        async def worker() -> None:
+            nonlocal errors
+            for _ in remaining:
+                latency, ok = await self.send(scenario)
+                latencies.append(latency)
+                errors += not ok
+
+        gemini_calls = self.gemini.total_calls()
+        firestore_reads = self.db.counters()["reads"]
+        cpu = time.process_time()
+        start = time.perf_counter()
+        with self.quiet():
+            await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+        count = len(latencies)
+        return {
+            "scenario": scenario.name,
+            "concurrency": concurrency,
+            "requests": count,
+            "errors": errors,
+            "throughput_rps": round(count / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+            "cpu_ms_per_request": round((time.process_time() - cpu) * 1000 / count, 1),
+            "gemini_calls_per_request": round((self.gemini.total_calls() - gemini_calls) / count, 2),
+            "firestore_reads_per_request": round((self.db.counters()["reads"] - firestore_reads) / count, 1),
+        }
+
+    async def measure_allocations(self, scenario: Scenario) -> Dict[str, Any]:
+        """Sequential requests under tracemalloc: peak allocated per request, and what stays allocated."""
+        peaks = []
+        with self.quiet():
+            tracemalloc.start()
+            try:
+                retained_start = tracemalloc.get_traced_memory()[0]
+                for _ in range(self.args.allocation_requests):
+                    tracemalloc.reset_peak()
+                    before = tracemalloc.get_traced_memory()[0]
+                    await self.send(scenario)
+                    peaks.append(tracemalloc.get_traced_memory()[1] - before)
+                retained = tracemalloc.get_traced_memory()[0] - retained_start
+            finally:
+                tracemalloc.stop()
+        return {
+            "scenario": scenario.name,
+            "requests": len(peaks),
+            "peak_kib_per_request": round(statistics.median(peaks) / 1024, 1),
+            "max_peak_kib": round(max(peaks) / 1024, 1),
+            "retained_kib_per_request": round(retained / 1024 / len(peaks), 1),
+        }
+
+    async def run_scenario(self, scenario: Scenario, levels: List[int]) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        with self.quiet():
+            for _ in range(self.args.warmup):
+                await self.send(scenario)
+        results = []
+        for concurrency in levels:
+            result = await self.run_level(scenario, concurrency)
+            print(format_level(result), flush=True)
+            results.append(result)
+        allocations = None
+        if self.args.allocation_requests > 0:
+            allocations = await self.measure_allocations(scenario)
+            print(format_allocations(allocations), flush=True)
+        return results, allocations
+
+
+def format_level(result: Dict[str, Any]) -> str:
+    return (
+        f"  c={result['concurrency']:<3} {result['throughput_rps']:>8.2f} req/s"
+        f"  p50 {result['p50_ms']:>8.1f} ms  p99 {result['p99_ms']:>8.1f} ms"
+        f"  cpu {result['cpu_ms_per_request']:>7.1f} ms/req"
+        f"  gemini {result['gemini_calls_per_request']:>5.2f}/req  firestore reads {result['firestore_reads_per_request']:>5.1f}/req"
+        + (f"  ERRORS {result['errors']}/{result['requests']}" if result["errors"] else "")
+    )
+
+
+def format_allocations(allocations: Dict[str, Any]) -> str:
+    return (
+        f"  allocations: peak {allocations['peak_kib_per_request']:.1f} KiB/req (max {allocations['max_peak_kib']:.1f} KiB),"
+        f" retained {allocations['retained_kib_per_request']:.1f} KiB/req"
+    )
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, max_regression: float) -> bool:
+    """
+    Print the change against a baseline run.
+
+    Returns:
+        bool: True if no p50 or p99 latency regressed by more than ``max_regression`` percent
+    """
+    with open(baseline_path) as f:
+        baseline = {(result["scenario"], result["concurrency"]): result for result in json.load(f)["results"]}
+
+    def change(new: float, old: float) -> float:
+        return (new - old) / old * 100 if old else 0.0
+
+    print(f"\nCompared with {baseline_path}:")
+    ok = True
+    for result in results:
+        old = baseline.get((result["scenario"], result["concurrency"]))
+        if old is None:
+            continue
+        p50, p99 = change(result["p50_ms"], old["p50_ms"]), change(result["p99_ms"], old["p99_ms"])
+        regressed = p50 > max_regression or p99 > max_regression
+        ok = ok and not regressed
+        print(
+            f"  {result['scenario']:<14} c={result['concurrency']:<3}"
+            f" throughput {change(result['throughput_rps'], old['throughput_rps']):+6.1f}%"
+            f"  p50 {p50:+6.1f}%  p99 {p99:+6.1f}%" + ("  REGRESSION" if regressed else "")
+        )
+    return ok
+
+
+async def run(args: argparse.Namespace) -> int:
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS_BY_NAME]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)}. Available: {', '.join(SCENARIOS_BY_NAME)}")
+        return 2
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    workdir = tempfile.mkdtemp(prefix="codeed-bench-")
+    configure_environment(workdir)
+    sys.path.insert(0, REPO_ROOT)
+
+    http = FakeHttpServer(latency_ms=args.http_ms, seed=args.seed).start()
+    gemini = FakeGeminiClient(
+        latency=GeminiLatency(args.gemini_first_token_ms, args.gemini_ms_per_token, args.gemini_jitter),
+        count_tokens_ms=args.count_tokens_ms,
+        seed=args.seed,
+        output_scale=args.output_scale,
+        error_rate=args.gemini_error_rate,
+    )
+    db = FakeFirestore(latency_ms=args.firestore_ms, seed=args.seed)
+    ctx = BenchContext(
+        seed=args.seed,
+        text_words=args.text_words,
+        user_ids=seed_users(db, args.users, args.seed),
+        corpus=build_corpus(args.seed),
+        http=http,
+    )
+
+    # Imported only now: the app reads its settings at import time
+    import httpx
+    from main import app
+    from app.services.llm import gemini_client
+    from app.services.firebase.config import firebase_config
+
+    gemini_client._client = gemini
+    firebase_config._db = db
+    http.install()
+
+    results: List[Dict[str, Any]] = []
+    allocations: List[Dict[str, Any]] = []
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            bench = Bench(args, client, gemini, db, ctx)
+            for name in names:
+                scenario = SCENARIOS_BY_NAME[name]
+                print(f"{scenario.name}: {scenario.description}", flush=True)
+                if scenario.requires and not shutil.which(scenario.requires):
+                    print(f"  skipped, {scenario.requires} is not installed", flush=True)
+                    continue
+                levels_results, scenario_allocations = await bench.run_scenario(scenario, levels)
+                results.extend(levels_results)
+                if scenario_allocations:
+                    allocations.append(scenario_allocations)
+    finally:
+        http.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        directory = os.path.dirname(args.json)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results, "allocations": allocations}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.baseline and not compare(results, args.baseline, args.max_regression):
+        return 1
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    return asyncio.run(run(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
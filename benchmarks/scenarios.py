@@ -0,0 +1,123 @@
+"""
+Benchmark scenarios: one endpoint each, with the request body built per request.
+
+Request ``i`` of a run always gets the same body, and no two requests of a run share
+a text, so the translation memory and the shared token count cache start cold for
+every request, as they do for new documents in production.
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from benchmarks.corpus import study_text
+from benchmarks.fake_http import FakeHttpServer
+
+UPLOAD_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "html": "text/html",
+    "wav": "audio/wav",
+}
+
+
+@dataclass
+class BenchContext:
+    seed: int
+    text_words: int
+    user_ids: List[str]
+    corpus: Dict[str, str]  # Document path per kind, see corpus.build_corpus
+    http: FakeHttpServer
+    _uploads: Dict[str, bytes] = field(default_factory=dict)
+
+    def text(self, i: int, words: Optional[int] = None) -> str:
+        return study_text(self.seed * 1_000_000 + i, words or self.text_words)
+
+    def user(self, i: int) -> str:
+        return self.user_ids[i % len(self.user_ids)]
+
+    def upload(self, kind: str) -> Dict[str, Any]:
+        if kind not in self._uploads:
+            with open(self.corpus[kind], "rb") as f:
+                self._uploads[kind] = f.read()
+        name = os.path.basename(self.corpus[kind])
+        return {"files": {"file": (name, self._uploads[kind], UPLOAD_TYPES[kind])}}
+
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    build: Callable[[int, BenchContext], Dict[str, Any]]  # httpx request arguments for request i
+    description: str
+    method: str = "POST"
+    requires: Optional[str] = None  # Executable the scenario needs, e.g. "ffmpeg"
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario(
+        "summarize",
+        "/api/v1/summarize",
+        lambda i, ctx: {"json": {
+            "text": ctx.text(i),
+            "format": "paragraph" if i % 2 == 0 else "bullet_points",
+            "length": "medium",
+            "userId": ctx.user(i),
+        }},
+        "Personalized summary, paragraphs and bullet points alternating",
+    ),
+    Scenario(
+        "quiz_mix",
+        "/api/v1/generateQuestions",
+        lambda i, ctx: {"json": {
+            "text": ctx.text(i),
+            "numbers": 9,
+            "difficulty": "Medium",
+            "quiz_type": "mix",
+            "language": "English",
+            "userId": ctx.user(i),
+        }},
+        "Personalized 9-question quiz in mix mode (MCQ, true/false, short)",
+    ),
+    Scenario(
+        "flashcard",
+        "/api/v1/flashcard",
+        lambda i, ctx: {"json": {"text": ctx.text(i), "userId": ctx.user(i)}},
+        "Personalized flashcard set",
+    ),
+    Scenario(
+        "flowchart",
+        "/api/v1/flowchart",
+        lambda i, ctx: {"json": {"text": ctx.text(i), "userId": ctx.user(i)}},
+        "Personalized flowchart with server-side layout",
+    ),
+    Scenario("extract_pdf", "/api/v1/extract-text", lambda i, ctx: ctx.upload("pdf"), "Text of a PDF of about 1500 words"),
+    Scenario("extract_docx", "/api/v1/extract-text", lambda i, ctx: ctx.upload("docx"), "Text of a DOCX document of about 1500 words"),
+    Scenario("extract_html", "/api/v1/extract-text", lambda i, ctx: ctx.upload("html"), "Text of an uploaded HTML page"),
+    Scenario(
+        "extract_audio",
+        "/api/v1/extract-text",
+        lambda i, ctx: ctx.upload("wav"),
+        "Transcript of a 4 s WAV file (fake speech recognition)",
+        requires="ffmpeg",
+    ),
+    Scenario(
+        "translate",
+        "/api/v1/translate",
+        lambda i, ctx: {"json": {"text": ctx.text(i, 300), "target_language": "Spanish"}},
+        "Google Translate path, one request per segment",
+    ),
+    Scenario(
+        "translate_ai",
+        "/api/v1/translate",
+        lambda i, ctx: {"json": {"text": ctx.text(i, 300), "target_language": "Spanish", "userId": ctx.user(i)}},
+        "Personalized Gemini translation, segments batched in one call",
+    ),
+    Scenario(
+        "scrape",
+        "/api/v1/get-webpage-text",
+        lambda i, ctx: {"json": {"url": ctx.http.page_url(ctx.seed * 1_000_000 + i)}},
+        "Download and clean a web page",
+    ),
+]
+
+SCENARIOS_BY_NAME = {scenario.name: scenario for scenario in SCENARIOS}
@@ -0,0 +1,117 @@
+"""
+Production runner: gunicorn managing uvicorn workers.
+
+    gunicorn main:app -c gunicorn.conf.py
+
+Worker count: WEB_CONCURRENCY if set, otherwise autotuned to the CPUs and memory
+actually available to the container (cgroup limits included), capped at
+GUNICORN_MAX_WORKERS.
+
+With preload (the default) the app is imported once in the master and the heavy
+libraries and language profiles are loaded there, so workers share that memory.
+Clients, connections and thread pools are created per worker at startup
+(WARMUP_ON_STARTUP), never before the fork. Workers on the node share the
+Gemini quota (GEMINI_QUOTA_WORKERS) and the SQLite caches under .cache/.
+"""
+
+import math
+import multiprocessing
+import os
+
+# Rough resident size of one warmed-up worker
+WORKER_MEMORY_MB = int(os.getenv("GUNICORN_WORKER_MEMORY_MB", "400"))
+MAX_WORKERS = int(os.getenv("GUNICORN_MAX_WORKERS", "8"))
+
+
+def _cpu_limit() -> int:
+    """CPUs this process may use: the cgroup quota if there is one, else the CPU affinity."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return multiprocessing.cpu_count()
+
+
+def _memory_limit_mb() -> int:
+    """Memory available to this container: the cgroup limit or MemAvailable, whichever is lower."""
+    limits = []
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            value = f.read().strip()
+        if value != "max":
+            limits.append(int(value) // (1024 * 1024))
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    limits.append(int(line.split()[1]) // 1024)
+                    break
+    except (OSError, ValueError):
+        pass
+    return min(limits) if limits else WORKER_MEMORY_MB * MAX_WORKERS
+
+
+def autotune_workers() -> int:
+    """
+    Workers are async and spend most of their time waiting on Gemini and Firestore,
+    but PDF parsing, layout and JSON handling hold the GIL: two per CPU, as many as
+    fit in memory.
+    """
+    by_cpu = 2 * _cpu_limit()
+    by_memory = _memory_limit_mb() // WORKER_MEMORY_MB
+    return max(1, min(by_cpu, by_memory, MAX_WORKERS))
+
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY") or autotune_workers())
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+
+# Long generations stream for a while; the timeout only has to catch stuck workers
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then so slow leaks cannot build up
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+errorlog = "-"
+
+# Read by the app when it is imported (in the master with preload, so set them first)
+os.environ.setdefault("GEMINI_QUOTA_WORKERS", str(workers))
+os.environ.setdefault("WARMUP_ON_STARTUP", "1")
+
+
+def on_starting(server):
+    # Multiprocess metrics: series left over from the previous run would be summed in
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(".db"):
+                os.remove(os.path.join(directory, name))
+
+
+def when_ready(server):
+    server.log.info(f"Starting {workers} workers (preload={'on' if preload_app else 'off'})")
+    if preload_app:
+        from app.services.warmup import preload_shared
+        preload_shared()
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} forked")
+
+
+def child_exit(server, worker):
+    # Multiprocess metrics: drop the exited worker's live series
+    from app.services.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
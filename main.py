@@ -1,7 +1,14 @@
-from fastapi import FastAPI
+import asyncio
+import os
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from app.api.v1.routes import router
-from app.services.firebase.config import FirebaseConfig
 from fastapi.middleware.cors import CORSMiddleware
+from app.services.llm.gemini_client import GeminiUnavailableError
+from app.services.warmup import warmup_worker
+from app.services.metrics import MetricsMiddleware, metrics_response
+from app.services.tracing import TracingMiddleware, configure_tracing, shutdown_tracing
+from app.db.mongodb import connect_to_mongo, close_mongo_connection, ensure_indexes, is_configured as mongo_configured
 
 app = FastAPI()
 
@@ -17,16 +24,44 @@ app.add_middleware(
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization", "X-Requested-With", "Accept", "Origin", "Access-Control-Allow-Origin"],
 )
+app.add_middleware(MetricsMiddleware)
+# Outermost, so the request id and root span cover everything below
+app.add_middleware(TracingMiddleware)
 
 @app.on_event("startup")
 async def statup_event():
-    firebase_config = FirebaseConfig()
-    firebase_config.initialize_firebase()
-    print("Connected to Firebase")
-    
+    configure_tracing()
+    # Firebase is initialized on first use (get_firebase_db), keeping the SDK out of the cold start
+    if os.getenv("WARMUP_ON_STARTUP", "0") == "1":
+        # Set by gunicorn.conf.py: create clients and pools before this worker takes traffic
+        await asyncio.get_running_loop().run_in_executor(None, warmup_worker)
+    if mongo_configured():
+        await connect_to_mongo()
+        if await ensure_indexes():
+            print("Connected to MongoDB")
+    else:
+        print("MONGO_DB_URL not set, MongoDB persistence disabled")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_mongo_connection()
+    shutdown_tracing()
 
 app.include_router(router, prefix='/api/v1')
 
+@app.exception_handler(GeminiUnavailableError)
+async def gemini_unavailable_handler(request: Request, exc: GeminiUnavailableError):
+    # Out of quota or Gemini is failing: tell the client when to come back instead of a generic 500
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"AI service is busy, please try again shortly. ({exc})"},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
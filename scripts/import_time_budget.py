@@ -0,0 +1,120 @@
+"""
+Import-time budget check for the API.
+
+Runs ``python -X importtime -c "import main"`` in a fresh interpreter and fails when
+importing the app takes longer than the budget, or when one of the heavy extractor
+or client libraries is imported eagerly again. Those must stay behind
+``app.services.lazy_imports.lazy_import`` so cold starts stay fast.
+
+Usage (from the repository root):
+
+    python scripts/import_time_budget.py
+    python scripts/import_time_budget.py --budget-ms 800 --runs 5 --top 15
+
+Exits with status 1 when the budget is exceeded or a heavy module is imported.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1000"))
+
+# Top-level packages that must not be imported just by loading the app
+LAZY_MODULES = [
+    "fitz",
+    "pymupdf",
+    "docx",
+    "pptx",
+    "PIL",
+    "pytesseract",
+    "pydub",
+    "speech_recognition",
+    "ffmpeg",
+    "bs4",
+    "readability",
+    "deep_translator",
+    "youtube_transcript_api",
+    "firebase_admin",
+    "google.cloud.firestore_v1",
+    "google.genai",
+    "motor",
+    "openai",
+]
+
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def measure() -> Tuple[float, Dict[str, Tuple[float, float]]]:
+    """
+    Import the app in a fresh interpreter.
+
+    Returns:
+        Tuple[float, Dict[str, Tuple[float, float]]]: Total milliseconds for ``main``, and
+        (self, cumulative) milliseconds per imported module
+    """
+    env = dict(os.environ)
+    env.setdefault("GEMINI_API_KEY", "import-time-check")
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr[-4000:])
+        raise SystemExit(f"Importing main failed with exit code {result.returncode}")
+
+    modules: Dict[str, Tuple[float, float]] = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            modules[name] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    if "main" not in modules:
+        raise SystemExit("No import timing found for main")
+    return modules["main"][1], modules
+
+
+def eager_heavy_modules(modules: Dict[str, Tuple[float, float]]) -> List[str]:
+    return sorted(
+        name for name in modules
+        if any(name == heavy or name.startswith(heavy + ".") for heavy in LAZY_MODULES)
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Maximum time to import main")
+    parser.add_argument("--runs", type=int, default=3, help="Measurements; the fastest one is compared to the budget")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules (cumulative) to list")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(max(1, args.runs))]
+    total, modules = min(runs, key=lambda run: run[0])
+
+    print(f"import main: {total:.0f} ms (best of {len(runs)}), budget {args.budget_ms:.0f} ms")
+    print("Slowest imports (cumulative ms):")
+    for name, (_, cumulative) in sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:args.top]:
+        print(f"  {cumulative:8.1f}  {name}")
+
+    failed = False
+    eager = eager_heavy_modules(modules)
+    if eager:
+        failed = True
+        print("Heavy modules imported eagerly (load them with lazy_import):")
+        for name in eager:
+            print(f"  {name}")
+    if total > args.budget_ms:
+        failed = True
+        print(f"Over budget by {total - args.budget_ms:.0f} ms")
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())